@@ -5,57 +5,55 @@ import matplotlib.pyplot as plt
 from order_book import OrderBook
 from agent_logic import Agent, Order, LPLT_agent
 from exchange import Exchange
+from metrics import MetricsRecorder
 
 
-from visualize_book import plot_order_book, plot_interactive_order_book
+from visualize_book import plot_order_book, plot_interactive_order_book, DepthHistory
 
-def initialise_agents(type : str, num : int):
+def initialise_agents(type : str, num : int, rng = random):
+    # rng: anything with the random module's API, e.g. random.Random(seed) for a private stream
     agents = []
     for i in range(num):
         agent_id = f"agent_{i+1}"
-        inventory = random.uniform(100,200)
+        inventory = rng.uniform(100,200)
         #cash = random.uniform(8000,11000)
         cash = inventory*100
 
         if type == "LPLT":
             agent_obj = LPLT_agent(id=agent_id, inventory=inventory, cash=cash)
-            agent_obj.b = random.gauss(0,1)
-            agent_obj.spread_bias = random.gauss(0,1)
-            agent_obj.imbalance_bias = random.gauss(0,1)
+            agent_obj.b = rng.gauss(0,1)
+            agent_obj.spread_bias = rng.gauss(0,1)
+            agent_obj.imbalance_bias = rng.gauss(0,1)
         elif type == "Random":
             agent_obj = Agent(id=agent_id, inventory=inventory, cash=cash)
         agents.append(agent_obj)
     return agents
 
-def random_orders(agent_list : list, exchange : Exchange, num_orders : int):
-
-    mid_price_history = [] 
-    spread_history = []
-    book_history = [] # For visualization
+def random_orders(agent_list : list, exchange : Exchange, num_orders : int,
+                  rng = random, np_rng = np.random, record_depth : bool = True, metrics : MetricsRecorder = None):
+    # rng / np_rng default to the global random and np.random state; pass
+    # random.Random(seed) and np.random.default_rng(seed) to run an independent path.
+    # record_depth=False skips the DepthHistory (book_history is then None).
+    # Per-step metrics go to `metrics` (a new MetricsRecorder by default); the
+    # returned mid/spread/imbalance are its float arrays, NaN where undefined.
+
+    if metrics is None:
+        metrics = MetricsRecorder(num_orders)
+    book_history = DepthHistory() if record_depth else None # For visualization, stored as depth deltas
     sides = ['bid','ask']
 
     shape_alpha = 1.8 
     tick_size = 0.50
-    init_spread = 0.50
 
     # for _ in range(100):
     for k in range(num_orders):
-        agent = random.choice(agent_list)
-        side = random.choice(sides)
+        agent = rng.choice(agent_list)
+        side = rng.choice(sides)
         # Use last known valid values or defaults to prevent resetting on empty book
-        last_mid = 100
-        for p in reversed(mid_price_history):
-            if p is not None:
-                last_mid = p
-                break
-        
-        last_spread = init_spread
-        for s in reversed(spread_history):
-            if s is not None:
-                last_spread = s
-                break
-
-        raw_sample = np.random.pareto(shape_alpha)
+        last_mid = metrics.last_mid
+        last_spread = metrics.last_spread
+
+        raw_sample = np_rng.pareto(shape_alpha)
 
         if side == "bid":
             price = round((last_mid - last_spread/2) - raw_sample*tick_size, 6)
@@ -64,44 +62,113 @@ def random_orders(agent_list : list, exchange : Exchange, num_orders : int):
             price = round((last_mid + last_spread/2) + raw_sample*tick_size, 6)
             price = max(0.01, price)
 
-        size = random.randint(1,5)
+        size = rng.randint(1,5)
 
-        p = random.uniform(0,1)
+        p = rng.uniform(0,1)
         if p < 0.50:
             exchange.process_limit_order(agent, side, price, size)
         elif (0.50 < p < 0.75) and (k > num_orders*0.1):
-            q = random.choice(['buy','sell'])
+            q = rng.choice(['buy','sell'])
             if q=='buy':
                 exchange.process_market_buy(agent, size)
             else:
                 exchange.process_market_sell(agent, size)
         elif p > 0.75 and (k > num_orders*0.2):
             if agent.active_orders:
-                order_id = random.choice(list(agent.active_orders.keys()))
+                order_id = rng.choice(list(agent.active_orders.keys()))
                 exchange.process_cancel_order(agent, order_id)
-        # Calculate new metrics after order processing
 
         # Update History
-
-        spread = exchange.order_book.calculate_spread()
-        mid_price = exchange.order_book.calculate_mid_price()
-        
-        spread_history.append(spread)
-        mid_price_history.append(mid_price)
+        metrics.record(exchange.order_book)
 
         # Snapshot for visualization (every 10 steps to save memory/speed)
-        if k % 10 == 0:
-            book_history.append(exchange.order_book.get_snapshot())
+        if record_depth and k % 10 == 0:
+            book_history.record(exchange.pop_depth_changes())
     
     # Capture final state
-    book_history.append(exchange.order_book.get_snapshot())
+    if record_depth:
+        book_history.record(exchange.pop_depth_changes())
+
+    return metrics.column("mid_price"), metrics.column("spread"), metrics.column("imbalance"), book_history
+
+
+def draw_order_flow(rng : np.random.Generator, num_agents : int, n : int, shape_alpha : float = 1.8):
+    """
+    n steps of zero-intelligence order flow, drawn column-wise with one NumPy call
+    per field. Same distributions as the per-step draws of random_orders.
+    """
+    return {
+        "agent": rng.integers(0, num_agents, n),    # random.choice(agent_list)
+        "is_bid": rng.integers(0, 2, n) == 0,       # random.choice(['bid','ask'])
+        "offset": rng.pareto(shape_alpha, n),       # np.random.pareto(shape_alpha)
+        "size": rng.integers(1, 6, n),              # random.randint(1,5)
+        "action": rng.random(n),                    # random.uniform(0,1)
+        "market_buy": rng.integers(0, 2, n) == 0,   # random.choice(['buy','sell'])
+        "cancel_pick": rng.random(n),               # which active order to cancel
+    }
+
+
+def vectorized_random_orders(agent_list : list, exchange : Exchange, num_orders : int,
+                             rng : np.random.Generator = None, block_size : int = 4096, record_depth : bool = True,
+                             metrics : MetricsRecorder = None):
+    """
+    random_orders with the order flow pre-drawn in blocks by draw_order_flow
+    instead of five scalar RNG calls per step. Statistically the same process,
+    not the same numbers: it draws from a single np.random.Generator.
+    Returns the same (mid, spread, imbalance, book_history) as random_orders.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    if metrics is None:
+        metrics = MetricsRecorder(num_orders)
+    book_history = DepthHistory() if record_depth else None
+    book = exchange.order_book
+
+    tick_size = 0.50
+
+    for start in range(0, num_orders, block_size):
+        flow = draw_order_flow(rng, len(agent_list), min(block_size, num_orders - start))
+        # Convert to Python scalars once per block, not per element access
+        columns = (flow["agent"].tolist(), flow["is_bid"].tolist(), flow["offset"].tolist(), flow["size"].tolist(),
+                   flow["action"].tolist(), flow["market_buy"].tolist(), flow["cancel_pick"].tolist())
+
+        for k, (a, is_bid, raw_sample, size, p, market_buy, cancel_pick) in enumerate(zip(*columns), start):
+            agent = agent_list[a]
+            last_mid, last_spread = metrics.last_mid, metrics.last_spread
+            if is_bid:
+                side = "bid"
+                price = max(0.01, round((last_mid - last_spread/2) - raw_sample*tick_size, 6))
+            else:
+                side = "ask"
+                price = max(0.01, round((last_mid + last_spread/2) + raw_sample*tick_size, 6))
+
+            if p < 0.50:
+                exchange.process_limit_order(agent, side, price, size)
+            elif (0.50 < p < 0.75) and (k > num_orders*0.1):
+                if market_buy:
+                    exchange.process_market_buy(agent, size)
+                else:
+                    exchange.process_market_sell(agent, size)
+            elif p > 0.75 and (k > num_orders*0.2):
+                if agent.active_orders:
+                    order_ids = list(agent.active_orders)
+                    exchange.process_cancel_order(agent, order_ids[int(cancel_pick * len(order_ids))])
+
+            metrics.record(book)
+
+            if record_depth and k % 10 == 0:
+                book_history.record(exchange.pop_depth_changes())
+
+    if record_depth:
+        book_history.record(exchange.pop_depth_changes())
 
-    return mid_price_history, spread_history, book_history
+    return metrics.column("mid_price"), metrics.column("spread"), metrics.column("imbalance"), book_history
 
     
 if __name__ == "__main__":
     num_agents = 10
-    agent_list = initialise_agents(num_agents)
+    agent_list = initialise_agents("Random", num_agents)
     ex = Exchange()
     for agent in agent_list:
         ex.register_agent(agent)
@@ -109,7 +176,7 @@ if __name__ == "__main__":
     for agent in ex.agents.values():
         print(agent)
 
-    mid_price, spread, book_history = random_orders(agent_list, ex, 1000)
+    mid_price, spread, imbalance, book_history = random_orders(agent_list, ex, 1000)
     # print("\nOrder Book after random orders:")
     # print(ex.order_book)
 
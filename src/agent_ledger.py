@@ -0,0 +1,81 @@
+import numpy as np
+
+
+class AgentLedger:
+    """
+    Balances of every agent registered on an Exchange, stored column-wise:
+    row i of cash, inventory, locked_cash and locked_inventory belongs to
+    ids[i] (index maps id -> row).
+
+    cash and inventory are what the agent is free to use; locked_cash and
+    locked_inventory are reserved by its orders resting in the book.
+
+    minor_units=None keeps cash as float64. minor_units=100 stores cash as
+    int64 cents (any integer scale works), so sums of many fills do not drift;
+    amounts are rounded once when they enter the ledger. Inventory stays float64.
+    """
+
+    def __init__(self, capacity: int = 64, minor_units: int = None):
+        self.minor_units = minor_units
+        cash_dtype = np.float64 if minor_units is None else np.int64
+        self.cash = np.zeros(capacity, dtype=cash_dtype)
+        self.locked_cash = np.zeros(capacity, dtype=cash_dtype)
+        self.inventory = np.zeros(capacity, dtype=np.float64)
+        self.locked_inventory = np.zeros(capacity, dtype=np.float64)
+        self.ids = []
+        self.index = {}
+        if minor_units is None:
+            self.to_units = _same_units
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _grow(self):
+        for name in ("cash", "locked_cash", "inventory", "locked_inventory"):
+            old = getattr(self, name)
+            new = np.zeros(2 * len(old), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add(self, agent_id, cash: float = 0.0, inventory: float = 0.0):
+        """Returns the agent's row, opening it (or resetting its free balances) first."""
+        i = self.index.get(agent_id)
+        if i is None:
+            i = len(self.ids)
+            if i == len(self.cash):
+                self._grow()
+            self.index[agent_id] = i
+            self.ids.append(agent_id)
+        self.cash[i] = self.to_units(cash)
+        self.inventory[i] = inventory
+        return i
+
+    def to_units(self, amount):
+        """Cash amount (scalar or array) -> ledger units."""
+        if self.minor_units is None:
+            return amount
+        if isinstance(amount, np.ndarray):
+            return np.rint(amount * self.minor_units).astype(np.int64)
+        return int(round(amount * self.minor_units))
+
+    def from_units(self, units):
+        """Ledger units -> cash amount as a Python float."""
+        if self.minor_units is None:
+            return float(units)
+        return int(units) / self.minor_units
+
+    def bind(self, agent, i: int):
+        """
+        Makes the agent's cash and inventory read and write row i (see
+        Agent._ledger). An agent is a view of the ledger it was last bound to.
+        """
+        agent._ledger = self
+        agent._ledger_index = i
+        # The balances now live in the row; drop the values held before binding
+        agent.__dict__.pop("_cash", None)
+        agent.__dict__.pop("_inventory", None)
+
+
+def _same_units(amount):
+    # to_units of a float ledger: cash is stored as is
+    return amount
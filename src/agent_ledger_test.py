@@ -0,0 +1,127 @@
+import contextlib
+import io
+import pickle
+import random
+import unittest
+import numpy as np
+from agent_logic import Agent, LPLT_agent
+from agent_ledger import AgentLedger
+from exchange import Exchange
+from exchange_test import make_agents, random_commands
+
+
+class TestAgentLedger(unittest.TestCase):
+    def make_exchange(self, n: int = 8, **exchange_args):
+        ex, agents = Exchange(**exchange_args), make_agents(n)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for agent in agents:
+                ex.register_agent(agent)
+        return ex, agents
+
+    def test_agents_are_views(self):
+        ex, (alice, bob) = self.make_exchange(2)
+        ex.submit_batch([("limit", "agent_0", "ask", 100.0, 5), ("limit", "agent_1", "bid", 100.0, 2)])
+        self.assertEqual(alice.cash, 10_200.0)
+        self.assertEqual(alice.inventory, 95.0)
+        self.assertEqual(alice.locked_inventory, 3.0)
+        self.assertEqual(bob.inventory, 102.0)
+        self.assertEqual(ex.ledger.cash[ex.agent_index["agent_0"]], 10_200.0)
+
+        # Writes go to the ledger too
+        alice.cash = 1.5
+        self.assertEqual(ex.ledger.cash[0], 1.5)
+        self.assertIsInstance(alice, Agent)
+
+    def test_subclass_keeps_its_methods(self):
+        ex = Exchange()
+        agent = LPLT_agent(id="lplt", cash=50.0, inventory=1.0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            ex.register_agent(agent)
+        self.assertIsInstance(agent, LPLT_agent)
+        self.assertEqual(agent.cash, 50.0)
+        self.assertTrue(hasattr(agent, "choose_action"))
+
+    def test_registered_agents_pickle_and_compare_as_plain_agents(self):
+        ex, (alice, bob) = self.make_exchange(2)
+        ex.submit_batch([("limit", "agent_0", "ask", 100.0, 5), ("limit", "agent_1", "bid", 100.0, 2)])
+        self.assertIs(type(alice), Agent)
+        self.assertNotIn("_cash", vars(alice))
+        self.assertNotIn("_inventory", vars(alice))
+
+        plain = Agent(id="agent_0", inventory=95.0, cash=10_200.0, active_orders=dict(alice.active_orders))
+        self.assertEqual(alice, plain)
+
+        copy = pickle.loads(pickle.dumps(alice))
+        self.assertIs(type(copy), Agent)
+        self.assertEqual(copy, alice)
+        self.assertIsNone(copy._ledger)
+        # The copy is detached from the exchange
+        copy.cash = 0.0
+        self.assertEqual(alice.cash, 10_200.0)
+
+        lplt = LPLT_agent(id="lplt", cash=50.0, inventory=1.0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            ex.register_agent(lplt)
+        lplt.cash = 75.0
+        copy = pickle.loads(pickle.dumps(lplt))
+        self.assertIs(type(copy), LPLT_agent)
+        self.assertEqual((copy.cash, copy.inventory), (75.0, 1.0))
+
+    def test_registered_id_cannot_be_taken_by_another_agent(self):
+        ex, (alice, bob) = self.make_exchange(2)
+        ex.submit_batch([("limit", "agent_0", "ask", 101.0, 4), ("limit", "agent_0", "bid", 90.0, 1)])
+        before = (alice.cash, alice.inventory, alice.locked_cash, alice.locked_inventory, dict(alice.active_orders))
+
+        impostor = Agent(id="agent_0", cash=1e9, inventory=1e9)
+        with self.assertRaises(ValueError):
+            ex.register_agent(impostor)
+        # Nor through the single-order API, which registers unknown agents on first use
+        with self.assertRaises(ValueError):
+            ex.process_limit_order(impostor, "bid", 100.0, 1)
+
+        # Registering the same object again is a no-op
+        with contextlib.redirect_stdout(io.StringIO()):
+            ex.register_agent(alice)
+        self.assertIs(ex.agents["agent_0"], alice)
+        self.assertEqual((alice.cash, alice.inventory, alice.locked_cash, alice.locked_inventory,
+                          dict(alice.active_orders)), before)
+        self.assertEqual(len(ex.ledger), 2)
+        self.check_locks(ex, [alice, bob])
+
+    def check_locks(self, ex, agents):
+        # What is locked is exactly what rests in the book
+        locked_cash = {a.id: 0.0 for a in agents}
+        locked_inventory = {a.id: 0.0 for a in agents}
+        for order in ex.order_book.orders.values():
+            if order.side == "bid":
+                locked_cash[order.agent_id] += ex.order_book.to_price(order.price) * order.size
+            else:
+                locked_inventory[order.agent_id] += order.size
+        for agent in agents:
+            self.assertAlmostEqual(agent.locked_cash, locked_cash[agent.id], places=6)
+            self.assertAlmostEqual(agent.locked_inventory, locked_inventory[agent.id])
+
+    def test_locks_match_resting_orders(self):
+        ex, agents = self.make_exchange(8, tick_size=0.01)
+        ex.submit_batch(random_commands(random.Random(5), [a.id for a in agents], 3000))
+        self.check_locks(ex, agents)
+
+    def test_minor_units_conserve_cash_exactly(self):
+        ex, agents = self.make_exchange(8, minor_units=100)
+        self.assertEqual(ex.ledger.cash.dtype, np.int64)
+        commands = [c for c in random_commands(random.Random(6), [a.id for a in agents], 3000) if c[0] != "market"]
+        ex.submit_batch(commands)
+        n = len(agents)
+        self.assertEqual(int(ex.ledger.cash[:n].sum() + ex.ledger.locked_cash[:n].sum()), 8 * 10_000 * 100)
+        self.check_locks(ex, agents)
+
+    def test_ledger_grows(self):
+        ledger = AgentLedger(capacity=2)
+        for i in range(5):
+            self.assertEqual(ledger.add(f"a{i}", cash=float(i)), i)
+        self.assertEqual(len(ledger), 5)
+        self.assertEqual(ledger.cash[:5].tolist(), [0.0, 1.0, 2.0, 3.0, 4.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,14 +1,29 @@
 import dataclasses
-import time
 import numpy as np
 import math
-from order_book import OrderBook
-from ZI_test import initialise_agents
 
 
 def sigmoid(x):
     return 1 / (1 + math.exp(-x))
 
+
+def lomax_cdf(x, a: float):
+    """CDF of the Pareto II (Lomax) law np.random.pareto(a) samples: F(x) = 1 - (1+x)^-a, 0 below 0."""
+    return 1 - (1 + np.maximum(x, 0)) ** -a
+
+
+def truncated_pareto(rng, a: float, upper, size=None):
+    """
+    Draws np.random.pareto(a) conditioned on the sample being <= upper, by
+    inverting the CDF on [0, upper]: one uniform per sample, no rejection.
+    upper may be an array (np.inf = no bound), which gives one sample per bound
+    unless size says otherwise; rng is np.random or a Generator.
+    """
+    mass = lomax_cdf(upper, a)
+    if size is None and np.ndim(mass):
+        size = np.shape(mass)  # one draw per bound, not one shared by all
+    return (1 - rng.random(size) * mass) ** (-1 / a) - 1
+
 @dataclasses.dataclass
 
 class Agent:
@@ -17,9 +32,69 @@ class Agent:
     cash: float = 0.0
     active_orders: dict = dataclasses.field(default_factory=dict)
 
+    # Set by AgentLedger.bind when the agent is registered on an Exchange: cash
+    # and inventory then read and write row _ledger_index of that ledger, so code
+    # holding the Agent sees settlement immediately. Not dataclass fields, so
+    # they take no part in __init__, __eq__ or __repr__.
+    _ledger = None
+    _ledger_index = None
+
     def __str__(self):
         return f"Agent(id={self.id}, inventory={self.inventory}, cash={self.cash}, active_orders={self.active_orders})"
 
+    @property
+    def locked_cash(self):
+        ledger = self._ledger
+        return 0.0 if ledger is None else ledger.from_units(ledger.locked_cash[self._ledger_index])
+
+    @property
+    def locked_inventory(self):
+        ledger = self._ledger
+        return 0.0 if ledger is None else float(ledger.locked_inventory[self._ledger_index])
+
+    def __getstate__(self):
+        # Pickles as a plain agent holding its current balances, without the ledger
+        state = dict(self.__dict__)
+        if state.pop("_ledger", None) is not None:
+            del state["_ledger_index"]
+            state["_cash"], state["_inventory"] = self.cash, self.inventory
+        return state
+
+
+def _agent_cash(self):
+    ledger = self._ledger
+    if ledger is None:
+        return self._cash
+    return ledger.from_units(ledger.cash[self._ledger_index])
+
+
+def _set_agent_cash(self, value):
+    ledger = self._ledger
+    if ledger is None:
+        self._cash = value
+    else:
+        ledger.cash[self._ledger_index] = ledger.to_units(value)
+
+
+def _agent_inventory(self):
+    ledger = self._ledger
+    if ledger is None:
+        return self._inventory
+    return float(ledger.inventory[self._ledger_index])
+
+
+def _set_agent_inventory(self, value):
+    ledger = self._ledger
+    if ledger is None:
+        self._inventory = value
+    else:
+        ledger.inventory[self._ledger_index] = value
+
+
+# Installed after the dataclass decorator has read the fields' defaults
+Agent.cash = property(_agent_cash, _set_agent_cash)
+Agent.inventory = property(_agent_inventory, _set_agent_inventory)
+
 
 class LPLT_agent(Agent):
     aggression : float = 0.0
@@ -49,24 +124,129 @@ class LPLT_agent(Agent):
             return 'sell'
 
     def set_price(self, mid_price: float, spread: float):
-        if self.choose_action(spread) == 'LP':
-            sample = np.random.pareto(1.8)
-            if self.choose_side(spread) == 'buy':
-                price = np.round(mid_price + spread/2 + sample*0.5, 6)
-                if price > self.cash*self.aggression:
-                    return self.set_price(mid_price, spread)
-                else:
-                    return price
-            else:
-                price = np.round(mid_price - spread/2 - sample*0.5, 6)
-                if price < 0:
-                    return self.set_price(mid_price, spread)
-                else:
-                    return price
+        # A quote outside the agent's limits (buy above cash*aggression, sell
+        # below 0) used to be retried from scratch, LP/LT decision included.
+        # Sample the distribution those retries converge to directly instead:
+        # pick LT / buy / sell by their weights among the accepted outcomes,
+        # then draw the Pareto offset truncated to the allowed range.
+        w_lp = sigmoid(self.b + self.spread_bias * spread)
+        w_buy = sigmoid(self.imbalance_bias * spread)  # as choose_side(spread)
+        buy_max = (self.cash*self.aggression - mid_price - spread/2) / 0.5
+        sell_max = (mid_price - spread/2) / 0.5
+        p_buy = w_lp * w_buy * lomax_cdf(buy_max, 1.8)
+        p_sell = w_lp * (1 - w_buy) * lomax_cdf(sell_max, 1.8)
+        total = (1 - w_lp) + p_buy + p_sell
+        if total <= 0:
+            return None # Always LP and no quote is allowed on either side
+
+        u = np.random.uniform(0, total)
+        if u < p_buy:
+            sample = truncated_pareto(np.random, 1.8, buy_max)
+            return np.round(mid_price + spread/2 + sample*0.5, 6)
+        elif u < p_buy + p_sell:
+            sample = truncated_pareto(np.random, 1.8, sell_max)
+            return np.round(mid_price - spread/2 - sample*0.5, 6)
         else:
             return None
 
     def set_size(self):
+        pass
+
+
+class LPLTPopulation:
+    """
+    A population of LPLT agents stored as arrays (one entry per agent), so the
+    LP/LT action, side and price of every agent, or of a sampled subset, come
+    out of one vectorized pass instead of a Python call per agent.
+    Same decision rules as LPLT_agent, except that the side is driven by the
+    book imbalance (LPLT_agent.set_price passes the spread to choose_side).
+    """
+
+    def __init__(self, ids, b, spread_bias, imbalance_bias, aggression, cash, rng: np.random.Generator = None):
+        self.ids = list(ids)
+        self.b = np.asarray(b, dtype=np.float64)
+        self.spread_bias = np.asarray(spread_bias, dtype=np.float64)
+        self.imbalance_bias = np.asarray(imbalance_bias, dtype=np.float64)
+        self.aggression = np.asarray(aggression, dtype=np.float64)
+        # A copy of each agent's cash, used by the buy price cap; see refresh()
+        self.cash = np.array(cash, dtype=np.float64)
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    @classmethod
+    def from_agents(cls, agents: list, rng: np.random.Generator = None):
+        return cls(ids=[a.id for a in agents],
+                   b=[a.b for a in agents],
+                   spread_bias=[a.spread_bias for a in agents],
+                   imbalance_bias=[a.imbalance_bias for a in agents],
+                   aggression=[a.aggression for a in agents],
+                   cash=[a.cash for a in agents],
+                   rng=rng)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def refresh(self, agents: list):
+        """Re-reads cash from the Agent objects (same order as the population)."""
+        self.cash[:] = [a.cash for a in agents]
+
+    @staticmethod
+    def _sigmoid(x):
+        with np.errstate(over="ignore"):  # exp overflow -> inf -> weight 0, which is right
+            return 1 / (1 + np.exp(-x))
+
+    def choose_action(self, spread: float, idx):
+        """True where the agent provides liquidity (LP), False where it takes it (LT)."""
+        w = self._sigmoid(self.b[idx] + self.spread_bias[idx] * spread)
+        return self.rng.random(len(w)) < w
+
+    def choose_side(self, imbalance: float, idx):
+        """True where the agent buys."""
+        w = self._sigmoid(self.imbalance_bias[idx] * imbalance)
+        return self.rng.random(len(w)) < w
+
+    def set_price(self, mid_price: float, spread: float, imbalance: float, idx=None):
+        """
+        Returns (price, is_buy, is_lp) arrays for the agents in idx (all by
+        default). is_lp is False for agents that take liquidity this step; their
+        price is NaN and is_buy is their market order side, drawn from the
+        imbalance as choose_side does. price is also NaN for an LP agent with no
+        allowed quote on either side. Like LPLT_agent.set_price, quotes outside
+        the agent's limits are never drawn:
+        the outcome is sampled among the allowed ones and the Pareto offset is
+        truncated to the allowed range, so every agent costs a fixed number of draws.
+        """
+        idx = np.arange(len(self.ids)) if idx is None else np.asarray(idx)
+        w_lp = self._sigmoid(self.b[idx] + self.spread_bias[idx] * spread)
+        w_buy = self._sigmoid(self.imbalance_bias[idx] * imbalance)
+        buy_max = (self.cash[idx] * self.aggression[idx] - mid_price - spread/2) / 0.5
+        sell_max = (mid_price - spread/2) / 0.5
+        p_buy = w_lp * w_buy * lomax_cdf(buy_max, 1.8)
+        p_sell = w_lp * (1 - w_buy) * lomax_cdf(sell_max, 1.8)
+        total = (1 - w_lp) + p_buy + p_sell
+
+        u = self.rng.random(len(idx)) * total
+        quote_buy = u < p_buy
+        quote_sell = ~quote_buy & (u < p_buy + p_sell)
+        is_lp = quote_buy | quote_sell | (total <= 0)
+        sample = truncated_pareto(self.rng, 1.8, np.where(quote_buy, buy_max, sell_max))
+        price = np.full(len(idx), np.nan)
+        price[quote_buy] = np.round(mid_price + spread/2 + sample[quote_buy]*0.5, 6)
+        price[quote_sell] = np.round(mid_price - spread/2 - sample[quote_sell]*0.5, 6)
+        # LP agents took their side with the quote; LT agents draw theirs now
+        is_buy = np.where(is_lp, quote_buy, self.rng.random(len(idx)) < w_buy)
+        return price, is_buy, is_lp
+
+    def decide(self, mid_price: float, spread: float, imbalance: float, subset: int = None):
+        """
+        One decision pass from OrderBook.get_book_stats() values. With subset=n,
+        n agents are sampled without replacement. Returns (idx, price, is_buy, is_lp).
+        """
+        if subset is None:
+            idx = np.arange(len(self.ids))
+        else:
+            idx = self.rng.choice(len(self.ids), size=subset, replace=False)
+        price, is_buy, is_lp = self.set_price(mid_price, spread, imbalance, idx)
+        return idx, price, is_buy, is_lp
 
         
 
@@ -84,13 +264,19 @@ class LPLT_agent(Agent):
 
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Order:
+    # Slotted: no per-instance __dict__, millions of these are alive during a run
     agent_id : str = None
-    order_id : str = None
+    order_id : int = None
     #agent_active_orders : Agent.active_orders = None
     size : int = 0
-    time_stamp : float = dataclasses.field(default_factory=time.time)
+    time_stamp : float = 0.0  # arrival time, stamped from the book's clock by add_order
+    # Set by the OrderBook while the order rests; prev/next link the price level's FIFO
+    side : str = dataclasses.field(default=None, repr=False, compare=False)
+    price : float = dataclasses.field(default=None, repr=False, compare=False)
+    prev : "Order" = dataclasses.field(default=None, repr=False, compare=False)
+    next : "Order" = dataclasses.field(default=None, repr=False, compare=False)
 
 
     def __str__(self):
@@ -104,6 +290,7 @@ class Order:
 
 
 if __name__ == "__main__":
+    from ZI_test import initialise_agents
 
     agents = initialise_agents(type="LPLT", num=10)
 
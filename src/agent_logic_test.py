@@ -0,0 +1,115 @@
+import math
+import unittest
+import numpy as np
+from agent_logic import LPLT_agent, LPLTPopulation, lomax_cdf, truncated_pareto
+
+
+def make_population(n: int, seed: int = 0, **overrides):
+    rng = np.random.default_rng(seed)
+    params = dict(ids=[f"agent_{i}" for i in range(n)],
+                  b=rng.normal(0, 1, n),
+                  spread_bias=rng.normal(0, 1, n),
+                  imbalance_bias=rng.normal(0, 1, n),
+                  aggression=np.full(n, 1.0),
+                  cash=np.full(n, 10_000.0),
+                  rng=rng)
+    params.update(overrides)
+    return LPLTPopulation(**params)
+
+
+class TestLPLTPopulation(unittest.TestCase):
+    def test_action_probability_is_sigmoid(self):
+        n = 200_000
+        pop = make_population(n, b=np.full(n, 0.3), spread_bias=np.full(n, -0.5))
+        lp = pop.choose_action(2.0, np.arange(n))
+        self.assertAlmostEqual(lp.mean(), 1 / (1 + math.exp(-(0.3 - 0.5 * 2.0))), delta=0.005)
+
+    def test_quotes_respect_limits(self):
+        # Buy quotes above cash*aggression are redrawn, so only sells (or nothing) survive here
+        pop = make_population(5000, seed=1, aggression=np.full(5000, 0.001))
+        price, is_buy, is_lp = pop.set_price(100.0, 1.0, 0.2)
+        quoted = ~np.isnan(price)
+        self.assertTrue(quoted.any())
+        self.assertFalse(quoted[~is_lp].any())
+        self.assertFalse(is_buy[quoted].any())
+        self.assertTrue((price[quoted] <= 99.5).all())
+
+    def test_each_agent_draws_its_own_offset(self):
+        pop = make_population(5000, seed=4)
+        price, is_buy, is_lp = pop.set_price(100.0, 1.0, 0.0)
+        for side in (is_buy, ~is_buy):
+            quotes = price[is_lp & side & ~np.isnan(price)]
+            self.assertGreater(len(quotes), 100)
+            self.assertGreater(len(np.unique(quotes)), len(quotes) // 2)
+
+    def test_buy_and_sell_quotes(self):
+        pop = make_population(5000, seed=2)
+        price, is_buy, is_lp = pop.set_price(100.0, 1.0, 0.0)
+        quoted = ~np.isnan(price)
+        self.assertTrue((price[quoted & is_buy] >= 100.5).all())
+        self.assertTrue((price[quoted & ~is_buy] <= 99.5).all())
+        self.assertTrue(is_buy[quoted].any() and not is_buy[quoted].all())
+
+    def test_from_agents_and_subset(self):
+        agents = []
+        for i in range(50):
+            agent = LPLT_agent(id=f"agent_{i}", cash=1000.0 + i, inventory=10.0)
+            agent.b, agent.spread_bias, agent.imbalance_bias, agent.aggression = 0.1 * i, 0.0, 0.0, 1.0
+            agents.append(agent)
+        pop = LPLTPopulation.from_agents(agents, rng=np.random.default_rng(0))
+        self.assertEqual(len(pop), 50)
+        self.assertEqual(pop.cash[49], 1049.0)
+
+        agents[0].cash = 5.0
+        pop.refresh(agents)
+        self.assertEqual(pop.cash[0], 5.0)
+
+        idx, price, is_buy, is_lp = pop.decide(100.0, 1.0, 0.0, subset=10)
+        self.assertEqual(len(set(idx.tolist())), 10)
+        self.assertEqual(price.shape, (10,))
+        self.assertEqual(is_lp.shape, (10,))
+
+    def test_liquidity_takers_get_a_side(self):
+        n = 200_000
+        pop = make_population(n, seed=3, b=np.full(n, -1.0), spread_bias=np.zeros(n), imbalance_bias=np.full(n, 2.0))
+        price, is_buy, is_lp = pop.set_price(100.0, 1.0, 0.4)
+        taker = ~is_lp
+        self.assertAlmostEqual(taker.mean(), 1 - 1 / (1 + math.exp(1.0)), delta=0.005)
+        self.assertTrue(np.isnan(price[taker]).all())
+        # Same side law as choose_side: P(buy) = sigmoid(imbalance_bias * imbalance)
+        self.assertAlmostEqual(is_buy[taker].mean(), 1 / (1 + math.exp(-0.8)), delta=0.005)
+        self.assertFalse(np.isnan(price[is_lp]).any())
+
+
+class TestTruncatedPareto(unittest.TestCase):
+    def test_same_law_as_rejection_sampling(self):
+        rng = np.random.default_rng(0)
+        raw = rng.pareto(1.8, 400_000)
+        kept = raw[raw <= 3.0]
+        direct = truncated_pareto(rng, 1.8, 3.0, 200_000)
+        self.assertLessEqual(direct.max(), 3.0)
+        np.testing.assert_allclose(np.quantile(direct, [0.1, 0.5, 0.9]), np.quantile(kept, [0.1, 0.5, 0.9]), atol=0.02)
+
+    def test_unbounded_and_per_sample_bounds(self):
+        self.assertEqual(lomax_cdf(np.inf, 1.8), 1.0)
+        self.assertEqual(lomax_cdf(-1.0, 1.8), 0.0)
+        upper = np.array([0.5, 2.0, np.inf])
+        sample = truncated_pareto(np.random.default_rng(1), 1.8, np.tile(upper, 1000))
+        self.assertTrue((sample.reshape(1000, 3) <= upper).all())
+        # One independent draw per bound
+        self.assertEqual(len(np.unique(sample)), sample.size)
+
+    def test_set_price_never_recurses(self):
+        # Always LP and no affordable buy: the old retry loop recursed until the stack blew
+        agent = LPLT_agent(id="a", cash=100.0, inventory=10.0)
+        agent.b, agent.spread_bias, agent.imbalance_bias, agent.aggression = 30.0, 0.0, 5.0, 0.0
+        np.random.seed(0)
+        prices = [agent.set_price(100.0, 1.0) for _ in range(2000)]
+        self.assertTrue(all(p is not None and 0 <= p <= 99.5 for p in prices))
+
+        # Nothing allowed on either side
+        self.assertIsNone(agent.set_price(0.2, 1.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,508 @@
+from collections.abc import Mapping
+import numpy as np
+from agent_logic import Order
+from clock import LogicalClock
+from order_book import BookBase, FillBuffer, LevelIndex, TickLevelIndex, restored_clock
+
+NIL = -1  # Null link in the slab arrays
+BID, ASK = 0, 1
+
+
+def _grown(arr, capacity: int, fill=0):
+    new = np.full(capacity, fill, dtype=arr.dtype)
+    new[:len(arr)] = arr
+    return new
+
+
+class OrderView:
+    """Read-only view of one resting order in an ArrayOrderBook slab."""
+
+    def __init__(self, book, slot: int):
+        self.book = book
+        self.slot = slot
+
+    @property
+    def agent_id(self):
+        return self.book.agent_ids[self.book.o_agent[self.slot]]
+
+    @property
+    def order_id(self):
+        return int(self.book.o_id[self.slot])
+
+    @property
+    def size(self):
+        return int(self.book.o_size[self.slot])
+
+    @property
+    def time_stamp(self):
+        return float(self.book.o_time[self.slot])
+
+    def __str__(self):
+        return f"Order(agent_id={self.agent_id}, order_id={self.order_id} size={self.size}, time_stamp={self.time_stamp})"
+
+
+class LevelView:
+    """Read-only view of one price level: len(), FIFO iteration and level[i], like PriceLevel."""
+
+    def __init__(self, book, slot: int):
+        self.book = book
+        self.slot = slot
+
+    @property
+    def price(self):
+        return self.book.l_price[self.slot].item()
+
+    @property
+    def total_size(self):
+        return int(self.book.l_size[self.slot])
+
+    def __len__(self):
+        return int(self.book.l_count[self.slot])
+
+    def __iter__(self):
+        o_next = self.book.o_next
+        slot = self.book.l_head[self.slot]
+        while slot != NIL:
+            yield OrderView(self.book, slot)
+            slot = o_next[slot]
+
+    def __getitem__(self, i: int):
+        count = len(self)
+        if i < 0:
+            i += count
+        if not 0 <= i < count:
+            raise IndexError("price level index out of range")
+        slot = self.book.l_head[self.slot]
+        for _ in range(i):
+            slot = self.book.o_next[slot]
+        return OrderView(self.book, slot)
+
+
+class LevelsView(Mapping):
+    """{price: LevelView} over one side of an ArrayOrderBook, so bid_dic/ask_dic keep working."""
+
+    def __init__(self, book, levels: dict):
+        self.book = book
+        self.levels = levels
+
+    def __getitem__(self, price):
+        return LevelView(self.book, self.levels[price])
+
+    def __contains__(self, price):
+        return price in self.levels
+
+    def __iter__(self):
+        return iter(self.levels)
+
+    def __len__(self):
+        return len(self.levels)
+
+
+class ArrayOrderBook(BookBase):
+    """
+    OrderBook with the same API, backed by preallocated NumPy arrays.
+
+    Orders and price levels live in two slabs of parallel arrays (struct of arrays).
+    Free slots are chained through o_next / l_head, so fills and cancels recycle
+    slots without allocating; a slab doubles when it runs out. Each level is a
+    FIFO linked through o_prev/o_next by slot number. Prices map to level slots
+    per side through a dict, ordered by the same level index as OrderBook.
+
+    Depth queries (get_snapshot, depth) gather the level arrays and work on
+    vectorized slices rather than walking Python objects.
+    Order ids are integers; agent ids are interned into agent_ids.
+    """
+
+    def __init__(self, tick_size: float = None, order_capacity: int = 1024, level_capacity: int = 256, clock=None):
+        # See OrderBook.tick_size: prices are integer ticks in tick mode
+        self.tick_size = tick_size
+        self.clock = clock if clock is not None else LogicalClock()
+        self.counter = 0
+        price_dtype = np.float64 if tick_size is None else np.int64
+
+        # Order slab
+        self.o_id = np.zeros(order_capacity, dtype=np.int64)
+        self.o_size = np.zeros(order_capacity, dtype=np.int64)
+        self.o_agent = np.zeros(order_capacity, dtype=np.int32)
+        self.o_side = np.zeros(order_capacity, dtype=np.int8)
+        self.o_level = np.full(order_capacity, NIL, dtype=np.int32)
+        self.o_prev = np.full(order_capacity, NIL, dtype=np.int32)
+        self.o_next = np.full(order_capacity, NIL, dtype=np.int32)
+        self.o_time = np.zeros(order_capacity, dtype=np.float64)
+        self.orders_used = 0  # high-water mark of the order slab
+        self.free_order = NIL
+
+        # Level slab
+        self.l_price = np.zeros(level_capacity, dtype=price_dtype)
+        self.l_size = np.zeros(level_capacity, dtype=np.int64)
+        self.l_count = np.zeros(level_capacity, dtype=np.int32)
+        self.l_head = np.full(level_capacity, NIL, dtype=np.int32)
+        self.l_tail = np.full(level_capacity, NIL, dtype=np.int32)
+        self.levels_used = 0
+        self.free_level = NIL
+
+        # {price: level slot} per side, ordered by the level index
+        self.bid_levels = {}
+        self.ask_levels = {}
+        if tick_size is None:
+            self.bid_index = LevelIndex(self.bid_levels, descending=True)
+            self.ask_index = LevelIndex(self.ask_levels, descending=False)
+        else:
+            self.bid_index = TickLevelIndex(self.bid_levels, descending=True)
+            self.ask_index = TickLevelIndex(self.ask_levels, descending=False)
+
+        self.slot_of = {}  # {order_id: order slot} for resting orders
+        self.agent_ids = []
+        self.agent_index = {}
+
+        self.total_size = {"bid": 0, "ask": 0}
+        self.order_count = {"bid": 0, "ask": 0}
+        self.fills = FillBuffer()
+        self.changed = None  # see OrderBook.changed
+        # add_order only copies fields out of the Order, so one scratch object serves every new_order
+        self.scratch_order = Order()
+
+    def new_order(self, agent_id: str, size: int):
+        """An Order ready for add_order. Only valid until the next new_order call."""
+        order = self.scratch_order
+        order.agent_id = agent_id
+        order.order_id = None
+        order.size = size
+        return order
+
+    @property
+    def bid_dic(self):
+        return LevelsView(self, self.bid_levels)
+
+    @property
+    def ask_dic(self):
+        return LevelsView(self, self.ask_levels)
+
+    # --- Slab allocation ---
+
+    def _alloc_order(self):
+        slot = self.free_order
+        if slot != NIL:
+            self.free_order = int(self.o_next[slot])
+            return slot
+        if self.orders_used == len(self.o_id):
+            capacity = 2 * len(self.o_id)
+            self.o_id = _grown(self.o_id, capacity)
+            self.o_size = _grown(self.o_size, capacity)
+            self.o_agent = _grown(self.o_agent, capacity)
+            self.o_side = _grown(self.o_side, capacity)
+            self.o_level = _grown(self.o_level, capacity, NIL)
+            self.o_prev = _grown(self.o_prev, capacity, NIL)
+            self.o_next = _grown(self.o_next, capacity, NIL)
+            self.o_time = _grown(self.o_time, capacity)
+        slot = self.orders_used
+        self.orders_used += 1
+        return slot
+
+    def _free_order(self, slot: int):
+        self.o_size[slot] = 0
+        self.o_level[slot] = NIL
+        self.o_prev[slot] = NIL
+        self.o_next[slot] = self.free_order
+        self.free_order = slot
+
+    def _new_level(self, side: str, price):
+        slot = self.free_level
+        if slot != NIL:
+            self.free_level = int(self.l_head[slot])
+        else:
+            if self.levels_used == len(self.l_price):
+                capacity = 2 * len(self.l_price)
+                self.l_price = _grown(self.l_price, capacity)
+                self.l_size = _grown(self.l_size, capacity)
+                self.l_count = _grown(self.l_count, capacity)
+                self.l_head = _grown(self.l_head, capacity, NIL)
+                self.l_tail = _grown(self.l_tail, capacity, NIL)
+            slot = self.levels_used
+            self.levels_used += 1
+
+        self.l_price[slot] = price
+        self.l_size[slot] = 0
+        self.l_count[slot] = 0
+        self.l_head[slot] = NIL
+        self.l_tail[slot] = NIL
+        if side == "bid":
+            self.bid_levels[price] = slot
+            self.bid_index.add(price)
+        else:
+            self.ask_levels[price] = slot
+            self.ask_index.add(price)
+        return slot
+
+    def _remove_level(self, side: str, price):
+        if side == "bid":
+            slot = self.bid_levels.pop(price)
+            self.bid_index.discard(price)
+        else:
+            slot = self.ask_levels.pop(price)
+            self.ask_index.discard(price)
+        self.l_head[slot] = self.free_level
+        self.free_level = slot
+
+    def _unlink(self, slot: int):
+        level = self.o_level[slot]
+        prev, nxt = self.o_prev[slot], self.o_next[slot]
+        if prev == NIL:
+            self.l_head[level] = nxt
+        else:
+            self.o_next[prev] = nxt
+        if nxt == NIL:
+            self.l_tail[level] = prev
+        else:
+            self.o_prev[nxt] = prev
+        self.l_count[level] -= 1
+        self.l_size[level] -= self.o_size[slot]
+
+    # --- Book API ---
+
+    def add_order(self, side: str, price: float, order : Order):
+        self.counter += 1
+        order.order_id = self.counter
+
+        agent = self.agent_index.get(order.agent_id)
+        if agent is None:
+            agent = self.agent_index[order.agent_id] = len(self.agent_ids)
+            self.agent_ids.append(order.agent_id)
+
+        levels = self.bid_levels if side == "bid" else self.ask_levels
+        level = levels.get(price)
+        if level is None:
+            level = self._new_level(side, price)
+
+        slot = self._alloc_order()
+        self.o_id[slot] = self.counter
+        self.o_size[slot] = order.size
+        self.o_agent[slot] = agent
+        self.o_side[slot] = BID if side == "bid" else ASK
+        order.time_stamp = self.clock.now
+        self.o_time[slot] = order.time_stamp
+        self.o_level[slot] = level
+
+        # Append at the tail of the level's FIFO
+        tail = self.l_tail[level]
+        self.o_prev[slot] = tail
+        self.o_next[slot] = NIL
+        if tail == NIL:
+            self.l_head[level] = slot
+        else:
+            self.o_next[tail] = slot
+        self.l_tail[level] = slot
+        self.l_count[level] += 1
+        self.l_size[level] += order.size
+
+        self.slot_of[self.counter] = slot
+        self.total_size[side] += order.size
+        self.order_count[side] += 1
+        if self.changed is not None:
+            self.changed[side].add(price)
+
+    def cancel_order(self, order_id: int):
+        """
+        Removes a resting order from the book in O(1).
+        Returns (side, price, remaining_size) of the cancelled order,
+        or None if the order is not resting (already executed or unknown).
+        """
+        slot = self.slot_of.pop(order_id, None)
+        if slot is None:
+            return None # Order executed already
+
+        side = "bid" if self.o_side[slot] == BID else "ask"
+        level = self.o_level[slot]
+        price = self.l_price[level].item()
+        size = int(self.o_size[slot])
+
+        self._unlink(slot)
+        self._free_order(slot)
+        self.total_size[side] -= size
+        self.order_count[side] -= 1
+        if self.changed is not None:
+            self.changed[side].add(price)
+        if self.l_count[level] == 0:
+            self._remove_level(side, price)
+        return side, price, size
+
+    def sweep(self, side: str, size: int, limit_price: float = None):
+        """
+        Same contract as OrderBook.sweep: takes up to `size` from the opposite side,
+        best price first and FIFO within a level, writing fills to self.fills.
+        Returns the unfilled size.
+        """
+        if side == "bid":
+            book_side, levels, index = "ask", self.ask_levels, self.ask_index
+        else:
+            book_side, levels, index = "bid", self.bid_levels, self.bid_index
+
+        fills = self.fills
+        maker_ids, order_ids, prices, qtys = fills.maker_id, fills.order_id, fills.price, fills.qty
+        n = 0
+        o_size, o_next, o_id, o_agent = self.o_size, self.o_next, self.o_id, self.o_agent
+        l_head, l_size, l_count = self.l_head, self.l_size, self.l_count
+        agent_ids, slot_of = self.agent_ids, self.slot_of
+        changed = self.changed[book_side] if self.changed is not None else None
+        remaining = size
+        filled_orders = 0
+
+        while remaining > 0:
+            price = index.best()
+            if price is None:
+                break # Book side exhausted
+            if limit_price is not None and (price > limit_price if side == "bid" else price < limit_price):
+                break # Best level no longer crosses the limit
+
+            level = levels[price]
+            slot = int(l_head[level])
+            while remaining > 0 and slot != NIL:
+                order_size = int(o_size[slot])
+                qty = order_size if order_size < remaining else remaining
+
+                if n == fills.capacity:
+                    fills.grow()
+                    maker_ids, order_ids, prices, qtys = fills.maker_id, fills.order_id, fills.price, fills.qty
+                maker_ids[n] = agent_ids[o_agent[slot]]
+                order_ids[n] = int(o_id[slot])
+                prices[n] = price
+                qtys[n] = qty
+                n += 1
+
+                remaining -= qty
+                nxt = int(o_next[slot])
+                if qty == order_size:
+                    # Fully filled: pop the head of the level and recycle the slot
+                    l_head[level] = nxt
+                    l_count[level] -= 1
+                    l_size[level] -= qty
+                    del slot_of[int(o_id[slot])]
+                    self._free_order(slot)
+                    filled_orders += 1
+                    slot = nxt
+                else:
+                    o_size[slot] -= qty
+                    l_size[level] -= qty
+
+            if changed is not None:
+                changed.add(price)
+            if slot == NIL:
+                self._remove_level(book_side, price)
+            else:
+                self.o_prev[slot] = NIL
+
+        fills.n = n
+        self.total_size[book_side] -= size - remaining
+        self.order_count[book_side] -= filled_orders
+        return remaining
+
+    def _level_size(self, side: str, price):
+        slot = (self.bid_levels if side == "bid" else self.ask_levels).get(price)
+        return int(self.l_size[slot]) if slot is not None else 0
+
+    def depth(self, side: str, max_levels: int = None):
+        """
+        Price levels of one side as arrays, best price first:
+        (prices, sizes, cumulative_sizes). Gathered and sorted with NumPy.
+        """
+        levels = self.bid_levels if side == "bid" else self.ask_levels
+        slots = np.fromiter(levels.values(), dtype=np.int64, count=len(levels))
+        prices = self.l_price[slots]
+        order = np.argsort(prices, kind="stable")
+        if side == "bid":
+            order = order[::-1]
+        if max_levels is not None:
+            order = order[:max_levels]
+        sizes = self.l_size[slots[order]]
+        return prices[order], sizes, np.cumsum(sizes)
+
+    def snapshot_columns(self):
+        """(meta, columns) of BookBase.snapshot, gathered from the slabs."""
+        live = np.flatnonzero(self.o_level[:self.orders_used] != NIL)
+        live = live[np.argsort(self.o_id[live], kind="stable")]
+        columns = {
+            "side": self.o_side[live],
+            "price": self.l_price[self.o_level[live]],
+            "order_id": self.o_id[live],
+            "agent": self.o_agent[live],
+            "size": self.o_size[live],
+            "time": self.o_time[live],
+        }
+        return self._snapshot_meta(list(self.agent_ids)), columns
+
+    @classmethod
+    def from_columns(cls, meta: dict, columns: dict, clock=None):
+        """
+        A book rebuilt from snapshot columns (see BookBase.restore). The slabs
+        are filled with array operations: order i of the snapshot goes to slot i,
+        level slots are the bid prices then the ask prices, and each level's FIFO is linked
+        in snapshot (order id) order.
+        """
+        n = len(columns["order_id"])
+        side = np.asarray(columns["side"], dtype=np.int8)
+        price = np.asarray(columns["price"], dtype=np.float64 if meta["tick_size"] is None else np.int64)
+        # Level slots: the bid prices first, then the ask prices
+        level = np.empty(n, dtype=np.int64)
+        level_prices = []
+        for value in (BID, ASK):
+            on_side = side == value
+            prices, inverse = np.unique(price[on_side], return_inverse=True)
+            level[on_side] = inverse.reshape(-1) + sum(len(p) for p in level_prices)
+            level_prices.append(prices)
+        num_bid_levels = len(level_prices[0])
+        m = num_bid_levels + len(level_prices[1])
+
+        book = cls(tick_size=meta["tick_size"], order_capacity=max(n, 1024), level_capacity=max(m, 256),
+                   clock=restored_clock(meta, clock))
+        book.counter = meta["counter"]
+        book.agent_ids = list(meta["agents"])
+        book.agent_index = {agent_id: i for i, agent_id in enumerate(book.agent_ids)}
+
+        size = np.asarray(columns["size"], dtype=np.int64)
+        book.o_id[:n] = columns["order_id"]
+        book.o_size[:n] = size
+        book.o_agent[:n] = columns["agent"]
+        book.o_side[:n] = side
+        book.o_time[:n] = columns["time"]
+        book.o_level[:n] = level
+        book.orders_used = n
+
+        # Slots grouped by level, in order id order within each level
+        by_level = np.argsort(level, kind="stable")
+        same = level[by_level[1:]] == level[by_level[:-1]]
+        book.o_next[by_level[:-1][same]] = by_level[1:][same]
+        book.o_prev[by_level[1:][same]] = by_level[:-1][same]
+        count = np.bincount(level, minlength=m)
+        ends = np.cumsum(count)
+        book.l_head[:m] = by_level[ends - count]
+        book.l_tail[:m] = by_level[ends - 1]
+        book.l_count[:m] = count
+        book.l_size[:m] = np.bincount(level, weights=size, minlength=m)
+        book.l_price[:m] = np.concatenate(level_prices)
+        book.levels_used = m
+
+        bid_prices, ask_prices = (prices.tolist() for prices in level_prices)
+        book.bid_levels.update(zip(bid_prices, range(num_bid_levels)))
+        book.ask_levels.update(zip(ask_prices, range(num_bid_levels, m)))
+        for p in bid_prices:
+            book.bid_index.add(p)
+        for p in ask_prices:
+            book.ask_index.add(p)
+        book.slot_of = dict(zip(columns["order_id"].tolist(), range(n)))
+        for name, value in (("bid", BID), ("ask", ASK)):
+            on_side = side == value
+            book.total_size[name] = int(size[on_side].sum())
+            book.order_count[name] = int(on_side.sum())
+        return book
+
+    def get_snapshot(self):
+        """
+        Returns a snapshot of the book for visualization.
+        bids: [(price, size), ...] sorted highest price first
+        asks: [(price, size), ...] sorted lowest price first
+        """
+        bid_prices, bid_sizes, _ = self.depth("bid")
+        ask_prices, ask_sizes, _ = self.depth("ask")
+        bids = list(zip(bid_prices.tolist(), bid_sizes.tolist()))
+        asks = list(zip(ask_prices.tolist(), ask_sizes.tolist()))
+        return bids, asks
@@ -0,0 +1,91 @@
+import random
+import unittest
+import numpy as np
+import match_test
+import order_book_test
+import test_passive_limit
+from agent_logic import Order
+from array_order_book import ArrayOrderBook
+from exchange import Exchange
+from order_book import OrderBook
+
+
+class TestMatchingEngineArray(match_test.TestMatchingEngine):
+    # The existing matching suite, run against the array-backed engine
+    def setUp(self):
+        super().setUp()
+        self.ex = Exchange(book_type="array")
+        self.ex.register_agent(self.alice)
+        self.ex.register_agent(self.bob)
+
+
+class TestPassiveLimitOrderArray(test_passive_limit.TestPassiveLimitOrder):
+    def setUp(self):
+        super().setUp()
+        self.ex = Exchange(book_type="array")
+        self.ex.register_agent(self.alice)
+        self.ex.register_agent(self.bob)
+
+
+class TestArrayLevelIndex(order_book_test.TestLevelIndex):
+    def setUp(self):
+        self.ob = ArrayOrderBook(order_capacity=4, level_capacity=2) # force slab growth
+
+
+class TestArrayDepthFeed(order_book_test.TestDepthFeed):
+    def setUp(self):
+        self.ob = ArrayOrderBook(order_capacity=4, level_capacity=2)
+
+
+class TestSameAsOrderBook(unittest.TestCase):
+    def test_random_flow_matches_dict_book(self):
+        # Identical command streams must give identical fills and depth on both engines
+        rng = random.Random(3)
+        dict_book, array_book = OrderBook(), ArrayOrderBook(order_capacity=8, level_capacity=4)
+        resting = []
+        for _ in range(4000):
+            p = rng.random()
+            side = rng.choice(["bid", "ask"])
+            if p < 0.5:
+                price = round(rng.gauss(100, 3), 1)
+                size = rng.randint(1, 5)
+                agent = f"agent_{rng.randint(1, 5)}"
+                dict_order, array_order = Order(agent_id=agent, size=size), Order(agent_id=agent, size=size)
+                dict_book.add_order(side, price, dict_order)
+                array_book.add_order(side, price, array_order)
+                resting.append((dict_order.order_id, array_order.order_id))
+            elif p < 0.75 and resting:
+                dict_id, array_id = resting.pop(rng.randrange(len(resting)))
+                self.assertEqual(dict_book.cancel_order(dict_id), array_book.cancel_order(array_id))
+            else:
+                limit, size = round(rng.gauss(100, 3), 1), rng.randint(1, 15)
+                dict_trades, dict_left = dict_book.match_limit_order(side, limit, size)
+                array_trades, array_left = array_book.match_limit_order(side, limit, size)
+                self.assertEqual(dict_left, array_left)
+                self.assertEqual([t[:3] for t in dict_trades], [t[:3] for t in array_trades])
+
+            self.assertEqual(dict_book.get_book_stats(), array_book.get_book_stats())
+        self.assertEqual(dict_book.get_snapshot(), array_book.get_snapshot())
+
+    def test_depth_arrays(self):
+        ob = ArrayOrderBook()
+        for price, size in ((99.0, 2), (98.0, 3), (99.0, 1), (97.5, 4)):
+            ob.add_order("bid", price, Order(agent_id="A", size=size))
+        prices, sizes, cumulative = ob.depth("bid", max_levels=2)
+        np.testing.assert_array_equal(prices, [99.0, 98.0])
+        np.testing.assert_array_equal(sizes, [3, 3])
+        np.testing.assert_array_equal(cumulative, [3, 6])
+
+    def test_slots_are_recycled(self):
+        ob = ArrayOrderBook(order_capacity=4, level_capacity=2)
+        for _ in range(100):
+            ob.add_order("ask", 101.0, Order(agent_id="A", size=1))
+            ob.add_order("ask", 102.0, Order(agent_id="A", size=1))
+            ob.market_buy(2)
+        self.assertEqual(ob.orders_used, 2)
+        self.assertEqual(ob.levels_used, 2)
+        self.assertEqual(ob.total_size["ask"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+"""
+Memory cost of resting orders: builds a book with N resting orders spread
+over a fixed number of levels per side and reports bytes per resting order.
+
+    python bench_memory.py [orders] [levels_per_side] [book_type]
+"""
+import random
+import sys
+import tracemalloc
+from exchange import BOOK_TYPES
+from agent_logic import Order
+
+
+def bytes_per_resting_order(book_type: str, num_orders: int, levels_per_side: int):
+    rng = random.Random(0)
+    agent_ids = [f"agent_{i + 1}" for i in range(100)]
+    tracemalloc.start()
+    ob = BOOK_TYPES[book_type]()
+    start, _ = tracemalloc.get_traced_memory()
+    for i in range(num_orders):
+        side = "bid" if i % 2 else "ask"
+        offset = rng.randrange(levels_per_side) * 0.5
+        price = 99.5 - offset if side == "bid" else 100.5 + offset
+        ob.add_order(side, price, Order(agent_id=rng.choice(agent_ids), size=rng.randint(1, 5)))
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (end - start) / num_orders
+
+
+if __name__ == "__main__":
+    num_orders = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    levels_per_side = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    book_types = [sys.argv[3]] if len(sys.argv) > 3 else list(BOOK_TYPES)
+
+    for book_type in book_types:
+        per_order = bytes_per_resting_order(book_type, num_orders, levels_per_side)
+        print(f"{book_type:<6} {num_orders} orders / {levels_per_side} levels per side: {per_order:7.1f} bytes per resting order")
@@ -0,0 +1,317 @@
+"""
+Benchmark suite for the book and the exchange: ops/sec and p50/p99 latency of
+each operation on books of a given depth (levels per side) and queue length
+(orders per level), for every storage engine.
+
+    python bench_suite.py                                  run the default grid
+    python bench_suite.py --save                           ... and store it as the baseline
+    python bench_suite.py --compare                        ... and flag regressions against it
+    python bench_suite.py --depths 10,1000 --queues 1 --book-types array --cases add_order,market
+
+Each operation is timed on its own with perf_counter_ns. Untimed work around
+it puts the book back as it was (an added order is cancelled, a filled one is
+re-added), so every op runs against the same depth. Books are built in tick
+mode (tick 0.01) with size-1 orders from one registered maker, directly through
+add_order, so the maker's ledger locks do not cover them.
+
+The baseline is a JSON file (bench_baseline.json by default) of
+{case key: {"ops_per_sec", "p50_us", "p99_us", "calibration_us"}} plus the
+machine it ran on. calibration_us times a fixed pure-Python workload right
+after each case. --compare flags every case whose p50 latency, relative to
+the calibration, got slower by more than --threshold, and exits with status 1
+if there is any.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import numpy as np
+from agent_logic import Agent
+from exchange import BOOK_TYPES, Exchange
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+MID = 10_000  # ticks; bids sit below it and asks above
+
+
+def build_exchange(book_type: str, depth: int, queue: int):
+    ex = Exchange(tick_size=0.01, book_type=book_type)
+    maker = Agent(id="maker", cash=1e12, inventory=1e12)
+    taker = Agent(id="taker", cash=1e12, inventory=1e12)
+    ex.register_agent(maker)
+    ex.register_agent(taker)
+    book = ex.order_book
+    for i in range(depth):
+        for _ in range(queue):
+            book.add_order("bid", MID - 1 - i, book.new_order("maker", 1))
+            book.add_order("ask", MID + 1 + i, book.new_order("maker", 1))
+    return ex
+
+
+def readd(book, side: str, price):
+    book.add_order(side, price, book.new_order("maker", 1))
+
+
+# --- Cases ---
+# Each takes (exchange, rng, depth) and returns a function running one timed op. The
+# returned function may do untimed setup/cleanup around the timer itself, so it
+# returns the elapsed nanoseconds.
+
+def case_add_order(ex, rng, depth):
+    book = ex.order_book
+
+    def op():
+        side = rng.choice(("bid", "ask"))
+        price = MID - 1 - rng.randrange(depth) if side == "bid" else MID + 1 + rng.randrange(depth)
+        order = book.new_order("maker", 1)
+        t = time.perf_counter_ns()
+        book.add_order(side, price, order)
+        t = time.perf_counter_ns() - t
+        book.cancel_order(book.counter)
+        return t
+    return op
+
+
+def case_cancel_order(ex, rng, depth):
+    book = ex.order_book
+
+    def op():
+        side = rng.choice(("bid", "ask"))
+        price = MID - 1 - rng.randrange(depth) if side == "bid" else MID + 1 + rng.randrange(depth)
+        levels = book.bid_dic if side == "bid" else book.ask_dic
+        order_id = levels[price][0].order_id
+        t = time.perf_counter_ns()
+        book.cancel_order(order_id)
+        t = time.perf_counter_ns() - t
+        readd(book, side, price)
+        return t
+    return op
+
+
+def case_match_limit_order(ex, rng, depth):
+    book = ex.order_book
+
+    def op():
+        if rng.random() < 0.5:
+            side, limit, book_side = "bid", book.get_best_ask(), "ask"
+        else:
+            side, limit, book_side = "ask", book.get_best_bid(), "bid"
+        t = time.perf_counter_ns()
+        book.match_limit_order(side, limit, 1)
+        t = time.perf_counter_ns() - t
+        readd(book, book_side, limit)
+        return t
+    return op
+
+
+def case_market(ex, rng, depth):
+    # market_buy and market_sell alternate at random
+    book = ex.order_book
+
+    def op():
+        buy = rng.random() < 0.5
+        t = time.perf_counter_ns()
+        if buy:
+            book.market_buy(1)
+        else:
+            book.market_sell(1)
+        t = time.perf_counter_ns() - t
+        readd(book, "ask" if buy else "bid", book.fills.price[0])
+        return t
+    return op
+
+
+def case_get_snapshot(ex, rng, depth):
+    book = ex.order_book
+
+    def op():
+        t = time.perf_counter_ns()
+        book.get_snapshot()
+        return time.perf_counter_ns() - t
+    return op
+
+
+def case_exchange_round_trip(ex, rng, depth):
+    # A passive limit order through the exchange (validation, locking, resting) and its cancel
+    book = ex.order_book
+    taker = ex.agents["taker"]
+
+    def op():
+        side = rng.choice(("bid", "ask"))
+        price = 0.01 * (MID - 1 - rng.randrange(depth) if side == "bid" else MID + 1 + rng.randrange(depth))
+        t = time.perf_counter_ns()
+        ex.process_limit_order(taker, side, price, 1)
+        ex.process_cancel_order(taker, book.counter)
+        return time.perf_counter_ns() - t
+    return op
+
+
+def case_exchange_market(ex, rng, depth):
+    # A market order through the exchange: validation, sweep, settlement and the tape
+    book = ex.order_book
+    taker = ex.agents["taker"]
+
+    def op():
+        buy = rng.random() < 0.5
+        t = time.perf_counter_ns()
+        if buy:
+            ex.process_market_buy(taker, 1)
+        else:
+            ex.process_market_sell(taker, 1)
+        t = time.perf_counter_ns() - t
+        readd(book, "ask" if buy else "bid", book.fills.price[0])
+        return t
+    return op
+
+
+CASES = {
+    "add_order": case_add_order,
+    "cancel_order": case_cancel_order,
+    "match_limit_order": case_match_limit_order,
+    "market": case_market,
+    "get_snapshot": case_get_snapshot,
+    "exchange_round_trip": case_exchange_round_trip,
+    "exchange_market": case_exchange_market,
+}
+
+
+def calibration_op():
+    # Fixed pure-Python work (dict, list and arithmetic, like the engine does) used
+    # to measure how fast the machine is running right now
+    data = list(range(300, 0, -1))
+    t = time.perf_counter_ns()
+    index = {x: i for i, x in enumerate(data)}
+    total = 0
+    for x in sorted(data):
+        total += index[x] * x
+    return time.perf_counter_ns() - t
+
+
+def measure(op, ops: int, warmup: int = 50, budget: float = 1.0):
+    """Runs op warmup + up to `ops` times (fewer if they take over `budget` seconds). Returns the stats dict."""
+    for _ in range(warmup):
+        op()
+    times = []
+    deadline = time.perf_counter() + budget
+    for _ in range(ops):
+        times.append(op())
+        if time.perf_counter() > deadline:
+            break
+    times = np.array(times, dtype=np.float64)
+    return {
+        "ops": len(times),
+        "ops_per_sec": 1e9 * len(times) / times.sum(),
+        "p50_us": float(np.percentile(times, 50)) / 1e3,
+        "p99_us": float(np.percentile(times, 99)) / 1e3,
+    }
+
+
+def run(book_types, depths, queues, cases, ops: int = 2000, budget: float = 1.0, rounds: int = 3, out=sys.stdout):
+    """
+    Runs the grid. Returns {key: stats}, keys like "market/array/depth=1000/queue=10".
+    The cases of one book are run `rounds` times, interleaved, and each keeps its
+    fastest round relative to the calibration, so a burst of load on the machine
+    has to hit a case in every round to show up.
+    """
+    results = {}
+    for book_type in book_types:
+        for depth in depths:
+            for queue in queues:
+                ex = build_exchange(book_type, depth, queue)
+                ops_of = {name: CASES[name](ex, random.Random(0), depth) for name in cases}
+                for _ in range(rounds):
+                    for name in cases:
+                        key = f"{name}/{book_type}/depth={depth}/queue={queue}"
+                        stats = measure(ops_of[name], ops, budget=budget / rounds)
+                        stats["calibration_us"] = measure(calibration_op, 200, warmup=10)["p50_us"]
+                        best = results.get(key)
+                        if best is None or stats["p50_us"] / stats["calibration_us"] < best["p50_us"] / best["calibration_us"]:
+                            results[key] = stats
+                for name in cases:
+                    key = f"{name}/{book_type}/depth={depth}/queue={queue}"
+                    stats = results[key]
+                    if out is not None:
+                        print(f"{key:<50} {stats['ops_per_sec']:12,.0f} ops/s  p50 {stats['p50_us']:9.2f} us"
+                              f"  p99 {stats['p99_us']:9.2f} us", file=out)
+    return results
+
+
+def environment():
+    return {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+            "processor": platform.processor(), "date": time.strftime("%Y-%m-%d")}
+
+
+def save_baseline(path: str, results: dict):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=1, sort_keys=True)
+
+
+def load_baseline(path: str):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(results: dict, baseline: dict, threshold: float = 0.25):
+    """
+    [(key, ratio, status)] for every case in both, ratio = speed now / baseline.
+    Speed is measured on the p50 latency, which scheduler and GC outliers move
+    much less than the mean, and divided by the calibration workload timed right
+    after the case, so a machine that is slower overall (another host, CPU
+    throttling, noisy neighbours) does not read as a regression.
+    status is "REGRESSION" below 1 - threshold, "faster" above 1 + threshold, else "ok".
+    """
+    report = []
+    for key, stats in results.items():
+        if key not in baseline:
+            continue
+        base = baseline[key]
+        ratio = (base["p50_us"] / stats["p50_us"]) * (stats["calibration_us"] / base["calibration_us"])
+        if ratio < 1 - threshold:
+            status = "REGRESSION"
+        elif ratio > 1 + threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        report.append((key, ratio, status))
+    return report
+
+
+def _csv(text: str, kind=str):
+    return [kind(x) for x in text.split(",") if x]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Matching engine and exchange benchmarks")
+    parser.add_argument("--book-types", type=_csv, default=list(BOOK_TYPES))
+    parser.add_argument("--depths", type=lambda s: _csv(s, int), default=[10, 1000, 100_000], help="levels per side")
+    parser.add_argument("--queues", type=lambda s: _csv(s, int), default=[1, 10], help="orders per level")
+    parser.add_argument("--cases", type=_csv, default=list(CASES))
+    parser.add_argument("--ops", type=int, default=2000, help="timed ops per case")
+    parser.add_argument("--budget", type=float, default=1.0, help="max seconds per case, over all rounds")
+    parser.add_argument("--rounds", type=int, default=3, help="interleaved rounds per case, the fastest is kept")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="flag regressions against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative slowdown (on p50) that counts as a regression")
+    args = parser.parse_args()
+
+    unknown = [c for c in args.cases if c not in CASES]
+    if unknown:
+        parser.error(f"unknown cases {unknown}, expected some of {list(CASES)}")
+
+    results = run(args.book_types, args.depths, args.queues, args.cases, args.ops, args.budget, args.rounds)
+
+    if args.compare:
+        report = compare(results, load_baseline(args.baseline), args.threshold)
+        print(f"\nAgainst {args.baseline} (threshold {args.threshold:.0%}):")
+        for key, ratio, status in report:
+            print(f"{key:<50} {ratio:6.2f}x  {status}")
+        regressions = [key for key, _, status in report if status == "REGRESSION"]
+        print(f"{len(regressions)} regression(s) in {len(report)} compared cases")
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+    if args.compare and regressions:
+        sys.exit(1)
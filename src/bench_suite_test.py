@@ -0,0 +1,31 @@
+import random
+import unittest
+import bench_suite
+
+
+class TestBenchSuite(unittest.TestCase):
+    def test_cases_leave_the_book_as_it_was(self):
+        for book_type in ("dict", "array"):
+            ex = bench_suite.build_exchange(book_type, depth=5, queue=2)
+            before = ex.get_snapshot()
+            for name, case in bench_suite.CASES.items():
+                with self.subTest(book_type=book_type, case=name):
+                    op = case(ex, random.Random(0), 5)
+                    for _ in range(20):
+                        self.assertGreater(op(), 0)
+                    self.assertEqual(ex.get_snapshot(), before)
+
+    def test_compare(self):
+        baseline = {"a": {"p50_us": 10.0, "calibration_us": 5.0},
+                    "b": {"p50_us": 10.0, "calibration_us": 5.0},
+                    "c": {"p50_us": 10.0, "calibration_us": 5.0}}
+        results = {"a": {"p50_us": 15.0, "calibration_us": 5.0},   # slower on a machine as fast as before
+                   "b": {"p50_us": 15.0, "calibration_us": 7.5},   # the whole machine is slower
+                   "c": {"p50_us": 5.0, "calibration_us": 5.0},
+                   "new": {"p50_us": 1.0, "calibration_us": 5.0}}
+        report = {key: status for key, _, status in bench_suite.compare(results, baseline, threshold=0.25)}
+        self.assertEqual(report, {"a": "REGRESSION", "b": "ok", "c": "faster"})
+
+
+if __name__ == "__main__":
+    unittest.main()
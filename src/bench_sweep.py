@@ -0,0 +1,47 @@
+"""
+Benchmark for the sweep engine: a market order or marketable limit order
+that walks through every level of a deep book.
+
+    python bench_sweep.py [levels] [orders_per_level] [repeats]
+"""
+import sys
+import time
+from agent_logic import Order
+from order_book import OrderBook
+
+
+def build_book(levels: int, orders_per_level: int):
+    ob = OrderBook()
+    for i in range(levels):
+        price = 100.0 + i * 0.5
+        for _ in range(orders_per_level):
+            ob.add_order("ask", price, Order(agent_id="maker", size=2))
+    return ob
+
+
+def time_sweep(name: str, sweep, levels: int, orders_per_level: int, repeats: int):
+    total_size = levels * orders_per_level * 2
+    elapsed = 0.0
+    for _ in range(repeats):
+        ob = build_book(levels, orders_per_level)
+        start = time.perf_counter()
+        try:
+            sweep(ob, total_size)
+        except RecursionError:
+            print(f"{name:<22} RecursionError (sweep too deep)")
+            return
+        elapsed += time.perf_counter() - start
+
+    per_sweep = elapsed / repeats
+    fills_per_sec = levels * orders_per_level / per_sweep
+    print(f"{name:<22} {per_sweep * 1e3:8.3f} ms/sweep  {fills_per_sec:12,.0f} fills/s")
+
+
+if __name__ == "__main__":
+    levels = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    orders_per_level = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    print(f"Sweeping {levels} levels x {orders_per_level} orders, {repeats} repeats")
+    time_sweep("market_buy", lambda ob, size: ob.market_buy(size), levels, orders_per_level, repeats)
+    time_sweep("match_limit_order", lambda ob, size: ob.match_limit_order("bid", 1e9, size), levels, orders_per_level, repeats)
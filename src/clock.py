@@ -0,0 +1,58 @@
+"""
+Clocks for the exchange. The Exchange ticks its clock once per incoming command;
+the order book and the trade tape just read clock.now, so timestamps cost an
+attribute lookup instead of a time.time() syscall per fill.
+"""
+import time
+
+
+class LogicalClock:
+    """Sequence-number time: every command advances it by one. Deterministic across replays."""
+
+    def __init__(self, start: int = 0):
+        self.now = start
+
+    def tick(self):
+        self.now += 1
+        return self.now
+
+
+class SimulatedClock:
+    """
+    Simulated event time, driven by the simulation: advance()/advance_to() move
+    it forward explicitly and each command adds `step` (0 = time only moves
+    when the driver says so). Never goes backwards.
+    """
+
+    def __init__(self, start: float = 0.0, step: float = 0.0):
+        self.now = start
+        self.step = step
+
+    def tick(self):
+        self.now += self.step
+        return self.now
+
+    def advance(self, dt: float):
+        if dt < 0:
+            raise ValueError("Simulated time cannot go backwards")
+        self.now += dt
+        return self.now
+
+    def advance_to(self, t: float):
+        if t < self.now:
+            raise ValueError(f"Simulated time cannot go backwards ({t} < {self.now})")
+        self.now = t
+        return self.now
+
+
+class WallClock:
+    """Wall time (time.time()), still read once per command and clamped to be monotonic."""
+
+    def __init__(self):
+        self.now = time.time()
+
+    def tick(self):
+        t = time.time()
+        if t > self.now:
+            self.now = t
+        return self.now
@@ -0,0 +1,84 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from agent_logic import Agent
+from events import EventSink, INFO, WARNING, read_events
+from exchange import Exchange, ACCEPTED, REJECT_INSUFFICIENT_CASH, REJECT_NO_LIQUIDITY, REJECT_UNKNOWN_ORDER
+
+
+class TestEvents(unittest.TestCase):
+    def setUp(self):
+        self.alice = Agent(id="Alice", cash=1000.0, inventory=10)
+        self.bob = Agent(id="Bob", cash=1000.0, inventory=10)
+
+    def make_exchange(self, events: EventSink = None):
+        ex = Exchange(events=events)
+        ex.register_agent(self.alice)
+        ex.register_agent(self.bob)
+        return ex
+
+    def trade(self, ex):
+        codes = [
+            ex.process_market_buy(self.bob, 1),                  # nothing to buy
+            ex.process_limit_order(self.alice, "ask", 100.0, 5),
+            ex.process_limit_order(self.bob, "bid", 100.0, 50),  # 5000 > 1000 cash
+            ex.process_limit_order(self.bob, "bid", 100.0, 2),
+            ex.process_cancel_order(self.bob, 12345),
+            ex.process_market_sell(self.alice, 1),               # no bids
+        ]
+        return codes
+
+    def test_return_codes(self):
+        codes = self.trade(self.make_exchange())
+        self.assertEqual(codes, [REJECT_NO_LIQUIDITY, ACCEPTED, REJECT_INSUFFICIENT_CASH, ACCEPTED,
+                                 REJECT_UNKNOWN_ORDER, REJECT_NO_LIQUIDITY])
+
+    def test_disabled_by_default(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            ex = self.make_exchange()
+            self.trade(ex)
+        self.assertEqual(out.getvalue(), "")
+        self.assertEqual(sum(ex.events.counts.values()), 0)
+
+    def test_counts_and_levels(self):
+        ex = self.make_exchange(EventSink(INFO))
+        self.trade(ex)
+        self.assertEqual(ex.events.counts["register"], 2)
+        self.assertEqual(ex.events.counts["trade"], 1)
+        self.assertEqual(ex.events.counts["reject.no_liquidity"], 2)
+        self.assertEqual(ex.events.counts["reject.insufficient_cash"], 1)
+        self.assertEqual(ex.events.counts["reject.unknown_order"], 1)
+
+        ex = self.make_exchange(EventSink(WARNING))
+        self.trade(ex)
+        self.assertNotIn("trade", ex.events.counts)
+        self.assertEqual(ex.events.counts["reject.no_liquidity"], 2)
+
+    def test_echo(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.trade(self.make_exchange(EventSink(INFO, echo=True)))
+        self.assertIn("Agent Alice registered.", out.getvalue())
+        self.assertIn("Trade: Bob bought 2 @ avg 100.00", out.getvalue())
+
+    def test_files_round_trip(self):
+        for format in ("jsonl", "pickle"):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "events." + format)
+                with EventSink(INFO, path=path, format=format, flush_every=3) as sink:
+                    self.trade(self.make_exchange(sink))
+                events = list(read_events(path, format))
+            self.assertEqual(len(events), 7)
+            self.assertEqual([e["kind"] for e in events][:3], ["register", "register", "reject.no_liquidity"])
+            trade = next(e for e in events if e["kind"] == "trade")
+            self.assertEqual((trade["agent"], trade["qty"], trade["avg_price"]), ("Bob", 2, 100.0))
+            self.assertEqual(trade["level"], INFO)
+            # Stamped from the exchange clock: registration happens before any command
+            self.assertEqual(events[0]["time"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,206 +1,577 @@
 import dataclasses
+import math
+import numpy as np
 from order_book import OrderBook
-from agent_logic import Agent, Order
+from array_order_book import ArrayOrderBook
+from agent_logic import Agent
+from agent_ledger import AgentLedger
+from trade_tape import TradeTape, BUY, SELL
+from clock import LogicalClock
+from events import EventSink, INFO, WARNING, ERROR
+from journal import CommandJournal, LIMIT, MARKET, CANCEL
+from snapshot import read_snapshot, write_snapshot
 
+# Storage engines the exchange can run on; both expose the same book API
+BOOK_TYPES = {"dict": OrderBook, "array": ArrayOrderBook}
 
+# Outcome codes of the processing core (ACCEPTED, or why a command was rejected)
+ACCEPTED = 0
+REJECT_INSUFFICIENT_CASH = 1
+REJECT_INSUFFICIENT_INVENTORY = 2
+REJECT_NO_LIQUIDITY = 3
+REJECT_UNKNOWN_ORDER = 4
+REJECT_UNKNOWN_AGENT = 5
+REJECT_BAD_COMMAND = 6
+
+# Event kind suffix per reject code ("reject.insufficient_cash", ...)
+REJECT_NAMES = {
+    REJECT_INSUFFICIENT_CASH: "insufficient_cash",
+    REJECT_INSUFFICIENT_INVENTORY: "insufficient_inventory",
+    REJECT_NO_LIQUIDITY: "no_liquidity",
+    REJECT_UNKNOWN_ORDER: "unknown_order",
+    REJECT_UNKNOWN_AGENT: "unknown_agent",
+    REJECT_BAD_COMMAND: "bad_command",
+}
+
+
+@dataclasses.dataclass
+class BatchResult:
+    """
+    Columnar outcome of Exchange.submit_batch. Every row carries the index of
+    the command it came from; prices are in price units.
+    """
+    fill_command : np.ndarray    # index of the taker's command
+    fill_maker : np.ndarray      # maker agent id
+    fill_taker : np.ndarray      # taker agent id
+    fill_order_id : np.ndarray   # maker's resting order id
+    fill_price : np.ndarray
+    fill_qty : np.ndarray
+    reject_command : np.ndarray
+    reject_reason : np.ndarray   # REJECT_* code
+    resting_command : np.ndarray
+    resting_order_id : np.ndarray  # id of the remainder left in the book
 
 
 @dataclasses.dataclass
 class Exchange:
     
 
-    def __init__(self):
-        self.order_book = OrderBook()
+    def __init__(self, tick_size: float = None, book_type: str = "dict", clock=None, minor_units: int = None,
+                 events: EventSink = None, journal: CommandJournal = None, instruments=None):
+        # With a tick_size the book runs in tick mode: it only sees integer ticks and
+        # the exchange converts prices on the way in and trade prices on the way out.
+        # book_type picks the storage engine: "dict" (OrderBook) or "array" (ArrayOrderBook).
+        if book_type not in BOOK_TYPES:
+            raise ValueError(f"Unknown book_type {book_type!r}, expected one of {list(BOOK_TYPES)}")
+        # The clock is ticked once per incoming command; the book and the tape only read clock.now.
+        # Default is a LogicalClock (sequence numbers), use clock.WallClock() for wall time.
+        self.clock = clock if clock is not None else LogicalClock()
+        self.book_type = book_type
+        self.order_book = BOOK_TYPES[book_type](tick_size=tick_size, clock=self.clock)
         self.agents = {}  # The Phonebook: {agent_id: Agent_Object}
+        # Balances live in the ledger's arrays, one row per registered agent; the Agent
+        # objects become views of their row. minor_units=100 keeps cash in integer cents.
+        self.ledger = AgentLedger(minor_units=minor_units)
+        # Row per registered agent, also used by the columnar records (agent_ids[i] -> id)
+        self.agent_index = self.ledger.index
+        self.agent_ids = self.ledger.ids
+        # Every fill on this exchange. Replace with TradeTape(capacity, ring=True) to bound memory.
+        self.tape = TradeTape()
+        # Registrations, trades and rejects of the process_* API. Off by default;
+        # EventSink(INFO, echo=True) prints them, path=... writes them to a file.
+        self.events = events if events is not None else EventSink()
+        if self.events.clock is None:
+            self.events.clock = self.clock
+        # Every command processed (registrations included) is appended to the journal;
+        # journal.replay() rebuilds this exchange from the file.
+        self.journal = journal
+        if journal is not None:
+            journal.write_header(tick_size, book_type, minor_units)
+        # Optional instruments.Instruments: latency histograms and counters, see stats().
+        # They wrap this instance's methods, so without them nothing is measured or checked.
+        self.instruments = instruments
+        if instruments is not None:
+            instruments.attach(self)
 
     def register_agent(self, agent: Agent):
-        """Add an agent to the exchange so we can pay them later."""
+        """
+        Add an agent to the exchange so we can pay them later. Registering the
+        same Agent again changes nothing; another Agent with a registered id
+        is a ValueError (it would reset the row and strand the first one's orders).
+        """
+        self._bind(agent)
+        if self.events.level <= INFO:
+            self.events.emit(INFO, "register", agent=agent.id)
+
+    def _bind(self, agent: Agent):
+        # Opens the agent's ledger row from its current balances and makes it a view of that row
+        registered = self.agents.get(agent.id)
+        if registered is not None and registered is not agent:
+            raise ValueError(f"Agent id {agent.id!r} is already registered by another Agent object")
         self.agents[agent.id] = agent
-        print(f"Agent {agent.id} registered.")
+        cash, inventory = agent.cash, agent.inventory
+        i = self.ledger.add(agent.id, cash, inventory)
+        self.ledger.bind(agent, i)
+        if self.journal is not None:
+            self.journal.append_register(agent.id, i, self.clock.now, cash, inventory)
+        return i
 
-    def process_limit_order(self, agent: Agent, side: str, price: float, size: int):
-        # 1. Validation Checks & Initial Deduction
-        # We deduct the FULL worst-case cost/inventory upfront. 
+    def _row(self, agent: Agent):
+        # Ledger row of an agent; agents that were never registered get one on first use
+        if agent._ledger is self.ledger:
+            return agent._ledger_index
+        return self._bind(agent)
+
+    # The hot paths read balances straight from the agent's ledger row rather
+    # than through the Agent.cash/inventory properties
+    def _cash(self, agent: Agent):
+        return self.ledger.from_units(self.ledger.cash[agent._ledger_index])
+
+    def _inventory(self, agent: Agent):
+        return float(self.ledger.inventory[agent._ledger_index])
+
+    # --- Processing core ---
+    # These run a command without reporting it and return an ACCEPTED/REJECT_* code.
+    # Fills of the command are left in self.order_book.fills.
+
+    def _settle_makers(self, side: str, taker: int):
+        # Pays the passive side of every fill in the book's fill buffer, as one
+        # np.add.at per ledger column, and records the fills on the tape.
+        # taker is the taker's ledger row. Returns the total traded value.
+        book = self.order_book
+        fills = book.fills
+        n = fills.n
+        if not n:
+            return 0.0
+
+        ledger = self.ledger
+        index = ledger.index
+        to_units = ledger.to_units
+        prices = fills.price[:n]
+        if book.tick_size is not None:
+            prices = [book.to_price(p) for p in prices]
+        qtys = fills.qty[:n]
+        makers = [index.get(m, -1) for m in fills.maker_id[:n]]
+        self.tape.record(makers, taker, prices, qtys, self.clock.now, BUY if side == "bid" else SELL, n)
+
+        if n == 1:
+            # Most sweeps hit a single order: two scalar updates beat building arrays for np.add.at
+            maker, qty = makers[0], qtys[0]
+            value = prices[0] * qty
+            if maker < 0:
+                if self.events.level <= ERROR:
+                    self.events.emit(ERROR, "maker_not_found", maker=fills.maker_id[0])
+            elif side == "bid":
+                ledger.cash[maker] += to_units(value)
+                ledger.locked_inventory[maker] -= qty
+            else:
+                ledger.inventory[maker] += qty
+                ledger.locked_cash[maker] -= to_units(value)
+            return value
+
+        if -1 in makers:
+            known = [k for k in range(n) if makers[k] >= 0]
+            if self.events.level <= ERROR:
+                for k in range(n):
+                    if makers[k] < 0:
+                        self.events.emit(ERROR, "maker_not_found", maker=fills.maker_id[k])
+            makers = [makers[k] for k in known]
+            prices = [prices[k] for k in known]
+            qtys = [qtys[k] for k in known]
+        makers = np.array(makers, dtype=np.int64)
+        qtys = np.array(qtys, dtype=np.float64)
+        values = np.array(prices, dtype=np.float64) * qtys
+        total_value = float(values.sum())
+
+        if side == "bid":
+            # We are Buying, Makers were Selling (Ask).
+            # Makers delivered 'qty' (locked when their asks rested) and receive Cash.
+            np.add.at(ledger.cash, makers, to_units(values))
+            np.add.at(ledger.locked_inventory, makers, -qtys)
+        else:
+            # We are Selling, Makers were Buying (Bid).
+            # Makers paid cash (locked when their bids rested) and receive Inventory.
+            np.add.at(ledger.inventory, makers, qtys)
+            np.add.at(ledger.locked_cash, makers, -to_units(values))
+        return total_value
+
+    def _limit(self, agent: Agent, side: str, price: float, size: int):
+        """Returns (code, quantity_traded, value_traded, resting_order_id)."""
+        self.clock.tick()
+        ledger = self.ledger
+        i = self._row(agent)
+        if self.journal is not None:
+            self.journal.append(LIMIT, side, i, self.clock.now, price, size)
+        # Not-a-number and infinite prices, and empty or negative sizes, would corrupt the ledger
+        if not (0 < price < math.inf and size > 0):
+            return REJECT_BAD_COMMAND, 0, 0.0, None
+        # 0. Snap the price to the book's grid (no-op without a tick size)
+        book = self.order_book
+        ticks = book.to_ticks(price)
+        price = book.to_price(ticks)
+
+        # 1. Validation Checks & Initial Lock
+        # We lock the FULL worst-case cost/inventory upfront.
         # We will refund any savings if we match at a better price.
         if side == "bid":
-            if agent.cash < price * size:
-                print(f'Insufficient cash for bid order. Needed {price*size}, has {agent.cash}')
-                return
-            agent.cash -= price * size
-            
+            cost = ledger.to_units(price * size)
+            if ledger.cash[i] < cost:
+                return REJECT_INSUFFICIENT_CASH, 0, 0.0, None
+            ledger.cash[i] -= cost
+            ledger.locked_cash[i] += cost
         elif side == "ask":
-            if agent.inventory < size:
-                print('Insufficient inventory for ask order.')
-                return
-            agent.inventory -= size
-        
+            if ledger.inventory[i] < size:
+                return REJECT_INSUFFICIENT_INVENTORY, 0, 0.0, None
+            ledger.inventory[i] -= size
+            ledger.locked_inventory[i] += size
+        else:
+            return REJECT_BAD_COMMAND, 0, 0.0, None
+
         # 2. Match against Order Book
-        trades, remaining_size = self.order_book.match_limit_order(side, price, size)
-        
-        # 3. Process Trades (Settlement)
+        remaining_size = book.sweep(side, size, ticks)
+
+        # 3. Process Trades (Settlement with the makers)
         total_quantity_traded = size - remaining_size
-        total_cost_or_revenue = 0.0
-        
-        for trade in trades:
-            maker_id, trade_price, qty, _ = trade
-            trade_value = trade_price * qty
-            total_cost_or_revenue += trade_value
-            
-            # Settle with the Maker (The Passive Party)
-            if maker_id in self.agents:
-                maker = self.agents[maker_id]
-                if side == "bid":
-                    # We are Buying, Maker was Selling (Ask).
-                    # Maker delivered 'qty' (already locked in book).
-                    # Maker receives Cash.
-                    maker.cash += trade_value
-                    # We also need to remove this from Maker's active_orders if completely filled?
-                    # The OrderBook handles removal from book, but Agent logic needs to know.
-                    # Currently Agent.active_orders tracks [side, price, size]. WIll address this if needed.
-                elif side == "ask":
-                    # We are Selling, Maker was Buying (Bid).
-                    # Maker paid cash (already locked).
-                    # Maker receives Inventory.
-                    maker.inventory += qty
-            else:
-                print(f"CRITICAL: Maker {maker_id} not found.")
+        total_cost_or_revenue = self._settle_makers(side, i)
 
         # 4. Settle with Taker (The Active Party - 'agent')
         if side == "bid":
-            # We bought 'total_quantity_traded'
-            agent.inventory += total_quantity_traded
-            
-            # Refund difference: We paid 'price * total_quantity_traded' upfront for this portion.
-            # Actual cost was 'total_cost_or_revenue'.
-            # refund = (price * traded) - actual_cost
-            cost_for_traded_portion = price * total_quantity_traded
-            refund = cost_for_traded_portion - total_cost_or_revenue
-            agent.cash += refund
-            
-            if total_quantity_traded > 0:
-                print(f"Trade: {agent.id} bought {total_quantity_traded} @ avg {total_cost_or_revenue/total_quantity_traded:.2f}")
-
-        elif side == "ask":
-            # We sold 'total_quantity_traded'
-            # We gain Cash = total_cost_or_revenue
-            agent.cash += total_cost_or_revenue
-            
-            if total_quantity_traded > 0:
-                print(f"Trade: {agent.id} sold {total_quantity_traded} @ avg {total_cost_or_revenue/total_quantity_traded:.2f}")
+            # We bought 'total_quantity_traded'. Release the lock on that portion
+            # (what is left locked covers exactly the resting remainder) and
+            # refund the difference to what it actually cost.
+            released = cost - ledger.to_units(price * remaining_size)
+            ledger.locked_cash[i] -= released
+            ledger.cash[i] += released - ledger.to_units(total_cost_or_revenue)
+            ledger.inventory[i] += total_quantity_traded
+        else:
+            # We sold 'total_quantity_traded', we gain Cash = total_cost_or_revenue
+            ledger.locked_inventory[i] -= total_quantity_traded
+            ledger.cash[i] += ledger.to_units(total_cost_or_revenue)
 
         # 5. Add Remainder to Book (if any)
+        order_id = None
         if remaining_size > 0:
-            order_obj = Order(agent_id=agent.id, size=remaining_size)
-            self.order_book.add_order(side, price, order_obj)
-            
+            order_obj = book.new_order(agent.id, remaining_size)
+            book.add_order(side, ticks, order_obj)
+            order_id = order_obj.order_id
+
             # 6. Update Agent Record (for the passive remainder)
             # Only track the portion that sits in the book
-            agent.active_orders[order_obj.order_id] = [side, price, remaining_size]
-
-    def process_cancel_order(self, agent: Agent, order_id: str):
-        if order_id not in agent.active_orders:
-            print(f"Order ID {order_id} not found in agent {agent.id}'s active orders.")
-            return
-        
-        side, price, size = agent.active_orders[order_id]
-        
-        # Cancel from Order Book
-        self.order_book.cancel_order(side, price, order_id)
-        
-        # Refund Agent
+            agent.active_orders[order_id] = [side, price, remaining_size]
+
+        return ACCEPTED, total_quantity_traded, total_cost_or_revenue, order_id
+
+    def _market(self, agent: Agent, side: str, size: int):
+        """side "bid" buys, "ask" sells. Returns (code, quantity_traded, value_traded)."""
+        self.clock.tick()
+        ledger = self.ledger
+        i = self._row(agent)
+        if self.journal is not None:
+            self.journal.append(MARKET, side, i, self.clock.now, size=size)
+        if not size > 0:
+            return REJECT_BAD_COMMAND, 0, 0.0
+        book = self.order_book
         if side == "bid":
-            agent.cash += price * size
+            #check if the buyer has enough cash to buy the maximum possible at the worst price
+            best_ask = book.to_price(book.get_best_ask())
+            if best_ask is None:
+                return REJECT_NO_LIQUIDITY, 0, 0.0
+            if ledger.cash[i] < ledger.to_units(1.5*best_ask * size):
+                return REJECT_INSUFFICIENT_CASH, 0, 0.0
+
+            remaining_size = book.sweep("bid", size)
+            total_cost = self._settle_makers("bid", i)
+            total_quantity = size - remaining_size
+            # Charge the buyer (can go into debt if the sweep walked far up the book)
+            ledger.cash[i] -= ledger.to_units(total_cost)
+            ledger.inventory[i] += total_quantity
+            return ACCEPTED, total_quantity, total_cost
+
         elif side == "ask":
-            agent.inventory += size
-        
+            #check if the seller has enough inventory to sell
+            if book.get_best_bid() is None:
+                return REJECT_NO_LIQUIDITY, 0, 0.0
+            if ledger.inventory[i] < 1.5*size: # simplistic check
+                return REJECT_INSUFFICIENT_INVENTORY, 0, 0.0
+
+            remaining_size = book.sweep("ask", size)
+            total_revenue = self._settle_makers("ask", i)
+            total_quantity = size - remaining_size
+            # Credit the seller
+            ledger.cash[i] += ledger.to_units(total_revenue)
+            ledger.inventory[i] -= total_quantity
+            return ACCEPTED, total_quantity, total_revenue
+
+        return REJECT_BAD_COMMAND, 0, 0.0
+
+    def _cancel(self, agent: Agent, order_id):
+        self.clock.tick()
+        known = order_id in agent.active_orders
+        if self.journal is not None:
+            # Order ids are positive ints; anything unknown (possibly not an int) is journaled as -1
+            self.journal.append(CANCEL, None, self._row(agent), self.clock.now, arg=order_id if known else -1)
+        if not known:
+            return REJECT_UNKNOWN_ORDER
+
+        # Cancel from Order Book (looked up by id, no need for side/price)
+        cancelled = self.order_book.cancel_order(order_id)
+
+        # Unlock whatever was still resting.
+        # Nothing to refund if the order was fully executed in the meantime.
+        if cancelled is not None:
+            ledger = self.ledger
+            i = self._row(agent)
+            side, price, size = cancelled
+            price = self.order_book.to_price(price)
+            if side == "bid":
+                amount = ledger.to_units(price * size)
+                ledger.locked_cash[i] -= amount
+                ledger.cash[i] += amount
+            elif side == "ask":
+                ledger.locked_inventory[i] -= size
+                ledger.inventory[i] += size
+
         # Remove from Agent's Active Orders
         del agent.active_orders[order_id]
+        return ACCEPTED
+
+    # --- Single-order API ---
+
+    # These return the ACCEPTED/REJECT_* code and report through self.events.
+    # A market order's fills are in self.order_book.last_trades() afterwards.
+
+    def _reject(self, code: int, agent: Agent, command: str, **details):
+        if self.events.level <= WARNING:
+            self.events.emit(WARNING, "reject." + REJECT_NAMES[code], agent=agent.id, command=command, **details)
+
+    def _trade(self, agent: Agent, action: str, quantity, value: float):
+        if self.events.level <= INFO:
+            self.events.emit(INFO, "trade", agent=agent.id, action=action, qty=quantity,
+                             avg_price=value/quantity if quantity else 0.0)
+
+    def process_limit_order(self, agent: Agent, side: str, price: float, size: int):
+        code, traded, value, _ = self._limit(agent, side, price, size)
+
+        if code == REJECT_INSUFFICIENT_CASH:
+            self._reject(code, agent, "limit", side=side, needed=price*size, cash=self._cash(agent))
+        elif code != ACCEPTED:
+            self._reject(code, agent, "limit", side=side, size=size)
+        elif traded > 0:
+            self._trade(agent, "bought" if side == "bid" else "sold", traded, value)
+        return code
+
+    def process_cancel_order(self, agent: Agent, order_id: int):
+        code = self._cancel(agent, order_id)
+        if code != ACCEPTED:
+            self._reject(code, agent, "cancel", order_id=order_id)
+        return code
 
     def process_market_buy(self, buyer: Agent, size: int):
+        code, quantity, cost = self._market(buyer, "bid", size)
 
-        #check if the buyer has enough cash to buy the maximum possible at the worst price
-        best_ask = self.order_book.get_best_ask()
-        if best_ask is None:
-            print("No asks in the book to buy from.")
-            return
-        worst_case_cost = 1.5*best_ask * size
-        if buyer.cash < worst_case_cost:
-            print(f"Buyer {buyer.id} has insufficient cash ({buyer.cash}) for market buy of size {size} (worst case cost: {worst_case_cost}).")
-            return
-        # 1. EXECUTE
-        trade_log = self.order_book.market_buy(size)
-        
-        total_cost = 0.0
-        total_quantity_received = 0.0
-
-        # 2. SETTLE
-        for trade in trade_log:
-            seller_id, price, qty_traded, _  = trade
-            
-            trade_value = price * qty_traded
-            
-            # Pay the Seller
-            if seller_id in self.agents:
-                seller_obj = self.agents[seller_id]
-                seller_obj.cash += trade_value
-            else:
-                print(f"CRITICAL ERROR: Seller {seller_id} not found in registry! Money lost.")
-            
-            total_cost += trade_value
-            total_quantity_received += qty_traded
-
-        # 3. CHARGE THE BUYER
-        if buyer.cash >= total_cost:
-            buyer.cash -= total_cost
-            buyer.inventory += total_quantity_received
-            print(f"Trade: {buyer.id} bought {total_quantity_received} @ avg ${total_cost/total_quantity_received if total_quantity_received else 0:.2f}")
+        if code == REJECT_INSUFFICIENT_CASH:
+            worst_case_cost = 1.5*self.order_book.to_price(self.order_book.get_best_ask()) * size
+            self._reject(code, buyer, "market_buy", size=size, cash=self._cash(buyer), worst_case_cost=worst_case_cost)
+        elif code != ACCEPTED:
+            self._reject(code, buyer, "market_buy", size=size)
         else:
-            print(f"WARNING: Buyer {buyer.id} went into debt by ${total_cost - buyer.cash}")
-            
-            buyer.cash -= total_cost
-            buyer.inventory += total_quantity_received
+            self._trade(buyer, "bought", quantity, cost)
+            if self.events.level <= WARNING:
+                # The buy cost more than the cash it had: now in debt
+                cash = self._cash(buyer)
+                if cash < 0:
+                    self.events.emit(WARNING, "debt", agent=buyer.id, amount=-cash)
+        return code
 
-        return trade_log
-    
     def process_market_sell(self, seller: Agent, size: int):
+        code, quantity, revenue = self._market(seller, "ask", size)
+
+        if code == REJECT_INSUFFICIENT_INVENTORY:
+            self._reject(code, seller, "market_sell", size=size, inventory=self._inventory(seller))
+        elif code != ACCEPTED:
+            self._reject(code, seller, "market_sell", size=size)
+        else:
+            self._trade(seller, "sold", quantity, revenue)
+        return code
+
+    # --- Batch API ---
 
-        #check if the seller has enough inventory to sell
-        best_bid = self.order_book.get_best_bid()
-        if best_bid is None:
-            print("No bids in the book to sell to.")
-            return
-
-        if seller.inventory < 1.5*size: # simplistic check
-            print(f"Seller {seller.id} has insufficient inventory ({seller.inventory}) for market sell of size {size}.")
-            return
-        # 1. EXECUTE
-        trade_log = self.order_book.market_sell(size)
-        
-        total_revenue = 0.0
-        total_quantity_sold = 0.0
-
-        # 2. SETTLE
-        for trade in trade_log:
-            buyer_id, price, qty_traded, _  = trade
-            
-            trade_value = price * qty_traded
-            
-            # Pay the seller
-            if buyer_id in self.agents:
-                buyer_obj = self.agents[buyer_id]
-                buyer_obj.inventory += qty_traded
+    def submit_batch(self, commands):
+        """
+        Processes a sequence of commands in order, without emitting events:
+            ("limit", agent_id, side, price, size)
+            ("market", agent_id, side, size)     side "bid" buys, "ask" sells
+            ("cancel", agent_id, order_id)
+        Each command sees the effects of the ones before it. Returns a BatchResult.
+        """
+        agents = self.agents
+        book = self.order_book
+        fills = book.fills
+        to_price = book.to_price
+        tick_mode = book.tick_size is not None
+
+        fill_command, fill_maker, fill_taker, fill_order_id, fill_price, fill_qty = [], [], [], [], [], []
+        reject_command, reject_reason = [], []
+        resting_command, resting_order_id = [], []
+
+        for i, command in enumerate(commands):
+            kind = command[0]
+            agent = agents.get(command[1])
+            if agent is None:
+                code = REJECT_UNKNOWN_AGENT
+            elif kind == "limit":
+                code, _, _, order_id = self._limit(agent, command[2], command[3], command[4])
+                if order_id is not None:
+                    resting_command.append(i)
+                    resting_order_id.append(order_id)
+            elif kind == "market":
+                code = self._market(agent, command[2], command[3])[0]
+            elif kind == "cancel":
+                code = self._cancel(agent, command[2])
             else:
-                print(f"CRITICAL ERROR: Buyer {buyer_id} not found in registry! Inventory lost.")
-            
-            total_revenue += trade_value
-            total_quantity_sold += qty_traded
+                code = REJECT_BAD_COMMAND
+
+            if code != ACCEPTED:
+                reject_command.append(i)
+                reject_reason.append(code)
+                continue
+
+            n = fills.n
+            if kind != "cancel" and n:
+                # Copy this command's fills out of the book's buffer before the next sweep reuses it
+                fill_command.extend([i] * n)
+                fill_maker.extend(fills.maker_id[:n])
+                fill_taker.extend([agent.id] * n)
+                fill_order_id.extend(fills.order_id[:n])
+                prices = fills.price[:n]
+                fill_price.extend([to_price(p) for p in prices] if tick_mode else prices)
+                fill_qty.extend(fills.qty[:n])
+
+        return BatchResult(
+            fill_command=np.array(fill_command, dtype=np.int64),
+            fill_maker=np.array(fill_maker, dtype=object),
+            fill_taker=np.array(fill_taker, dtype=object),
+            fill_order_id=np.array(fill_order_id, dtype=np.int64),
+            fill_price=np.array(fill_price, dtype=np.float64),
+            fill_qty=np.array(fill_qty, dtype=np.float64),
+            reject_command=np.array(reject_command, dtype=np.int64),
+            reject_reason=np.array(reject_reason, dtype=np.int8),
+            resting_command=np.array(resting_command, dtype=np.int64),
+            resting_order_id=np.array(resting_order_id, dtype=np.int64),
+        )
+
+    # --- Snapshots ---
+
+    def snapshot(self, path: str):
+        """
+        Saves the whole exchange to path in the columnar format of snapshot.py:
+        configuration, clock time, the book's resting orders, the ledger rows,
+        every agent's active_orders and the trade tape.
+        Exchange.restore(path) rebuilds it; the events sink and journal are not saved.
+        """
+        ledger = self.ledger
+        n = len(ledger)
+        book_meta, book_columns = self.order_book.snapshot_columns()
+        columns = {"book." + name: values for name, values in book_columns.items()}
+        for name in ("cash", "locked_cash", "inventory", "locked_inventory"):
+            columns["ledger." + name] = getattr(ledger, name)[:n]
+
+        # active_orders can still list orders that have since been filled, so they are saved as they are
+        active = [(i, order_id, entry) for i, agent_id in enumerate(ledger.ids)
+                  for order_id, entry in self.agents[agent_id].active_orders.items()]
+        columns["active.agent"] = np.array([i for i, _, _ in active], dtype=np.int32)
+        columns["active.order_id"] = np.array([order_id for _, order_id, _ in active], dtype=np.int64)
+        columns["active.side"] = np.array([entry[0] == "ask" for _, _, entry in active], dtype=np.int8)
+        columns["active.price"] = np.array([entry[1] for _, _, entry in active], dtype=np.float64)
+        columns["active.size"] = np.array([entry[2] for _, _, entry in active]) if active else np.zeros(0, dtype=np.int64)
+
+        for name, values in self.tape.columns().items():
+            columns["tape." + name] = values
+
+        meta = {
+            "tick_size": self.order_book.tick_size,
+            "book_type": self.book_type,
+            "minor_units": ledger.minor_units,
+            "now": self.clock.now,
+            "agents": list(ledger.ids),
+            "book": book_meta,
+            "tape": {"chunk_size": self.tape.chunk_size, "ring": self.tape.ring, "total": self.tape.total},
+        }
+        write_snapshot(path, meta, columns)
+
+    @classmethod
+    def restore(cls, path: str, clock=None, events: EventSink = None, agents=None):
+        """
+        A new Exchange in the state saved by snapshot(path). Restoring copies the
+        memory-mapped columns, so every restore of one file is an independent fork.
+        clock (a new LogicalClock by default) is set to the snapshot's time.
+        agents: Agent objects to bind to their saved rows by id (e.g. fresh copies
+        of a simulation's agents, keeping their class); plain Agents are made for the rest.
+        """
+        meta, columns = read_snapshot(path)
+        ex = cls(tick_size=meta["tick_size"], book_type=meta["book_type"], clock=clock,
+                 minor_units=meta["minor_units"], events=events)
+        ex.clock.now = meta["now"]
+        book_columns = {name[5:]: values for name, values in columns.items() if name.startswith("book.")}
+        ex.order_book = BOOK_TYPES[ex.book_type].from_columns(meta["book"], book_columns, ex.clock)
+
+        given = {agent.id: agent for agent in agents} if agents is not None else {}
+        ledger = ex.ledger
+        for agent_id in meta["agents"]:
+            agent = given.get(agent_id)
+            if agent is None:
+                agent = Agent(id=agent_id)
+            agent.active_orders = {}
+            ex.agents[agent_id] = agent
+            ledger.bind(agent, ledger.add(agent_id))
+        n = len(ledger)
+        for name in ("cash", "locked_cash", "inventory", "locked_inventory"):
+            getattr(ledger, name)[:n] = columns["ledger." + name]
+
+        ids = ledger.ids
+        rows = zip(columns["active.agent"].tolist(), columns["active.order_id"].tolist(), columns["active.side"].tolist(),
+                   columns["active.price"].tolist(), columns["active.size"].tolist())
+        for i, order_id, ask, price, size in rows:
+            ex.agents[ids[i]].active_orders[order_id] = ["ask" if ask else "bid", price, size]
+
+        tape = meta["tape"]
+        ex.tape = TradeTape(tape["chunk_size"], tape["ring"])
+        ex.tape.extend({name: columns["tape." + name] for name, _ in TradeTape.COLUMNS})
+        ex.tape.total = tape["total"]
+        return ex
+
+    def stats(self):
+        """
+        Operational stats: the instruments' latency histograms and counters
+        (see Instruments.stats) when the exchange has instruments, else just the
+        book depth.
+        """
+        if self.instruments is not None:
+            return self.instruments.stats()
+        return {"depth": self.order_book.depth_stats()}
+
+    def get_book_stats(self):
+        """(mid_price, spread, imbalance) of the book, in price units."""
+        book = self.order_book
+        mid_price, spread, imbalance = book.get_book_stats()
+        return book.to_price(mid_price), book.to_price(spread), imbalance
 
-        # 3. CREDIT THE SELLER
-        seller.cash += total_revenue
-        seller.inventory -= total_quantity_sold
-        print(f"Trade: {seller.id} sold {total_quantity_sold} @ avg ${total_revenue/total_quantity_sold if total_quantity_sold else 0:.2f}")
+    def get_snapshot(self):
+        """The book's get_snapshot() with prices converted back from ticks."""
+        book = self.order_book
+        bids, asks = book.get_snapshot()
+        if book.tick_size is None:
+            return bids, asks
+        return ([(book.to_price(p), s) for p, s in bids],
+                [(book.to_price(p), s) for p, s in asks])
 
-        return trade_log
+    def pop_depth_changes(self):
+        """The book's pop_depth_changes() with prices converted back from ticks."""
+        book = self.order_book
+        changes = book.pop_depth_changes()
+        if book.tick_size is None:
+            return changes
+        return [(side, book.to_price(p), s) for side, p, s in changes]
 
 
 # def initialise_agents(num_agents : int):
@@ -211,8 +582,8 @@ class Exchange:
 if __name__ == "__main__":
     print("--- STARTING SIMULATION ---\n")
     
-    # 1. Setup Exchange
-    ex = Exchange()
+    # 1. Setup Exchange (echoing its events to the terminal)
+    ex = Exchange(events=EventSink(INFO, echo=True))
     
     # 2. Create Agents
     alice = Agent(id="Alice", cash=1000, inventory=10)
@@ -0,0 +1,233 @@
+import contextlib
+import io
+import random
+import unittest
+import numpy as np
+from agent_logic import Agent
+from trade_tape import TradeTape
+from clock import LogicalClock, SimulatedClock, WallClock
+from exchange import (Exchange, REJECT_INSUFFICIENT_CASH, REJECT_NO_LIQUIDITY, REJECT_UNKNOWN_AGENT, REJECT_UNKNOWN_ORDER,
+                      REJECT_BAD_COMMAND)
+
+
+def make_agents(n: int):
+    return [Agent(id=f"agent_{i}", cash=10_000.0, inventory=100.0) for i in range(n)]
+
+
+def random_commands(rng, agent_ids, n: int):
+    # Mixed limit/market/cancel flow; cancels refer to order ids that may or may not exist
+    commands = []
+    for _ in range(n):
+        agent_id = rng.choice(agent_ids)
+        side = rng.choice(["bid", "ask"])
+        p = rng.random()
+        if p < 0.6:
+            commands.append(("limit", agent_id, side, round(rng.gauss(100, 2), 2), rng.randint(1, 5)))
+        elif p < 0.8:
+            commands.append(("market", agent_id, side, rng.randint(1, 5)))
+        else:
+            commands.append(("cancel", agent_id, rng.randint(1, len(commands) + 1)))
+    return commands
+
+
+class TestSubmitBatch(unittest.TestCase):
+    def run_sequential(self, ex, agents, commands):
+        by_id = {a.id: a for a in agents}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for command in commands:
+                kind, agent = command[0], by_id[command[1]]
+                if kind == "limit":
+                    ex.process_limit_order(agent, *command[2:])
+                elif kind == "market" and command[2] == "bid":
+                    ex.process_market_buy(agent, command[3])
+                elif kind == "market":
+                    ex.process_market_sell(agent, command[3])
+                else:
+                    ex.process_cancel_order(agent, command[2])
+
+    def check_same_as_sequential(self, **exchange_args):
+        rng = random.Random(42)
+        commands = random_commands(rng, [f"agent_{i}" for i in range(8)], 3000)
+
+        sequential_ex, sequential_agents = Exchange(**exchange_args), make_agents(8)
+        batch_ex, batch_agents = Exchange(**exchange_args), make_agents(8)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for a, b in zip(sequential_agents, batch_agents):
+                sequential_ex.register_agent(a)
+                batch_ex.register_agent(b)
+
+        self.run_sequential(sequential_ex, sequential_agents, commands)
+        result = batch_ex.submit_batch(commands)
+
+        for a, b in zip(sequential_agents, batch_agents):
+            self.assertAlmostEqual(a.cash, b.cash)
+            self.assertEqual(a.inventory, b.inventory)
+            self.assertEqual(a.active_orders, b.active_orders)
+        self.assertEqual(sequential_ex.get_snapshot(), batch_ex.get_snapshot())
+
+        # Every command is accounted for: rejected, resting and/or filled
+        self.assertGreater(len(result.fill_command), 0)
+        self.assertGreater(len(result.reject_command), 0)
+        self.assertTrue(np.all(np.diff(result.fill_command) >= 0))
+        resting = set(result.resting_order_id.tolist())
+        for agent in batch_agents:
+            self.assertTrue(set(agent.active_orders) <= resting)
+
+    def test_bad_prices_and_sizes_are_rejected(self):
+        bad = [("limit", "agent_0", "bid", 100.0, -5), ("limit", "agent_0", "bid", 100.0, 0),
+               ("limit", "agent_0", "bid", float("nan"), 1), ("limit", "agent_0", "bid", float("inf"), 1),
+               ("limit", "agent_0", "ask", -1.0, 1), ("limit", "agent_0", "ask", 0.0, 1),
+               ("market", "agent_0", "bid", -3), ("market", "agent_0", "ask", 0)]
+        for exchange_args in ({}, {"book_type": "array", "tick_size": 0.01}):
+            with self.subTest(**exchange_args):
+                ex, agents = Exchange(**exchange_args), make_agents(2)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for agent in agents:
+                        ex.register_agent(agent)
+                ex.submit_batch([("limit", "agent_1", "ask", 101.0, 5), ("limit", "agent_1", "bid", 99.0, 5)])
+                book = ex.get_snapshot()
+
+                result = ex.submit_batch(bad)
+                self.assertEqual(result.reject_command.tolist(), list(range(len(bad))))
+                self.assertEqual(set(result.reject_reason.tolist()), {REJECT_BAD_COMMAND})
+                self.assertEqual(ex.process_limit_order(agents[0], "bid", float("nan"), 1), REJECT_BAD_COMMAND)
+                self.assertEqual(ex.process_market_buy(agents[0], -1), REJECT_BAD_COMMAND)
+                self.assertEqual(ex.process_market_sell(agents[0], 0), REJECT_BAD_COMMAND)
+
+                self.assertEqual((agents[0].cash, agents[0].inventory), (10_000.0, 100.0))
+                self.assertEqual((agents[0].locked_cash, agents[0].locked_inventory), (0.0, 0.0))
+                self.assertEqual(ex.get_snapshot(), book)
+
+    def test_same_as_sequential(self):
+        self.check_same_as_sequential()
+
+    def test_same_as_sequential_array_ticks(self):
+        self.check_same_as_sequential(book_type="array", tick_size=0.01)
+
+    def test_columns(self):
+        ex = Exchange()
+        alice, bob = Agent(id="Alice", cash=1000, inventory=10), Agent(id="Bob", cash=1000, inventory=10)
+        with contextlib.redirect_stdout(io.StringIO()):
+            ex.register_agent(alice)
+            ex.register_agent(bob)
+
+        result = ex.submit_batch([
+            ("limit", "Alice", "ask", 100.0, 3),   # rests
+            ("market", "Bob", "ask", 1),           # no bids
+            ("limit", "Bob", "bid", 101.0, 5),     # fills 3 @ 100, rests 2 @ 101
+            ("limit", "Bob", "bid", 500.0, 5),     # too expensive
+            ("cancel", "Bob", 99),                 # unknown order
+            ("market", "Carol", "bid", 1),         # unknown agent
+            ("cancel", "Bob", 2),
+        ])
+        self.assertEqual(result.fill_command.tolist(), [2])
+        self.assertEqual(result.fill_maker.tolist(), ["Alice"])
+        self.assertEqual(result.fill_taker.tolist(), ["Bob"])
+        self.assertEqual(result.fill_order_id.tolist(), [1])
+        self.assertEqual(result.fill_price.tolist(), [100.0])
+        self.assertEqual(result.fill_qty.tolist(), [3])
+        self.assertEqual(result.resting_command.tolist(), [0, 2])
+        self.assertEqual(result.resting_order_id.tolist(), [1, 2])
+        self.assertEqual(result.reject_command.tolist(), [1, 3, 4, 5])
+        self.assertEqual(result.reject_reason.tolist(),
+                         [REJECT_NO_LIQUIDITY, REJECT_INSUFFICIENT_CASH, REJECT_UNKNOWN_ORDER, REJECT_UNKNOWN_AGENT])
+        self.assertEqual(bob.cash, 1000 - 300)
+        self.assertEqual(bob.active_orders, {})
+
+
+class TestTradeTape(unittest.TestCase):
+    def fill(self, tape, n, start=0):
+        prices = [100.0 + start + i for i in range(n)]
+        tape.record(list(range(n)), 7, prices, [1.0] * n, float(start), 1, n)
+
+    def test_chunks_grow(self):
+        tape = TradeTape(chunk_size=4)
+        for k in range(5):
+            self.fill(tape, 3, start=3 * k)
+        self.assertEqual(len(tape), 15)
+        self.assertEqual(len(tape.chunks), 4)
+        self.assertEqual(tape.column("price").tolist(), [100.0 + i for i in range(15)])
+        self.assertTrue(np.all(tape.column("taker") == 7))
+
+    def test_ring_keeps_latest(self):
+        tape = TradeTape(chunk_size=4, ring=True)
+        for k in range(3):
+            self.fill(tape, 3, start=3 * k)
+        self.assertEqual(len(tape), 4)
+        self.assertEqual(tape.total, 9)
+        self.assertEqual(tape.column("price").tolist(), [105.0, 106.0, 107.0, 108.0])
+
+    def test_analytics(self):
+        tape = TradeTape()
+        tape.record([0, 1], 2, [100.0, 102.0], [1.0, 3.0], 0.5, 1, 2)
+        tape.record([0], 1, [99.0], [2.0], 1.2, -1, 1)
+        tape.record([2], 0, [101.0], [4.0], 1.7, 1, 1)
+        self.assertEqual(tape.volume(), 10.0)
+        self.assertEqual(tape.signed_volume(), 6.0)
+        self.assertAlmostEqual(tape.vwap(), (100 + 306 + 198 + 404) / 10)
+        bars = tape.ohlc(1.0)
+        self.assertEqual(bars["time"].tolist(), [0.0, 1.0])
+        self.assertEqual(bars["open"].tolist(), [100.0, 99.0])
+        self.assertEqual(bars["high"].tolist(), [102.0, 101.0])
+        self.assertEqual(bars["low"].tolist(), [100.0, 99.0])
+        self.assertEqual(bars["close"].tolist(), [102.0, 101.0])
+        self.assertEqual(bars["volume"].tolist(), [4.0, 6.0])
+
+    def test_exchange_records_every_fill(self):
+        ex, agents = Exchange(tick_size=0.01), make_agents(8)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for agent in agents:
+                ex.register_agent(agent)
+        result = ex.submit_batch(random_commands(random.Random(9), [a.id for a in agents], 2000))
+
+        columns = ex.tape.columns()
+        self.assertEqual(len(ex.tape), len(result.fill_command))
+        self.assertEqual([ex.agent_ids[i] for i in columns["maker"]], result.fill_maker.tolist())
+        self.assertEqual([ex.agent_ids[i] for i in columns["taker"]], result.fill_taker.tolist())
+        np.testing.assert_allclose(columns["price"], result.fill_price)
+        np.testing.assert_array_equal(columns["qty"], result.fill_qty)
+        self.assertTrue(np.all(np.diff(columns["timestamp"]) >= 0))
+
+
+class TestClock(unittest.TestCase):
+    def run_flow(self, clock):
+        ex, agents = Exchange(clock=clock), make_agents(8)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for agent in agents:
+                ex.register_agent(agent)
+        ex.submit_batch(random_commands(random.Random(4), [a.id for a in agents], 1000))
+        return ex
+
+    def test_logical_time_is_one_tick_per_command(self):
+        ex = self.run_flow(LogicalClock())
+        self.assertEqual(ex.clock.now, 1000)
+        timestamps = ex.tape.column("timestamp")
+        self.assertTrue(np.all(np.diff(timestamps) >= 0))
+        for level in ex.order_book.bid_dic.values():
+            for order in level:
+                self.assertTrue(1 <= order.time_stamp <= 1000)
+
+    def test_replays_are_identical(self):
+        first, second = self.run_flow(LogicalClock()), self.run_flow(LogicalClock())
+        for name, column in first.tape.columns().items():
+            np.testing.assert_array_equal(column, second.tape.column(name))
+
+    def test_simulated_clock(self):
+        clock = SimulatedClock(start=10.0, step=0.5)
+        ex = self.run_flow(clock)
+        self.assertEqual(clock.now, 10.0 + 0.5 * 1000)
+        clock.advance_to(600.0)
+        with self.assertRaises(ValueError):
+            clock.advance_to(599.0)
+        with self.assertRaises(ValueError):
+            clock.advance(-1.0)
+        self.assertGreater(len(ex.tape), 0)
+
+    def test_wall_clock_is_monotonic(self):
+        clock = WallClock()
+        readings = [clock.tick() for _ in range(1000)]
+        self.assertEqual(readings, sorted(readings))
+
+
+if __name__ == '__main__':
+    unittest.main()
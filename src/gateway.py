@@ -0,0 +1,275 @@
+"""
+asyncio order-entry gateway: many TCP (or Unix socket) clients trade on one
+Exchange through a newline-delimited text protocol.
+
+Requests, one per line, fields separated by spaces. tag is any token the
+client picks to match the replies to its request:
+    R tag agent_id cash inventory     register a new agent, owned by this connection
+    L tag agent_id side price size    limit order, side bid or ask
+    M tag agent_id side size          market order, bid buys and ask sells
+    C tag agent_id order_id           cancel
+    S tag                             gateway and exchange stats
+Replies:
+    T tag price qty                   a fill of request tag (the taker's side), before its ack
+    A tag code order_id               ack: code 0 = accepted, else the exchange's REJECT_* code;
+                                      order_id of the remainder left in the book, 0 if none
+    F order_id price qty              a resting order of an agent this connection owns was filled
+    S tag {json}                      reply to S
+    E tag message                     malformed request (including sizes <= 0 and prices that are
+                                      not positive and finite) or an R for a taken agent_id
+
+A connection may only trade for agents it registered (anything else is
+acked with REJECT_UNKNOWN_AGENT). An agent_id is registered once: R for an
+id that exists is an error, except from its owner, for whom it is a no-op.
+Agents of a closed connection stay registered and cannot be taken over.
+There is no authentication.
+
+Every connection's reader parses requests into one queue. A single matching
+task takes everything queued (up to max_batch), runs the orders through
+Exchange.submit_batch in arrival order, and writes each connection's replies
+with one write per batch. Readers wait for their writes to drain before
+reading more, so a client that does not read its replies is throttled.
+
+    python gateway.py [--host 127.0.0.1] [--port 8765 | --unix PATH] [--book-type array] [--tick-size 0.01]
+gateway_load.py is the matching load generator.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import math
+from agent_logic import Agent
+from exchange import Exchange, ACCEPTED, REJECT_UNKNOWN_AGENT, BOOK_TYPES
+
+ORDER_KINDS = {b"L": "limit", b"M": "market", b"C": "cancel"}
+
+
+def _price(field: bytes):
+    price = float(field)
+    if not (math.isfinite(price) and price > 0):
+        raise ValueError("price must be positive and finite")
+    return price
+
+
+def _size(field: bytes):
+    size = int(field)
+    if size <= 0:
+        raise ValueError("size must be positive")
+    return size
+
+
+def _balance(field: bytes):
+    amount = float(field)
+    if not (math.isfinite(amount) and amount >= 0):
+        raise ValueError("balances must be non-negative and finite")
+    return amount
+
+
+def _num(x):
+    # 100.0 -> "100", 99.5 -> "99.5": short, and exact since repr round-trips
+    return repr(int(x)) if x == int(x) else repr(x)
+
+
+class Session:
+    """One client connection: its writer and the replies queued for it in this batch."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.out = []
+        self.agents = set()
+        self.closed = False
+
+
+class Gateway:
+
+    def __init__(self, exchange: Exchange = None, max_batch: int = 4096):
+        self.exchange = exchange if exchange is not None else Exchange()
+        self.max_batch = max_batch
+        self.pending = collections.deque()  # (session, tag, request) in arrival order
+        self.wakeup = asyncio.Event()
+        self.owner = {}     # {agent_id: Session}
+        self.dirty = set()  # sessions with replies to write
+        self.sessions = 0
+        self.requests = 0
+        self.batches = 0
+        self.server = None
+        self.matcher = None
+
+    # --- Connections ---
+
+    async def handle(self, reader, writer):
+        session = Session(writer)
+        self.sessions += 1
+        partial = b""
+        try:
+            while True:
+                data = await reader.read(1 << 16)
+                if not data:
+                    break
+                lines = (partial + data).split(b"\n")
+                partial = lines.pop()
+                for line in lines:
+                    self.parse(session, line)
+                self.wakeup.set()
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            session.closed = True
+            self.sessions -= 1
+            for agent_id in session.agents:
+                if self.owner.get(agent_id) is session:
+                    del self.owner[agent_id]  # its orders stay in the book, fills are no longer reported
+            writer.close()
+
+    def parse(self, session: Session, line: bytes):
+        fields = line.split()
+        if not fields:
+            return
+        kind = fields[0]
+        tag = fields[1].decode(errors="replace") if len(fields) > 1 else "-"
+        try:
+            if kind == b"L":
+                request = ("limit", fields[2].decode(), fields[3].decode(), _price(fields[4]), _size(fields[5]))
+            elif kind == b"M":
+                request = ("market", fields[2].decode(), fields[3].decode(), _size(fields[4]))
+            elif kind == b"C":
+                request = ("cancel", fields[2].decode(), int(fields[3]))
+            elif kind == b"R":
+                request = ("register", fields[2].decode(), _balance(fields[3]), _balance(fields[4]))
+            elif kind == b"S":
+                request = ("stats",)
+            else:
+                request = ("error", f"unknown request {kind.decode(errors='replace')!r}")
+        except (IndexError, UnicodeDecodeError):
+            request = ("error", "malformed " + line.decode(errors="replace"))
+        except ValueError as e:
+            request = ("error", f"{e}: {line.decode(errors='replace')}")
+        # Errors go through the queue too, so replies keep the order of the requests
+        self.pending.append((session, tag, request))
+
+    # --- Matching loop ---
+
+    async def run_matching(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while self.pending:
+                n = min(len(self.pending), self.max_batch)
+                batch = [self.pending.popleft() for _ in range(n)]
+                self.process(batch)
+                self.flush()
+                # Let the connections read more before taking the next batch
+                await asyncio.sleep(0)
+
+    def process(self, batch: list):
+        """Runs one batch: consecutive orders go to submit_batch together, other requests in between."""
+        self.batches += 1
+        self.requests += len(batch)
+        orders = []
+        for item in batch:
+            session, tag, request = item
+            if request[0] in ("limit", "market", "cancel"):
+                if self.owner.get(request[1]) is session:
+                    orders.append(item)
+                else:
+                    self._reply(session, f"A {tag} {REJECT_UNKNOWN_AGENT} 0\n")
+                continue
+            if orders:
+                self._run_orders(orders)
+                orders = []
+            if request[0] == "register":
+                _, agent_id, cash, inventory = request
+                if agent_id in session.agents:
+                    # Re-attaching an agent this connection already owns leaves its balances and orders alone
+                    self._reply(session, f"A {tag} {ACCEPTED} 0\n")
+                elif agent_id in self.exchange.agents:
+                    self._reply(session, f"E {tag} agent {agent_id} is already registered\n")
+                else:
+                    self.exchange.register_agent(Agent(id=agent_id, cash=cash, inventory=inventory))
+                    self.owner[agent_id] = session
+                    session.agents.add(agent_id)
+                    self._reply(session, f"A {tag} {ACCEPTED} 0\n")
+            elif request[0] == "stats":
+                self._reply(session, f"S {tag} {json.dumps(self.stats(), default=float)}\n")
+            else:
+                self._reply(session, f"E {tag} {request[1]}\n")
+        if orders:
+            self._run_orders(orders)
+
+    def _run_orders(self, items: list):
+        result = self.exchange.submit_batch([request for _, _, request in items])
+        codes = dict(zip(result.reject_command.tolist(), result.reject_reason.tolist()))
+        resting = dict(zip(result.resting_command.tolist(), result.resting_order_id.tolist()))
+        fills = list(zip(result.fill_command.tolist(), result.fill_maker.tolist(), result.fill_order_id.tolist(),
+                         result.fill_price.tolist(), result.fill_qty.tolist()))
+        owner = self.owner
+        k = 0
+        for i, (session, tag, _) in enumerate(items):
+            out = session.out
+            # Fills are grouped by command, in command order
+            while k < len(fills) and fills[k][0] == i:
+                _, maker, order_id, price, qty = fills[k]
+                price, qty = _num(price), _num(qty)
+                out.append(f"T {tag} {price} {qty}\n")
+                maker_session = owner.get(maker)
+                if maker_session is not None:
+                    self._reply(maker_session, f"F {order_id} {price} {qty}\n")
+                k += 1
+            out.append(f"A {tag} {codes.get(i, ACCEPTED)} {resting.get(i, 0)}\n")
+            self.dirty.add(session)
+
+    def _reply(self, session: Session, line: str):
+        session.out.append(line)
+        self.dirty.add(session)
+
+    def flush(self):
+        for session in self.dirty:
+            if not session.closed:
+                session.writer.write("".join(session.out).encode())
+            session.out.clear()
+        self.dirty.clear()
+
+    def stats(self):
+        return {"sessions": self.sessions, "requests": self.requests, "batches": self.batches,
+                "exchange": self.exchange.stats()}
+
+    # --- Server ---
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765, unix: str = None):
+        """Starts listening (port 0 picks a free port) and the matching task. Returns the asyncio server."""
+        if unix is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path=unix)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        self.matcher = asyncio.create_task(self.run_matching())
+        return self.server
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.matcher.cancel()
+
+
+async def main(args):
+    exchange = Exchange(tick_size=args.tick_size, book_type=args.book_type)
+    gateway = Gateway(exchange, max_batch=args.max_batch)
+    server = await gateway.start(args.host, args.port, args.unix)
+    where = args.unix if args.unix is not None else "%s:%d" % server.sockets[0].getsockname()[:2]
+    print(f"Gateway listening on {where} ({args.book_type} book)", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Order-entry gateway in front of an Exchange")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--book-type", default="dict", choices=list(BOOK_TYPES))
+    parser.add_argument("--tick-size", type=float)
+    parser.add_argument("--max-batch", type=int, default=4096)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
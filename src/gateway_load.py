@@ -0,0 +1,169 @@
+"""
+Load generator for gateway.py: client processes that each register an agent
+and stream random limit/market/cancel orders to the gateway, keeping up to
+`window` requests in flight, and measure ack latency and throughput.
+
+    python gateway_load.py --spawn-server [--clients 4] [--orders 20000] [--window 64]
+    python gateway_load.py --port 8765            (against a gateway already running)
+--spawn-server starts a gateway in a subprocess for the run.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import random
+import subprocess
+import sys
+import time
+import numpy as np
+
+
+async def connect(host: str, port: int, unix: str = None):
+    if unix is not None:
+        return await asyncio.open_unix_connection(unix)
+    return await asyncio.open_connection(host, port)
+
+
+async def run_client(name: str, num_orders: int, host: str = "127.0.0.1", port: int = 8765, unix: str = None,
+                     window: int = 64, seed: int = 0):
+    """
+    One client: registers agent `name` and sends num_orders orders, at most
+    `window` unacknowledged at a time. Returns a dict of counts, the elapsed
+    time and the ack latencies in microseconds.
+    """
+    reader, writer = await connect(host, port, unix)
+    rng = random.Random(seed)
+    in_flight = asyncio.Semaphore(window)
+    sent = {}      # tag -> send time
+    resting = []   # order ids this client may cancel
+    latencies = []
+    counts = {"acks": 0, "rejects": 0, "fills": 0, "maker_fills": 0}
+    done = asyncio.Event()
+
+    async def read_replies():
+        partial = b""
+        while counts["acks"] < num_orders + 1:
+            data = await reader.read(1 << 16)
+            if not data:
+                break
+            lines = (partial + data).split(b"\n")
+            partial = lines.pop()
+            now = time.perf_counter()
+            for line in lines:
+                fields = line.split()
+                kind = fields[0]
+                if kind == b"A":
+                    counts["acks"] += 1
+                    start = sent.pop(fields[1], None)
+                    if start is not None:
+                        latencies.append((now - start) * 1e6)
+                        in_flight.release()
+                    if fields[2] != b"0":
+                        counts["rejects"] += 1
+                    elif fields[3] != b"0":
+                        resting.append(int(fields[3]))
+                elif kind == b"T":
+                    counts["fills"] += 1
+                elif kind == b"F":
+                    counts["maker_fills"] += 1
+                elif kind == b"E":
+                    raise RuntimeError(line.decode())
+        done.set()
+
+    replies = asyncio.create_task(read_replies())
+    writer.write(f"R reg {name} 1e12 1e12\n".encode())
+    start = time.perf_counter()
+    for k in range(num_orders):
+        await in_flight.acquire()
+        side = rng.choice(("bid", "ask"))
+        p = rng.random()
+        if p < 0.6:
+            line = f"L {k} {name} {side} {round(rng.gauss(100, 2), 2)} {rng.randint(1, 5)}\n"
+        elif p < 0.8 or not resting:
+            line = f"M {k} {name} {side} {rng.randint(1, 5)}\n"
+        else:
+            line = f"C {k} {name} {resting.pop(rng.randrange(len(resting)))}\n"
+        sent[str(k).encode()] = time.perf_counter()
+        writer.write(line.encode())
+        if k % 32 == 0:
+            await writer.drain()
+    await writer.drain()
+    await done.wait()
+    elapsed = time.perf_counter() - start
+    await replies
+    writer.close()
+    await writer.wait_closed()
+    return dict(counts, name=name, elapsed=elapsed, latencies_us=latencies)
+
+
+async def fetch_stats(host: str, port: int, unix: str = None):
+    reader, writer = await connect(host, port, unix)
+    writer.write(b"S stats\n")
+    line = await reader.readline()
+    writer.close()
+    await writer.wait_closed()
+    return line.decode().split(" ", 2)[2]
+
+
+def _client_process(args: tuple):
+    return asyncio.run(run_client(*args))
+
+
+async def probe(host: str, port: int, unix: str = None):
+    _, writer = await asyncio.wait_for(connect(host, port, unix), 1.0)
+    writer.close()
+    await writer.wait_closed()
+
+
+def wait_for_server(host: str, port: int, unix: str = None, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            asyncio.run(probe(host, port, unix))
+            return
+        except OSError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load generator for gateway.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="connect to this Unix socket path instead of TCP")
+    parser.add_argument("--clients", type=int, default=4, help="client processes")
+    parser.add_argument("--orders", type=int, default=20_000, help="orders per client")
+    parser.add_argument("--window", type=int, default=64, help="max unacknowledged orders per client")
+    parser.add_argument("--spawn-server", action="store_true", help="run a gateway in a subprocess for the test")
+    parser.add_argument("--book-type", default="array", help="book type of the spawned gateway")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn_server:
+        command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "gateway.py"),
+                   "--host", args.host, "--port", str(args.port), "--book-type", args.book_type]
+        if args.unix is not None:
+            command += ["--unix", args.unix]
+        server = subprocess.Popen(command)
+    try:
+        wait_for_server(args.host, args.port, args.unix)
+        jobs = [(f"load_{i}", args.orders, args.host, args.port, args.unix, args.window, i) for i in range(args.clients)]
+        start = time.perf_counter()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.clients) as pool:
+            results = list(pool.map(_client_process, jobs))
+        elapsed = time.perf_counter() - start
+
+        latencies = np.concatenate([r["latencies_us"] for r in results])
+        total = sum(len(r["latencies_us"]) for r in results)
+        print(f"{args.clients} clients x {args.orders} orders, window {args.window}: "
+              f"{total / elapsed:,.0f} orders/s over {elapsed:.2f} s")
+        print(f"ack latency: p50 {np.percentile(latencies, 50):,.0f} us, p99 {np.percentile(latencies, 99):,.0f} us, "
+              f"max {latencies.max():,.0f} us")
+        print(f"rejects {sum(r['rejects'] for r in results)}, taker fills {sum(r['fills'] for r in results)}, "
+              f"maker fills {sum(r['maker_fills'] for r in results)}")
+        print("gateway stats:", asyncio.run(fetch_stats(args.host, args.port, args.unix)).strip())
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
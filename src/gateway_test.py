@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from exchange import Exchange, ACCEPTED, REJECT_INSUFFICIENT_CASH, REJECT_UNKNOWN_AGENT
+from gateway import Gateway
+from gateway_load import run_client
+
+
+class TestGateway(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.gateway = Gateway(Exchange(tick_size=0.01))
+        server = await self.gateway.start(port=0)
+        self.port = server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        await self.gateway.close()
+
+    async def client(self):
+        return await asyncio.open_connection("127.0.0.1", self.port)
+
+    async def request(self, conn, text: str, replies: int):
+        reader, writer = conn
+        writer.write(text.encode())
+        return [(await reader.readline()).decode().split() for _ in range(replies)]
+
+    async def test_orders_fills_and_acks(self):
+        alice, bob = await self.client(), await self.client()
+        self.assertEqual(await self.request(alice, "R r1 Alice 1000 10\n", 1), [["A", "r1", "0", "0"]])
+        await self.request(bob, "R r1 Bob 1000 10\n", 1)
+
+        replies = await self.request(alice, "L a1 Alice ask 100.5 2\nL a2 Alice ask 101 2\n", 2)
+        self.assertEqual(replies, [["A", "a1", "0", "1"], ["A", "a2", "0", "2"]])
+
+        # Bob's market buy sweeps both levels; he gets the fills then the ack
+        replies = await self.request(bob, "M b1 Bob bid 3\nL b2 Bob bid 99 500\n", 4)
+        self.assertEqual(replies, [["T", "b1", "100.5", "2"], ["T", "b1", "101", "1"],
+                                   ["A", "b1", str(ACCEPTED), "0"], ["A", "b2", str(REJECT_INSUFFICIENT_CASH), "0"]])
+        # Alice hears about her resting orders being filled
+        self.assertEqual(await self.request(alice, "", 2), [["F", "1", "100.5", "2"], ["F", "2", "101", "1"]])
+
+        # Alice's agent cannot be used from Bob's connection; cancels go through by id
+        self.assertEqual(await self.request(bob, "C b3 Alice 2\n", 1), [["A", "b3", str(REJECT_UNKNOWN_AGENT), "0"]])
+        self.assertEqual(await self.request(alice, "C a3 Alice 2\n", 1), [["A", "a3", "0", "0"]])
+        self.assertEqual(self.gateway.exchange.get_snapshot(), ([], []))
+
+    async def test_errors_keep_request_order(self):
+        conn = await self.client()
+        replies = await self.request(conn, "R r Carol 100 1\nL x Carol bid notaprice 1\nQ y\nM z Carol ask 1\n", 4)
+        self.assertEqual([r[:2] for r in replies], [["A", "r"], ["E", "x"], ["E", "y"], ["A", "z"]])
+
+    async def test_bad_prices_and_sizes_are_errors(self):
+        conn = await self.client()
+        await self.request(conn, "R r Dave 1000 10\n", 1)
+        bad = ["L a Dave bid 100 -5", "L b Dave bid 100 0", "L c Dave bid nan 1", "L d Dave bid inf 1",
+               "L e Dave bid -1 1", "L f Dave ask 0 1", "M g Dave bid -3", "M h Dave ask 0", "R i Erin nan 1",
+               "R j Erin 100 -1"]
+        replies = await self.request(conn, "".join(line + "\n" for line in bad), len(bad))
+        self.assertEqual([r[:2] for r in replies], [["E", line.split()[1]] for line in bad])
+        agent = self.gateway.exchange.agents["Dave"]
+        self.assertEqual((agent.cash, agent.inventory), (1000, 10))
+        self.assertNotIn("Erin", self.gateway.exchange.agents)
+        self.assertEqual(self.gateway.exchange.get_snapshot(), ([], []))
+
+    async def test_registered_agents_cannot_be_taken_over(self):
+        alice, mallory = await self.client(), await self.client()
+        await self.request(alice, "R r Alice 1000 10\nL a1 Alice ask 101 4\n", 2)
+
+        replies = await self.request(mallory, "R r Alice 1e9 1e9\nM m Alice bid 1\n", 2)
+        self.assertEqual(replies[0][:2], ["E", "r"])
+        self.assertEqual(replies[1], ["A", "m", str(REJECT_UNKNOWN_AGENT), "0"])
+
+        # The owner re-attaching is accepted and changes nothing
+        self.assertEqual(await self.request(alice, "R r2 Alice 5 5\n", 1), [["A", "r2", "0", "0"]])
+        agent = self.gateway.exchange.agents["Alice"]
+        self.assertEqual((agent.cash, agent.inventory), (1000, 6))
+        self.assertEqual(list(agent.active_orders), [1])
+        self.assertEqual(await self.request(alice, "C c Alice 1\n", 1), [["A", "c", "0", "0"]])
+        self.assertEqual(agent.inventory, 10)
+
+    async def test_stats(self):
+        conn = await self.client()
+        reader, writer = conn
+        writer.write(b"S s\n")
+        kind, tag, body = (await reader.readline()).decode().split(" ", 2)
+        self.assertEqual((kind, tag), ("S", "s"))
+        self.assertEqual(json.loads(body)["sessions"], 1)
+
+    async def test_concurrent_load_clients(self):
+        results = await asyncio.gather(*(run_client(f"load_{i}", 500, port=self.port, window=16, seed=i)
+                                         for i in range(3)))
+        for result in results:
+            self.assertEqual(result["acks"], 501)  # orders + registration
+            self.assertEqual(len(result["latencies_us"]), 500)
+        # Every fill is reported to both sides while the makers are connected
+        self.assertEqual(sum(r["fills"] for r in results), len(self.gateway.exchange.tape))
+        self.assertGreater(self.gateway.batches, 1)
+        self.assertLess(self.gateway.batches, self.gateway.requests)
+
+    async def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "gateway.sock")
+            gateway = Gateway()
+            await gateway.start(unix=path)
+            try:
+                result = await run_client("unix_client", 200, unix=path)
+                self.assertEqual(len(result["latencies_us"]), 200)
+            finally:
+                await gateway.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
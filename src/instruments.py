@@ -0,0 +1,197 @@
+"""
+Opt-in instrumentation of an Exchange and its book: latency histograms per
+command type, fill / sweep / cancel counters and the current book depth.
+
+    ex = Exchange(instruments=Instruments())
+    ...
+    ex.stats()
+
+Instruments.attach() replaces the exchange's _limit/_market/_cancel and the
+book's sweep/cancel_order with timing wrappers on those instances only, so an
+exchange without instruments runs exactly the uninstrumented code: disabled
+costs nothing, not even a flag check. With path and dump_every set, stats()
+is appended to path as one JSON line every dump_every commands.
+"""
+import collections
+import json
+import time
+import numpy as np
+from exchange import ACCEPTED, REJECT_NAMES
+
+COMMANDS = ("limit", "market", "cancel")
+
+# Histogram resolution: values below 2**SUB_BITS are exact, larger ones fall in
+# buckets 2**-(SUB_BITS-1) wide relative to the value
+SUB_BITS = 6
+HALF_BITS = SUB_BITS - 1
+
+
+class LogHistogram:
+    """
+    HDR-style histogram of non-negative integers (e.g. nanoseconds) in
+    log-bucketed counts: values below 64 are counted exactly, larger ones in
+    buckets 1/32 wide relative to their value (about 3%), so any value up to
+    2**63 fits in under 2000 buckets. record() is one list increment and one
+    addition; count, min, max and percentiles are read off the buckets when
+    asked for, to bucket precision. The sum is exact, for the mean.
+    """
+
+    def __init__(self):
+        self.counts = [0] * ((64 - SUB_BITS + 2) << HALF_BITS)
+        self.total = 0
+
+    def record(self, value: int):
+        v = int(value) if value > 0 else 0
+        shift = v.bit_length() - SUB_BITS
+        self.counts[v if shift <= 0 else (shift << HALF_BITS) + (v >> shift)] += 1
+        self.total += v
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    @staticmethod
+    def bucket_bounds(i: int):
+        """[low, high) of the values counted in bucket i."""
+        if i < (1 << SUB_BITS):
+            return i, i + 1
+        shift = (i >> HALF_BITS) - 1
+        mantissa = i - (shift << HALF_BITS)
+        return mantissa << shift, (mantissa + 1) << shift
+
+    def _value(self, i: int):
+        # Representative value of bucket i: its midpoint (exact below 64)
+        low, high = self.bucket_bounds(i)
+        return (low + high - 1) / 2
+
+    def percentile(self, q: float):
+        """Value at percentile q (0-100), to the bucket's precision. None when empty."""
+        cumulative = np.cumsum(self.counts)
+        count = int(cumulative[-1])
+        if not count:
+            return None
+        i = int(np.searchsorted(cumulative, max(q / 100 * count, 1)))
+        return self._value(i)
+
+    def summary(self, scale: float = 1.0):
+        """count, mean, min, p50/p90/p99/p99.9 and max, each divided by scale."""
+        count = self.count
+        if not count:
+            return {"count": 0}
+        summary = {"count": count, "mean": self.total / count / scale, "min": self.percentile(0) / scale}
+        for q, name in ((50, "p50"), (90, "p90"), (99, "p99"), (99.9, "p99.9")):
+            summary[name] = self.percentile(q) / scale
+        summary["max"] = self.percentile(100) / scale
+        return summary
+
+
+class Instruments:
+    """
+    Counters and histograms of one Exchange (see the module docstring).
+    latency[command] holds nanoseconds per limit/market/cancel command,
+    levels_per_sweep the number of price levels each sweep filled against.
+    """
+
+    def __init__(self, path: str = None, dump_every: int = None):
+        self.latency = {command: LogHistogram() for command in COMMANDS}
+        self.levels_per_sweep = LogHistogram()
+        self.rejects = collections.Counter()
+        self.fills = 0
+        self.fill_qty = 0
+        self.cancel_missed = 0  # cancels of orders no longer resting (already filled)
+        self.commands = 0
+        self.dump_every = dump_every
+        self.file = open(path, "a") if path is not None else None
+        self.exchange = None
+
+    def attach(self, exchange):
+        """Instruments exchange and its order book. Exchange(instruments=...) calls this."""
+        self.exchange = exchange
+        exchange._limit = self._timed("limit", exchange._limit, tuple)
+        exchange._market = self._timed("market", exchange._market, tuple)
+        exchange._cancel = self._timed("cancel", exchange._cancel, int)
+        self.attach_book(exchange.order_book)
+
+    def attach_book(self, book):
+        sweep, cancel_order, fills = book.sweep, book.cancel_order, book.fills
+        histogram = self.levels_per_sweep
+
+        def counted_sweep(side, size, limit_price=None):
+            remaining = sweep(side, size, limit_price)
+            n = fills.n
+            if n:
+                self.fills += n
+                self.fill_qty += size - remaining
+                # Fills come best price first, so each new price is a new level
+                if n == 1:
+                    histogram.record(1)
+                else:
+                    prices = fills.price
+                    histogram.record(1 + sum(1 for k in range(1, n) if prices[k] != prices[k - 1]))
+            return remaining
+
+        def counted_cancel(order_id):
+            cancelled = cancel_order(order_id)
+            if cancelled is None:
+                self.cancel_missed += 1
+            return cancelled
+
+        book.sweep = counted_sweep
+        book.cancel_order = counted_cancel
+
+    def _timed(self, command: str, method, result_type):
+        histogram = self.latency[command]
+        counts = histogram.counts
+        rejects = self.rejects
+        perf_counter_ns = time.perf_counter_ns
+        returns_tuple = result_type is tuple
+
+        def timed(*args):
+            start = perf_counter_ns()
+            result = method(*args)
+            elapsed = perf_counter_ns() - start
+            # LogHistogram.record, inlined
+            shift = elapsed.bit_length() - SUB_BITS
+            counts[elapsed if shift <= 0 else (shift << HALF_BITS) + (elapsed >> shift)] += 1
+            histogram.total += elapsed
+            code = result[0] if returns_tuple else result
+            if code != ACCEPTED:
+                rejects[REJECT_NAMES[code]] += 1
+            self.commands += 1
+            if self.dump_every and self.commands % self.dump_every == 0:
+                self.dump()
+            return result
+        return timed
+
+    def stats(self):
+        """Everything recorded so far as a JSON-serialisable dict; latencies in microseconds."""
+        return {
+            "commands": {command: h.count for command, h in self.latency.items()},
+            "latency_us": {command: h.summary(1e3) for command, h in self.latency.items()},
+            "rejects": dict(self.rejects),
+            "fills": self.fills,
+            "fill_qty": self.fill_qty,
+            "levels_per_sweep": self.levels_per_sweep.summary(),
+            "cancel_missed": self.cancel_missed,
+            "depth": self.exchange.order_book.depth_stats(),
+        }
+
+    def dump(self):
+        """Appends stats() to the file as one JSON line, stamped with the exchange clock."""
+        if self.file is None:
+            return
+        line = {"time": self.exchange.clock.now, "wall_time": time.time()}
+        line.update(self.stats())
+        self.file.write(json.dumps(line, default=float) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
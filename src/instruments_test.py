@@ -0,0 +1,99 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+from agent_logic import Agent
+from exchange import Exchange
+from exchange_test import make_agents, random_commands
+from instruments import Instruments, LogHistogram
+
+
+class TestLogHistogram(unittest.TestCase):
+    def test_buckets_tile_the_integers(self):
+        h = LogHistogram()
+        high = 0
+        for i in range(len(h.counts)):
+            low, next_high = h.bucket_bounds(i)
+            self.assertEqual(low, high)
+            self.assertLessEqual(next_high - low, max(1, low / 32))
+            high = next_high
+        self.assertGreaterEqual(high, 2 ** 63)
+
+    def test_percentiles_within_bucket_precision(self):
+        values = np.random.default_rng(0).lognormal(8, 1.5, 50_000).astype(np.int64)
+        h = LogHistogram()
+        for v in values.tolist():
+            h.record(v)
+        for q in (1, 50, 90, 99, 99.9):
+            exact = np.percentile(values, q)
+            self.assertAlmostEqual(h.percentile(q) / exact, 1, delta=0.035)
+        self.assertEqual(h.count, len(values))
+        self.assertAlmostEqual(h.percentile(0) / values.min(), 1, delta=0.035)
+        self.assertAlmostEqual(h.percentile(100) / values.max(), 1, delta=0.035)
+        self.assertEqual(h.summary()["mean"], values.mean())
+
+
+class TestInstruments(unittest.TestCase):
+    def test_counters(self):
+        ex = Exchange(instruments=Instruments())
+        alice = Agent(id="Alice", cash=1000.0, inventory=10)
+        bob = Agent(id="Bob", cash=1000.0, inventory=10)
+        ex.register_agent(alice)
+        ex.register_agent(bob)
+
+        ex.process_limit_order(alice, "ask", 100.0, 2)
+        ex.process_limit_order(alice, "ask", 101.0, 2)
+        ex.process_limit_order(bob, "bid", 100.0, 50)   # insufficient cash
+        ex.process_market_buy(bob, 3)                   # two levels, two fills
+        ex.process_cancel_order(alice, 1)               # filled already: misses the book
+        ex.process_cancel_order(alice, 99)              # unknown order
+
+        stats = ex.stats()
+        self.assertEqual(stats["commands"], {"limit": 3, "market": 1, "cancel": 2})
+        self.assertEqual(stats["rejects"], {"insufficient_cash": 1, "unknown_order": 1})
+        self.assertEqual((stats["fills"], stats["fill_qty"], stats["cancel_missed"]), (2, 3, 1))
+        self.assertEqual(stats["levels_per_sweep"]["max"], 2)
+        self.assertEqual(stats["depth"]["ask_orders"], 1)
+        self.assertEqual(stats["depth"]["ask_size"], 1)
+        self.assertGreater(stats["latency_us"]["market"]["p50"], 0)
+        json.dumps(stats)
+
+    def test_same_results_as_uninstrumented(self):
+        commands = random_commands(random.Random(12), [f"agent_{i}" for i in range(8)], 2000)
+        results = []
+        for instruments in (None, Instruments()):
+            ex = Exchange(book_type="array", tick_size=0.01, instruments=instruments)
+            for agent in make_agents(8):
+                ex.register_agent(agent)
+            results.append((ex.submit_batch(commands), ex))
+        (plain, plain_ex), (measured, measured_ex) = results
+        np.testing.assert_array_equal(plain.fill_order_id, measured.fill_order_id)
+        np.testing.assert_array_equal(plain.reject_reason, measured.reject_reason)
+        self.assertEqual(plain_ex.get_snapshot(), measured_ex.get_snapshot())
+        self.assertEqual(sum(measured_ex.stats()["commands"].values()), 2000 - list(plain.reject_reason).count(5))
+        self.assertEqual(measured_ex.stats()["fills"], len(plain.fill_qty))
+
+    def test_disabled_installs_nothing(self):
+        ex = Exchange()
+        self.assertNotIn("_limit", vars(ex))
+        self.assertNotIn("sweep", vars(ex.order_book))
+        self.assertEqual(set(ex.stats()), {"depth"})
+
+    def test_periodic_dump(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "stats.jsonl")
+            with Instruments(path=path, dump_every=100) as instruments:
+                ex = Exchange(instruments=instruments)
+                for agent in make_agents(8):
+                    ex.register_agent(agent)
+                ex.submit_batch(random_commands(random.Random(13), [f"agent_{i}" for i in range(8)], 550))
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual([sum(line["commands"].values()) for line in lines], [100, 200, 300, 400, 500])
+        self.assertEqual(lines[-1]["time"], 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+from agent_logic import Agent
+from clock import LogicalClock, WallClock
+from exchange import Exchange, REJECT_UNKNOWN_ORDER
+from exchange_test import make_agents, random_commands
+from journal import CommandJournal, replay
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "commands.journal")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_live(self, commands, journal=None, **exchange_args):
+        ex = Exchange(journal=journal, **exchange_args)
+        agents = make_agents(8)
+        for agent in agents:
+            ex.register_agent(agent)
+        ex.submit_batch(commands)
+        return ex
+
+    def assert_same_state(self, a, b):
+        self.assertEqual(a.get_snapshot(), b.get_snapshot())
+        n = len(a.ledger)
+        self.assertEqual(a.ledger.ids, b.ledger.ids)
+        for column in ("cash", "inventory", "locked_cash", "locked_inventory"):
+            np.testing.assert_array_equal(getattr(a.ledger, column)[:n], getattr(b.ledger, column)[:n])
+        for agent_id, agent in a.agents.items():
+            self.assertEqual(agent.active_orders, b.agents[agent_id].active_orders)
+        for name, column in a.tape.columns().items():
+            np.testing.assert_array_equal(column, b.tape.column(name))
+        self.assertEqual(a.clock.now, b.clock.now)
+
+    def test_replay_rebuilds_exchange(self):
+        commands = random_commands(random.Random(8), [f"agent_{i}" for i in range(8)], 3000)
+        # Wall-clock timestamps are not reproducible by re-running, only by the journal
+        with CommandJournal(self.path, flush_every=100) as journal:
+            live = self.run_live(commands, journal, book_type="array", tick_size=0.01, clock=WallClock())
+            # Single-order API and an agent that was never registered
+            stranger = Agent(id="a-rather-long-agent-name-that-spans-two-record-slots", cash=500.0, inventory=5)
+            live.process_limit_order(stranger, "ask", 101.0, 3)
+            live.process_market_buy(live.agents["agent_0"], 2)
+        self.assertEqual(journal.count, 8 + 3000 + 3)  # + stranger registered on first use, limit, market
+
+        rebuilt, n = replay(self.path)
+        self.assertEqual(n, journal.count)
+        self.assertEqual(rebuilt.order_book.tick_size, 0.01)
+        self.assert_same_state(live, rebuilt)
+
+    def test_cancel_of_unknown_order(self):
+        with CommandJournal(self.path) as journal:
+            live = self.run_live([], journal)
+            agent = live.agents["agent_0"]
+            # Same reject with a journal as without one, whatever the id's type
+            self.assertEqual(live._cancel(agent, "order_number_1"), REJECT_UNKNOWN_ORDER)
+            self.assertEqual(live._cancel(agent, 12345), REJECT_UNKNOWN_ORDER)
+            self.assertEqual(live.submit_batch([("cancel", "agent_0", None)]).reject_reason.tolist(),
+                             [REJECT_UNKNOWN_ORDER])
+        rebuilt, n = replay(self.path)
+        self.assertEqual(n, 8 + 3)
+        self.assert_same_state(live, rebuilt)
+
+    def test_replayed_sizes_keep_their_type(self):
+        commands = random_commands(random.Random(12), [f"agent_{i}" for i in range(8)], 1000)
+        for book_type in ("dict", "array"):
+            with self.subTest(book_type=book_type):
+                with CommandJournal(self.path) as journal:
+                    live = self.run_live(commands, journal, book_type=book_type)
+                rebuilt, _ = replay(self.path)
+                typed = lambda levels: [(p, s, type(s)) for p, s in levels]
+                for a, b in zip(live.get_snapshot(), rebuilt.get_snapshot()):
+                    self.assertEqual(typed(a), typed(b))
+                for agent_id, agent in live.agents.items():
+                    orders = rebuilt.agents[agent_id].active_orders
+                    self.assertEqual({k: [(x, type(x)) for x in v] for k, v in agent.active_orders.items()},
+                                     {k: [(x, type(x)) for x in v] for k, v in orders.items()})
+                self.assertEqual(live.tape.column("qty").dtype, rebuilt.tape.column("qty").dtype)
+
+    def test_replay_up_to_sequence_number(self):
+        commands = random_commands(random.Random(9), [f"agent_{i}" for i in range(8)], 2000)
+        with CommandJournal(self.path) as journal:
+            self.run_live(commands, journal)
+
+        # State after the 8 registrations and the first 1234 commands
+        expected = self.run_live(commands[:1234])
+        rebuilt, n = replay(self.path, upto=8 + 1234, chunk=500)
+        self.assertEqual(n, 8 + 1234)
+        self.assert_same_state(expected, rebuilt)
+
+    def test_carry_on_after_replay(self):
+        commands = random_commands(random.Random(10), [f"agent_{i}" for i in range(8)], 500)
+        with CommandJournal(self.path) as journal:
+            live = self.run_live(commands, journal)
+        rebuilt, _ = replay(self.path, clock=LogicalClock())
+
+        more = random_commands(random.Random(11), [f"agent_{i}" for i in range(8)], 500)
+        live.submit_batch(more)
+        rebuilt.submit_batch(more)
+        self.assert_same_state(live, rebuilt)
+
+
+if __name__ == "__main__":
+    unittest.main()
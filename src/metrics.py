@@ -0,0 +1,66 @@
+import numpy as np
+
+
+class MetricsRecorder:
+    """
+    Per-step book metrics of a simulation loop, in preallocated float64 arrays:
+    mid_price, spread, imbalance, best_bid and best_ask, in price units, NaN
+    where undefined (a side of the book was empty). Arrays double when full;
+    pass the number of steps as capacity to never reallocate.
+
+    last_mid and last_spread are the most recent defined values (init_mid and
+    init_spread until the book has both sides), kept up to date by record()
+    so drivers do not search the history for them.
+    """
+
+    COLUMNS = ("mid_price", "spread", "imbalance", "best_bid", "best_ask")
+
+    def __init__(self, capacity: int = 1024, init_mid: float = 100, init_spread: float = 0.50):
+        self.arrays = {name: np.full(max(capacity, 1), np.nan) for name in self.COLUMNS}
+        self.n = 0
+        self.last_mid = init_mid
+        self.last_spread = init_spread
+
+    def __len__(self):
+        return self.n
+
+    def _grow(self):
+        for name, old in self.arrays.items():
+            new = np.full(2 * len(old), np.nan)
+            new[:len(old)] = old
+            self.arrays[name] = new
+
+    def record(self, book):
+        """
+        Appends the current metrics of `book` (an OrderBook or ArrayOrderBook;
+        tick-mode prices are converted). Returns (mid_price, spread), None where undefined.
+        """
+        i = self.n
+        arrays = self.arrays
+        if i == len(arrays["mid_price"]):
+            self._grow()
+        self.n = i + 1
+
+        bid, ask = book.get_best_bid(), book.get_best_ask()
+        arrays["imbalance"][i] = book.calculate_imbalance()
+        if bid is not None:
+            arrays["best_bid"][i] = book.to_price(bid)
+        if ask is not None:
+            arrays["best_ask"][i] = book.to_price(ask)
+        if bid is None or ask is None:
+            return None, None  # mid and spread stay NaN
+
+        mid_price = book.to_price((bid + ask) / 2)
+        spread = book.to_price(ask - bid)
+        arrays["mid_price"][i] = mid_price
+        arrays["spread"][i] = spread
+        self.last_mid = mid_price
+        self.last_spread = spread
+        return mid_price, spread
+
+    def column(self, name: str):
+        """The recorded steps of one metric (a view, valid until the next record())."""
+        return self.arrays[name][:self.n]
+
+    def columns(self):
+        return {name: self.column(name) for name in self.COLUMNS}
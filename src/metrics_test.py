@@ -0,0 +1,53 @@
+import random
+import unittest
+import numpy as np
+from agent_logic import Agent
+from exchange import Exchange
+from metrics import MetricsRecorder
+from ZI_test import initialise_agents, random_orders
+
+
+class TestMetricsRecorder(unittest.TestCase):
+    def test_undefined_steps_keep_last_values(self):
+        ex = Exchange(tick_size=0.01)
+        alice = Agent(id="Alice", cash=10_000.0, inventory=100)
+        ex.register_agent(alice)
+        metrics = MetricsRecorder(capacity=2, init_mid=50, init_spread=1.0)
+
+        self.assertEqual(metrics.record(ex.order_book), (None, None))  # empty book
+        ex.process_limit_order(alice, "bid", 99.0, 1)
+        metrics.record(ex.order_book)
+        self.assertEqual((metrics.last_mid, metrics.last_spread), (50, 1.0))
+
+        ex.process_limit_order(alice, "ask", 101.5, 3)
+        self.assertEqual(metrics.record(ex.order_book), (100.25, 2.5))
+        ex.process_market_buy(alice, 3)  # asks gone again
+        metrics.record(ex.order_book)
+        self.assertEqual((metrics.last_mid, metrics.last_spread), (100.25, 2.5))
+
+        self.assertEqual(len(metrics), 4)  # grown past capacity=2
+        np.testing.assert_array_equal(metrics.column("mid_price"), [np.nan, np.nan, 100.25, np.nan])
+        np.testing.assert_array_equal(metrics.column("best_bid"), [np.nan, 99.0, 99.0, 99.0])
+        np.testing.assert_array_equal(metrics.column("best_ask"), [np.nan, np.nan, 101.5, np.nan])
+        np.testing.assert_array_equal(metrics.column("imbalance"), [0.0, 1.0, -0.5, 1.0])
+
+    def test_random_orders_fills_given_recorder(self):
+        rng = random.Random(4)
+        agents = initialise_agents("Random", 10, rng)
+        ex = Exchange(book_type="array")
+        for agent in agents:
+            ex.register_agent(agent)
+        metrics = MetricsRecorder()
+        mid, spread, imbalance, _ = random_orders(agents, ex, 3000, rng=rng, np_rng=np.random.default_rng(4),
+                                                  record_depth=False, metrics=metrics)
+        self.assertEqual(len(mid), 3000)
+        self.assertIs(mid.base, metrics.arrays["mid_price"])
+        # Mid is defined exactly when both sides are, and sits between them
+        both = ~np.isnan(metrics.column("best_bid")) & ~np.isnan(metrics.column("best_ask"))
+        np.testing.assert_array_equal(~np.isnan(mid), both)
+        np.testing.assert_allclose(mid[both], (metrics.column("best_bid") + metrics.column("best_ask"))[both] / 2)
+        self.assertEqual(metrics.last_mid, mid[both][-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
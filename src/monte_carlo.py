@@ -0,0 +1,106 @@
+"""
+Monte Carlo runner for ZI simulations: many independent, seeded random_orders
+paths spread over a ProcessPoolExecutor, with the per-step mid-price, spread
+and imbalance series stacked into (paths, steps) NumPy arrays.
+
+    python monte_carlo.py [paths] [num_orders] [workers]
+"""
+import concurrent.futures
+import dataclasses
+import os
+import random
+import sys
+import time
+import numpy as np
+from exchange import Exchange
+from ZI_test import initialise_agents, random_orders, vectorized_random_orders
+
+
+@dataclasses.dataclass
+class PathSpec:
+    """One simulation path. Every path draws from its own RNG streams seeded by `seed`."""
+    seed : int
+    num_agents : int = 10
+    num_orders : int = 1000
+    agent_type : str = "Random"
+    tick_size : float = None
+    book_type : str = "dict"
+    vectorized : bool = True  # pre-drawn order flow (vectorized_random_orders) instead of random_orders
+
+
+@dataclasses.dataclass
+class MonteCarloResult:
+    """
+    Stacked series, one row per path. Rows of paths shorter than the longest
+    are padded with NaN, as are steps where a side of the book was empty.
+    """
+    specs : list
+    mid_price : np.ndarray
+    spread : np.ndarray
+    imbalance : np.ndarray
+
+
+def make_specs(num_paths: int, seed: int = 0, **params):
+    """num_paths PathSpecs with the same params and statistically independent seeds."""
+    children = np.random.SeedSequence(seed).spawn(num_paths)
+    return [PathSpec(seed=int(child.generate_state(1)[0]), **params) for child in children]
+
+
+def run_path(spec: PathSpec):
+    """Runs one path from scratch. Returns (mid_price, spread, imbalance) float arrays."""
+    rng = random.Random(spec.seed)
+    np_rng = np.random.default_rng(spec.seed)
+    agents = initialise_agents(spec.agent_type, spec.num_agents, rng)
+    exchange = Exchange(tick_size=spec.tick_size, book_type=spec.book_type)
+    for agent in agents:
+        exchange.register_agent(agent)
+    if spec.vectorized:
+        mid_price, spread, imbalance, _ = vectorized_random_orders(agents, exchange, spec.num_orders,
+                                                                   rng=np_rng, record_depth=False)
+    else:
+        mid_price, spread, imbalance, _ = random_orders(agents, exchange, spec.num_orders,
+                                                        rng=rng, np_rng=np_rng, record_depth=False)
+    # Already float arrays, NaN where a side was empty
+    return mid_price, spread, imbalance
+
+
+def _stack(series):
+    out = np.full((len(series), max((len(s) for s in series), default=0)), np.nan)
+    for row, s in enumerate(series):
+        out[row, :len(s)] = s
+    return out
+
+
+def run_paths(specs, workers: int = None):
+    """
+    Runs every spec and stacks the results in spec order. workers=None uses
+    one process per core, workers=0 runs the paths serially in this process.
+    """
+    specs = list(specs)
+    if workers == 0:
+        results = [run_path(spec) for spec in specs]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            # Paths are short; ship them in chunks so the pool overhead stays small
+            chunksize = max(1, len(specs) // (4 * (workers or os.cpu_count() or 1)))
+            results = list(pool.map(run_path, specs, chunksize=chunksize))
+
+    return MonteCarloResult(
+        specs=specs,
+        mid_price=_stack([r[0] for r in results]),
+        spread=_stack([r[1] for r in results]),
+        imbalance=_stack([r[2] for r in results]),
+    )
+
+
+if __name__ == "__main__":
+    num_paths = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    num_orders = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    specs = make_specs(num_paths, seed=0, num_orders=num_orders)
+    start = time.perf_counter()
+    result = run_paths(specs, workers)
+    elapsed = time.perf_counter() - start
+    print(f"{num_paths} paths x {num_orders} orders in {elapsed:.2f} s ({num_paths / elapsed:.1f} paths/s)")
+    print(f"final mid: mean {np.nanmean(result.mid_price[:, -1]):.3f}, std {np.nanstd(result.mid_price[:, -1]):.3f}")
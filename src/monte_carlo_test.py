@@ -0,0 +1,31 @@
+import unittest
+import numpy as np
+from monte_carlo import PathSpec, make_specs, run_path, run_paths
+
+
+class TestMonteCarlo(unittest.TestCase):
+    def test_same_seed_same_path(self):
+        a = run_path(PathSpec(seed=5, num_orders=300))
+        b = run_path(PathSpec(seed=5, num_orders=300))
+        for x, y in zip(a, b):
+            np.testing.assert_array_equal(x, y)
+
+    def test_independent_seeds(self):
+        specs = make_specs(3, seed=1, num_orders=300)
+        self.assertEqual(len({spec.seed for spec in specs}), 3)
+        result = run_paths(specs, workers=0)
+        self.assertFalse(np.array_equal(result.mid_price[0], result.mid_price[1], equal_nan=True))
+
+    def test_pool_same_as_serial(self):
+        # Mixed path lengths: shorter rows are padded with NaN
+        specs = make_specs(4, seed=2, num_orders=200) + [PathSpec(seed=9, num_orders=100, tick_size=0.01)]
+        serial = run_paths(specs, workers=0)
+        pooled = run_paths(specs, workers=2)
+        self.assertEqual(serial.mid_price.shape, (5, 200))
+        self.assertTrue(np.isnan(serial.mid_price[4, 100:]).all())
+        for name in ("mid_price", "spread", "imbalance"):
+            np.testing.assert_array_equal(getattr(serial, name), getattr(pooled, name))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import contextlib
+import io
+import random
+import unittest
+import numpy as np
+from agent_logic import Agent
+from exchange import Exchange
+from exchange_test import make_agents, random_commands
+from multi_exchange import MultiExchange, REJECT_UNKNOWN_SYMBOL
+
+
+def multi_commands(rng, symbols, agent_ids, n: int):
+    # random_commands flow, each command routed to a random symbol
+    commands = []
+    for command in random_commands(rng, agent_ids, n):
+        commands.append(command[:2] + (rng.choice(symbols),) + command[2:])
+    return commands
+
+
+class TestMultiExchange(unittest.TestCase):
+    def register(self, ex, symbols, n: int = 8):
+        for i in range(n):
+            ex.register_agent(f"agent_{i}", cash=10_000.0, positions={s: 100.0 for s in symbols})
+
+    def test_one_command_per_batch_same_as_exchange(self):
+        # Single symbol, one command at a time: identical to the sequential Exchange
+        rng = random.Random(7)
+        commands = random_commands(rng, [f"agent_{i}" for i in range(8)], 2000)
+
+        ex, agents = Exchange(tick_size=0.01), make_agents(8)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for agent in agents:
+                ex.register_agent(agent)
+        expected = ex.submit_batch(commands)
+
+        multi = MultiExchange(["XYZ"], tick_size=0.01)
+        self.register(multi, ["XYZ"])
+        rejects = []
+        for i, command in enumerate(commands):
+            result = multi.submit_batch([command[:2] + ("XYZ",) + command[2:]])
+            rejects.extend((i, r) for r in result.reject_reason.tolist())
+
+        self.assertEqual(rejects, list(zip(expected.reject_command.tolist(), expected.reject_reason.tolist())))
+        for agent in agents:
+            self.assertAlmostEqual(multi.ledger.cash[agent.id], agent.cash)
+            self.assertEqual(multi.ledger.positions[agent.id]["XYZ"], agent.inventory)
+            self.assertEqual({order_id: o for (_, order_id), o in multi.ledger.active_orders[agent.id].items()},
+                             agent.active_orders)
+        self.assertEqual(multi.get_snapshot("XYZ"), ex.get_snapshot())
+        self.assertEqual(len(multi.tapes["XYZ"]), len(ex.tape))
+
+    def test_workers_same_as_inline(self):
+        symbols = ["AAA", "BBB", "CCC"]
+        rng = random.Random(3)
+        batches = [multi_commands(rng, symbols, [f"agent_{i}" for i in range(8)], 500) for _ in range(4)]
+
+        results = []
+        for workers in (0, 2):
+            with MultiExchange(symbols, workers=workers) as ex:
+                self.register(ex, symbols)
+                out = [ex.submit_batch(batch) for batch in batches]
+                results.append((out, ex.ledger, [ex.get_snapshot(s) for s in symbols]))
+
+        (inline, inline_ledger, inline_books), (sharded, sharded_ledger, sharded_books) = results
+        self.assertEqual(inline_ledger, sharded_ledger)
+        self.assertEqual(inline_books, sharded_books)
+        for a, b in zip(inline, sharded):
+            np.testing.assert_array_equal(a.fill_command, b.fill_command)
+            np.testing.assert_array_equal(a.fill_symbol, b.fill_symbol)
+            np.testing.assert_array_equal(a.fill_qty, b.fill_qty)
+            np.testing.assert_array_equal(a.reject_reason, b.reject_reason)
+
+    def test_ledger_conserves_cash_and_positions(self):
+        # Trades only move cash and inventory between agents. Locked amounts
+        # are accounted for by what is still resting in the books.
+        symbols = ["AAA", "BBB"]
+        rng = random.Random(11)
+        ex = MultiExchange(symbols)
+        self.register(ex, symbols)
+        for _ in range(5):
+            batch = [c for c in multi_commands(rng, symbols, [f"agent_{i}" for i in range(8)], 400) if c[0] != "market"]
+            ex.submit_batch(batch)
+
+        ledger = ex.ledger
+        locked_cash = sum(p * s for sym in symbols for p, s in ex.get_snapshot(sym)[0])
+        self.assertAlmostEqual(sum(ledger.cash.values()) + locked_cash, 8 * 10_000.0)
+        for sym in symbols:
+            locked = sum(s for _, s in ex.get_snapshot(sym)[1])
+            self.assertEqual(sum(p[sym] for p in ledger.positions.values()) + locked, 8 * 100.0)
+
+    def test_market_orders_in_one_batch_cannot_overspend(self):
+        ex = MultiExchange(["AAA"])
+        ex.register_agent("maker", cash=10_000.0, positions={"AAA": 100})
+        ex.register_agent("A", cash=1_000.0, positions={"AAA": 10})
+        ex.submit_batch([("limit", "maker", "AAA", "bid", 99.0, 20), ("limit", "maker", "AAA", "ask", 100.0, 20)])
+
+        # Exchange rejects the second sell: 4 left < 1.5 * 6
+        result = ex.submit_batch([("market", "A", "AAA", "ask", 6), ("market", "A", "AAA", "ask", 6)])
+        self.assertEqual(result.reject_command.tolist(), [1])
+        self.assertEqual(ex.ledger.positions["A"]["AAA"], 4)
+
+        # Each buy locks size x the worst ask (500 of 1594) and the limit bid is paid
+        # out of what is left; the last buy finds 54 < 1.5 * 500 free and is refused
+        cash = ex.ledger.cash["A"]
+        result = ex.submit_batch([("market", "A", "AAA", "bid", 5), ("market", "A", "AAA", "bid", 5),
+                                  ("limit", "A", "AAA", "bid", 90.0, 6), ("market", "A", "AAA", "bid", 5)])
+        self.assertEqual(result.reject_command.tolist(), [3])
+        self.assertAlmostEqual(ex.ledger.cash["A"], cash - 1000.0 - 540.0)
+        self.assertEqual(ex.ledger.positions["A"]["AAA"], 14)
+        cash = ex.ledger.cash["A"]
+
+        # A refused market buy gives its lock back
+        result = ex.submit_batch([("market", "A", "AAA", "bid", 1000)])
+        self.assertEqual(len(result.reject_command), 1)
+        self.assertAlmostEqual(ex.ledger.cash["A"], cash)
+
+    def test_market_buy_then_limit_buy_in_one_batch(self):
+        # The market buy locks 2 x 150 and spends 200; the limit bid still fits
+        # in what is left, and the unused 100 comes back at settlement
+        batch = [("market", "A", "bid", 2), ("limit", "A", "bid", 100.0, 7)]
+
+        ex, (maker, agent) = Exchange(), [Agent(id="maker", cash=0.0, inventory=100), Agent(id="A", cash=1_000.0)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            ex.register_agent(maker)
+            ex.register_agent(agent)
+        ex.submit_batch([("limit", "maker", "ask", 100.0, 3), ("limit", "maker", "ask", 150.0, 20)])
+        expected = ex.submit_batch(batch)
+
+        multi = MultiExchange(["AAA"])
+        multi.register_agent("maker", cash=0.0, positions={"AAA": 100})
+        multi.register_agent("A", cash=1_000.0)
+        multi.submit_batch([("limit", "maker", "AAA", "ask", 100.0, 3), ("limit", "maker", "AAA", "ask", 150.0, 20)])
+        result = multi.submit_batch([command[:2] + ("AAA",) + command[2:] for command in batch])
+
+        self.assertEqual(result.reject_command.tolist(), expected.reject_command.tolist())
+        self.assertEqual(result.reject_command.tolist(), [])
+        np.testing.assert_array_equal(result.fill_qty, expected.fill_qty)
+        for a in (maker, agent):
+            self.assertAlmostEqual(multi.ledger.cash[a.id], a.cash)
+            self.assertEqual(multi.ledger.positions[a.id].get("AAA", 0), a.inventory)
+        self.assertAlmostEqual(agent.cash, 100.0)
+        self.assertEqual(multi.get_snapshot("AAA"), ex.get_snapshot())
+
+    def test_positions_and_order_ids_settle_within_a_batch(self):
+        # Only cash waits for the next batch: a position bought earlier in the batch can
+        # be sold, and an order that came to rest earlier in the batch can be cancelled
+        ex = MultiExchange(["AAA", "BBB"])
+        ex.register_agent("maker", cash=10_000.0, positions={"AAA": 100})
+        ex.register_agent("A", cash=510.0)
+        ex.submit_batch([("limit", "maker", "AAA", "ask", 100.0, 5)])
+        result = ex.submit_batch([("limit", "A", "AAA", "bid", 100.0, 5), ("limit", "A", "AAA", "ask", 110.0, 5),
+                                  ("limit", "A", "BBB", "bid", 10.0, 1), ("cancel", "A", "BBB", 1),
+                                  ("limit", "A", "BBB", "bid", 10.0, 1)])
+        self.assertEqual(result.reject_command.tolist(), [4])  # the cash the cancel freed is not back yet
+        self.assertEqual(result.resting_symbol.tolist(), ["AAA", "BBB"])
+        self.assertEqual(ex.ledger.positions["A"]["AAA"], 0)
+        self.assertEqual(list(ex.ledger.active_orders["A"]), [("AAA", 2)])
+        self.assertAlmostEqual(ex.ledger.cash["A"], 10.0)
+        self.assertAlmostEqual(ex.ledger.cash["maker"], 10_500.0)
+
+    def test_ledger_conserves_with_market_orders(self):
+        symbols = ["AAA", "BBB"]
+        rng = random.Random(5)
+        ex = MultiExchange(symbols)
+        self.register(ex, symbols)
+        for _ in range(5):
+            ex.submit_batch(multi_commands(rng, symbols, [f"agent_{i}" for i in range(8)], 400))
+
+        ledger = ex.ledger
+        locked_cash = sum(p * s for sym in symbols for p, s in ex.get_snapshot(sym)[0])
+        self.assertAlmostEqual(sum(ledger.cash.values()) + locked_cash, 8 * 10_000.0)
+        for sym in symbols:
+            locked = sum(s for _, s in ex.get_snapshot(sym)[1])
+            self.assertEqual(sum(p[sym] for p in ledger.positions.values()) + locked, 8 * 100.0)
+            self.assertTrue(all(p[sym] >= 0 for p in ledger.positions.values()))
+
+    def test_unknown_symbol(self):
+        ex = MultiExchange(["AAA"])
+        self.register(ex, ["AAA"], 1)
+        result = ex.submit_batch([("limit", "agent_0", "ZZZ", "bid", 100.0, 1)])
+        self.assertEqual(result.reject_reason.tolist(), [REJECT_UNKNOWN_SYMBOL])
+
+
+if __name__ == "__main__":
+    unittest.main()
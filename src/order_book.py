@@ -1,253 +1,327 @@
 import dataclasses
-import time
-from collections import deque
+import heapq
+import numpy as np
 from agent_logic import Order
-
-
-@dataclasses.dataclass
-class OrderBook:
-
-    bid_dic : dict = dataclasses.field(default_factory=dict)
-    ask_dic : dict = dataclasses.field(default_factory=dict)
-    counter : int = 0
-
-
-        
-
-    def add_order(self, side: str, price: float, order : Order):
-         
-        self.counter += 1
-        order.order_id = f"order_number_{self.counter}"
-
-        if side == "bid":
-            if price in self.bid_dic:
-                
-                self.bid_dic[price].append(order)
-            else:
-                q = deque()
-                q.append(order)
-                self.bid_dic[price] = q
-
-        elif side == "ask":
-            if price in self.ask_dic:
-                self.ask_dic[price].append(order)
-            else:
-                q = deque()
-                q.append(order)
-                self.ask_dic[price] = q
-    
-
-    def cancel_order(self, side: str, price: float, order_id: str):
-        found = False
-        if side == "bid":
-            if price in self.bid_dic:
-                orders_queue = self.bid_dic[price]
-                # Rebuild deque without the matching order
-                new_queue = deque()
-                for ords in orders_queue:
-                    if ords.order_id != order_id:
-                        new_queue.append(ords)
-                    else:
-                        found = True
-                self.bid_dic[price] = new_queue
-                if not new_queue:
-                    del self.bid_dic[price]
-                if not found:
-                    pass # Order might have been executed already
+from clock import LogicalClock
+from snapshot import read_snapshot, write_snapshot
+
+
+class PriceLevel:
+    """
+    FIFO queue of the orders resting at one price.
+    The queue is linked through the orders themselves (Order.prev/Order.next),
+    so an order can be unlinked from anywhere in O(1) while keeping time priority.
+    Supports len(), iteration and level[0] like the deque it replaces.
+    total_size is the resting size of the level, kept up to date on every change.
+    """
+
+    __slots__ = ("price", "head", "tail", "count", "total_size")
+
+    def __init__(self, price: float):
+        self.reset(price)
+
+    def reset(self, price: float):
+        self.price = price
+        self.head = None
+        self.tail = None
+        self.count = 0
+        self.total_size = 0
+
+    def append(self, order: Order):
+        order.prev = self.tail
+        order.next = None
+        if self.tail is None:
+            self.head = order
+        else:
+            self.tail.next = order
+        self.tail = order
+        self.count += 1
+        self.total_size += order.size
+
+    def unlink(self, order: Order):
+        if order.prev is None:
+            self.head = order.next
+        else:
+            order.prev.next = order.next
+        if order.next is None:
+            self.tail = order.prev
+        else:
+            order.next.prev = order.prev
+        order.prev = order.next = None
+        self.count -= 1
+        self.total_size -= order.size
+
+    def reduce(self, order: Order, qty: int):
+        """Partial fill: takes qty off an order without changing its place in the queue."""
+        order.size -= qty
+        self.total_size -= qty
+
+    def popleft(self):
+        order = self.head
+        self.unlink(order)
+        return order
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
+
+    def __iter__(self):
+        order = self.head
+        while order is not None:
+            # Read the link first so the current order can be unlinked while iterating
+            nxt = order.next
+            yield order
+            order = nxt
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("price level index out of range")
+        if i == self.count - 1:
+            return self.tail
+        order = self.head
+        for _ in range(i):
+            order = order.next
+        return order
+
+    def __repr__(self):
+        return f"PriceLevel(price={self.price}, orders={list(self)})"
+
+
+class LevelIndex:
+    """
+    Sorted index over the price levels of one side of the book.
+    Min-heap with lazy deletion: a price is pushed when its level is created
+    and popped once it reaches the top after the level has been removed.
+    Bids are stored negated so the top of the heap is always the best price.
+    """
+
+    def __init__(self, levels: dict, descending: bool):
+        self.levels = levels  # the side's {price: queue} dict, used as the live set
+        self.sign = -1 if descending else 1
+        self.heap = []
+        self.in_heap = set()
+        for price in levels:
+            self.add(price)
+
+    def add(self, price):
+        # A price whose stale entry is still in the heap becomes valid again
+        if price not in self.in_heap:
+            self.in_heap.add(price)
+            heapq.heappush(self.heap, self.sign * price)
+
+    def discard(self, price):
+        # Deletion is lazy; only compact when stale entries pile up deep in the heap
+        if len(self.heap) > 2 * len(self.levels) + 64:
+            self.rebuild()
+
+    def rebuild(self):
+        self.in_heap = set(self.levels)
+        self.heap = [self.sign * price for price in self.in_heap]
+        heapq.heapify(self.heap)
+
+    def best(self):
+        heap = self.heap
+        while heap:
+            price = self.sign * heap[0]
+            if price in self.levels:
+                return price
+            heapq.heappop(heap)
+            self.in_heap.discard(price)
+        return None
+
+    def top(self, n: int):
+        """
+        The best n live prices, best first. Walks the heap as a tree from the root
+        with a small frontier heap, so it only visits the top of the heap.
+        """
+        heap, levels, sign = self.heap, self.levels, self.sign
+        result = []
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier and len(result) < n:
+            value, i = heapq.heappop(frontier)
+            if sign * value in levels:
+                result.append(sign * value)
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return result
+
+
+class TickLevelIndex:
+    """
+    Dense index over integer tick prices, used when the book has a tick_size.
+    One byte per tick flags which levels exist, in a window [base, base + len)
+    that is re-centred and grown when a price falls outside it.
+    The best price is cached; when its level empties, the next one is found
+    with bytearray.find/rfind, which scans in C rather than over Python objects.
+    """
+
+    def __init__(self, levels: dict, descending: bool, window: int = 1024):
+        self.levels = levels
+        self.descending = descending
+        self.window = window
+        self.base = None
+        self.occupied = bytearray()
+        self.best_price = None
+        for price in levels:
+            self.add(price)
+
+    def _grow(self, tick: int):
+        if self.base is None:
+            self.base = tick - self.window // 2
+            self.occupied = bytearray(self.window)
+            return
+        lo = min(self.base, tick)
+        hi = max(self.base + len(self.occupied), tick + 1)
+        pad = max(hi - lo, self.window) // 2
+        new_base = lo - pad
+        grown = bytearray(hi - lo + 2 * pad)
+        start = self.base - new_base
+        grown[start:start + len(self.occupied)] = self.occupied
+        self.base = new_base
+        self.occupied = grown
+
+    def add(self, tick: int):
+        i = tick - self.base if self.base is not None else -1
+        if not 0 <= i < len(self.occupied):
+            self._grow(tick)
+            i = tick - self.base
+        self.occupied[i] = 1
+
+        best = self.best_price
+        if best is None or (tick > best if self.descending else tick < best):
+            self.best_price = tick
+
+    def discard(self, tick: int):
+        i = tick - self.base
+        self.occupied[i] = 0
+        if tick == self.best_price:
+            if self.descending:
+                j = self.occupied.rfind(1, 0, i)
             else:
-                pass # Price level cleared
+                j = self.occupied.find(1, i + 1)
+            self.best_price = None if j < 0 else self.base + j
+
+    def best(self):
+        return self.best_price
+
+    def top(self, n: int):
+        """The best n prices, best first, stepping from the best with find/rfind."""
+        occupied = self.occupied
+        result = []
+        price = self.best_price
+        while price is not None and len(result) < n:
+            result.append(price)
+            i = price - self.base
+            j = occupied.rfind(1, 0, i) if self.descending else occupied.find(1, i + 1)
+            price = None if j < 0 else self.base + j
+        return result
+
+
+class FillBuffer:
+    """
+    Preallocated column storage for the fills of one sweep, reused across sweeps.
+    Only rows 0..n-1 are valid; the columns double in place when a sweep needs more.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.maker_id = [None] * capacity
+        self.order_id = [None] * capacity
+        self.price = [0] * capacity
+        self.qty = [0] * capacity
+        self.n = 0
+
+    def grow(self):
+        extra = self.capacity
+        self.maker_id.extend([None] * extra)
+        self.order_id.extend([None] * extra)
+        self.price.extend([0] * extra)
+        self.qty.extend([0] * extra)
+        self.capacity += extra
+
+    def __len__(self):
+        return self.n
+
+
+# Upper bound on each recycling pool, so a drained book does not pin its peak memory
+POOL_LIMIT = 1 << 16
+
+
+class BookBase:
+    """
+    The part of the order book API that is the same for every storage engine.
+    Subclasses provide bid_index/ask_index, fills, total_size, order_count,
+    tick_size and the sweep/add_order/cancel_order/get_snapshot primitives.
+    """
+
+    def to_ticks(self, price: float):
+        """Converts a price to book units (integer ticks in tick mode, unchanged otherwise)."""
+        if self.tick_size is None:
+            return price
+        return int(round(price / self.tick_size))
+
+    def to_price(self, ticks):
+        """Converts book units back to a price. Inverse of to_ticks."""
+        if self.tick_size is None or ticks is None:
+            return ticks
+        return round(ticks * self.tick_size, 10)
 
-        elif side == "ask":
-            if price in self.ask_dic:
-                orders_queue = self.ask_dic[price]
-                # Rebuild deque without the matching order
-                new_queue = deque()
-                for ords in orders_queue:
-                    if ords.order_id != order_id:
-                        new_queue.append(ords)
-                    else:
-                        found = True
-                self.ask_dic[price] = new_queue
-                if not new_queue:
-                    del self.ask_dic[price]
-
-                if not found:
-                    pass # Order executed
-            else:
-                pass # Price level cleared
-            
     def get_best_bid(self):
 
-        if not self.bid_dic:
-            return None 
-        best_bid_price = max(self.bid_dic.keys())
+        best_bid_price = self.bid_index.best()
 
         return best_bid_price
     
     def get_best_ask(self):
-        if not self.ask_dic:
-            return None
-        best_ask_price = min(self.ask_dic.keys())
+        best_ask_price = self.ask_index.best()
         return best_ask_price
-    
-
-
-            
-    def market_buy(self, size : int, trade_log = None):
 
+    def last_trades(self, trade_log: list = None):
+        """The last sweep's fills as (Maker_ID, Price, Qty, Time) tuples, appended to trade_log if given."""
         if trade_log is None:
             trade_log = []
-        best_ask_price = self.get_best_ask()
+        fills = self.fills
+        now = self.clock.now
+        maker_ids, prices, qtys = fills.maker_id, fills.price, fills.qty
+        trade_log.extend([(maker_ids[i], prices[i], qtys[i], now) for i in range(fills.n)])
+        return trade_log
 
-        if best_ask_price is None:
+    def market_buy(self, size : int, trade_log = None):
+        """
+        Buys `size` from the asks. If the asks run out the unfilled part is dropped
+        (immediate-or-cancel); the returned trade log only covers what was filled.
+        """
+        if self.order_count["ask"] == 0:
             raise ValueError("No asks in the order book")
-        
-        elif best_ask_price in self.ask_dic:
-            order_at_best = self.ask_dic[best_ask_price][0]
-            ord_size = order_at_best.size
-            seller_id = order_at_best.agent_id
-            if ord_size > size:
-                order_at_best.size -= size
-                trade_log.append((seller_id, best_ask_price, size, time.time()))
-
-
-            elif ord_size == size:
-                self.ask_dic[best_ask_price].remove(order_at_best)
-                trade_log.append((seller_id, best_ask_price, size, time.time()))
-
-                # CLEANUP: If that was the last order, delete the price level
-                if not self.ask_dic[best_ask_price]:
-                    del self.ask_dic[best_ask_price]
-
-            elif ord_size < size:
-                self.ask_dic[best_ask_price].remove(order_at_best)
-                trade_log.append((seller_id, best_ask_price, ord_size, time.time()))
-
-                # CLEANUP: If that was the last order, delete the price level
-                if not self.ask_dic[best_ask_price]:
-                    del self.ask_dic[best_ask_price]
-
-                new_size = size - ord_size
-                self.market_buy(new_size,trade_log=trade_log)
-                          
-                
-            else:
-                raise ValueError("Not enough size at best ask to fulfill market order")
-            
-        return trade_log
+        self.sweep("bid", size)
+        return self.last_trades(trade_log)
         
     def market_sell(self,size : int, trade_log = None):
-
-        if trade_log is None:
-            trade_log = []
-        best_bid_price = self.get_best_bid()
-        
-        if best_bid_price is None:
+        """
+        Sells `size` into the bids. If the bids run out the unfilled part is dropped
+        (immediate-or-cancel); the returned trade log only covers what was filled.
+        """
+        if self.order_count["bid"] == 0:
             raise ValueError("No bids in the order book")
-        
-        elif best_bid_price in self.bid_dic:
-            order_at_best = self.bid_dic[best_bid_price][0]
-            ord_size = order_at_best.size
-            buyer_id = order_at_best.agent_id
-            if ord_size > size:
-                order_at_best.size -= size
-                trade_log.append((buyer_id, best_bid_price, size, time.time()))
-            elif ord_size == size:
-                self.bid_dic[best_bid_price].remove(order_at_best)
-                trade_log.append((buyer_id, best_bid_price, size, time.time()))
-
-                if not self.bid_dic[best_bid_price]:
-                    del self.bid_dic[best_bid_price]
-            elif ord_size < size:
-                self.bid_dic[best_bid_price].remove(order_at_best)
-                trade_log.append((buyer_id, best_bid_price, ord_size, time.time()))
-
-                if not self.bid_dic[best_bid_price]:
-                    del self.bid_dic[best_bid_price]
-
-
-                new_size = size - ord_size
-                self.market_sell(new_size,trade_log=trade_log)
-                          
-            else:
-                raise ValueError("Not enough size at best bid to fulfill market order")
-        return trade_log
+        self.sweep("ask", size)
+        return self.last_trades(trade_log)
 
     def match_limit_order(self, side: str, limit_price: float, size: int):
         """
         Matches a limit order against the book. 
         Returns (trade_log, remaining_size)
         """
-        trade_log = []
-        remaining_size = size
-        
-        if side == "bid":
-            # Buying: Match against Asks (lowest first)
-            while remaining_size > 0:
-                best_ask = self.get_best_ask()
-                
-                # Stop if no asks or best ask is too expensive
-                if best_ask is None or best_ask > limit_price:
-                    break
-                
-                # We can match!
-                orders_at_price = self.ask_dic[best_ask]
-                
-                while orders_at_price and remaining_size > 0:
-                    order_match = orders_at_price[0] # FIFO
-                    match_qty = min(remaining_size, order_match.size)
-                    
-                    # Record Trade
-                    # (Maker_ID, Price, Qty, Time)
-                    trade_log.append((order_match.agent_id, best_ask, match_qty, time.time()))
-                    
-                    # Update sizes
-                    remaining_size -= match_qty
-                    order_match.size -= match_qty
-                    
-                    if order_match.size == 0:
-                        orders_at_price.popleft() # Remove full filled order
-                        
-                # Cleanup price level if empty
-                if not orders_at_price:
-                    del self.ask_dic[best_ask]
-
-        elif side == "ask":
-            # Selling: Match against Bids (highest first)
-            while remaining_size > 0:
-                best_bid = self.get_best_bid()
-                
-                # Stop if no bids or best bid is too low
-                if best_bid is None or best_bid < limit_price:
-                    break
-                
-                # We can match!
-                orders_at_price = self.bid_dic[best_bid]
-                
-                while orders_at_price and remaining_size > 0:
-                    order_match = orders_at_price[0] # FIFO
-                    match_qty = min(remaining_size, order_match.size)
-                    
-                    # Record Trade
-                    # (Maker_ID, Price, Qty, Time)
-                    trade_log.append((order_match.agent_id, best_bid, match_qty, time.time()))
-                    
-                    # Update sizes
-                    remaining_size -= match_qty
-                    order_match.size -= match_qty
-                    
-                    if order_match.size == 0:
-                        orders_at_price.popleft() # Remove full filled order
-                        
-                # Cleanup price level if empty
-                if not orders_at_price:
-                    del self.bid_dic[best_bid]
-                    
-        return trade_log, remaining_size
+        remaining_size = self.sweep(side, size, limit_price)
+        return self.last_trades(), remaining_size
     
     def calculate_imbalance(self):
-        total_bid_size = sum([sum([order.size for order in orders]) for orders in self.bid_dic.values()])
-        total_ask_size = sum([sum([order.size for order in orders]) for orders in self.ask_dic.values()])
+        total_bid_size = self.total_size["bid"]
+        total_ask_size = self.total_size["ask"]
 
         if total_bid_size + total_ask_size == 0:
             return 0.0  # Avoid division by zero
@@ -282,7 +356,309 @@ class OrderBook:
         imbalance = self.calculate_imbalance()
         return mid_price, spread, imbalance
 
+    def get_top_levels(self, n: int):
+        """
+        Like get_snapshot(), but only the best n levels of each side.
+        Only those levels are visited, however deep the book is.
+        """
+        bids = [(price, self._level_size("bid", price)) for price in self.bid_index.top(n)]
+        asks = [(price, self._level_size("ask", price)) for price in self.ask_index.top(n)]
+        return bids, asks
+
+    def depth_stats(self):
+        """Levels, orders and resting size per side."""
+        return {
+            "bid_levels": len(self.bid_dic), "ask_levels": len(self.ask_dic),
+            "bid_orders": self.order_count["bid"], "ask_orders": self.order_count["ask"],
+            "bid_size": self.total_size["bid"], "ask_size": self.total_size["ask"],
+        }
+
+    def pop_depth_changes(self):
+        """
+        L2 depth feed: the levels that changed since the previous call, as
+        [(side, price, new_size), ...] with new_size 0 for removed levels.
+        Tracking starts on the first call, which returns every level in the book.
+        """
+        if self.changed is None:
+            self.changed = {"bid": set(), "ask": set()}
+            bids, asks = self.get_snapshot()
+            return [("bid", p, s) for p, s in bids] + [("ask", p, s) for p, s in asks]
+
+        changes = []
+        for side, prices in self.changed.items():
+            for price in prices:
+                changes.append((side, price, self._level_size(side, price)))
+            prices.clear()
+        return changes
+
+    # --- Snapshots ---
+    # Resting orders are saved as columns in order id order, which is also their
+    # time priority within a level, so restoring them in that order rebuilds every
+    # FIFO. Columns: side (0 bid, 1 ask), price (book units), order_id, agent
+    # (index into meta["agents"]), size, time. Either engine restores either's file.
+
+    def snapshot(self, path: str):
+        """Saves the resting orders, the order id counter and the clock time to path (see snapshot.py)."""
+        meta, columns = self.snapshot_columns()
+        write_snapshot(path, meta, columns)
+
+    @classmethod
+    def restore(cls, path: str, clock=None):
+        """
+        A new book holding the snapshot's orders with their ids, timestamps and
+        priority. The clock (a new LogicalClock by default) is set to the snapshot's time.
+        """
+        meta, columns = read_snapshot(path)
+        return cls.from_columns(meta, columns, clock)
+
+    def _snapshot_meta(self, agent_ids: list):
+        return {"tick_size": self.tick_size, "counter": self.counter, "now": self.clock.now, "agents": agent_ids}
+
+    @property
+    def price_dtype(self):
+        return np.float64 if self.tick_size is None else np.int64
+
+
+def restored_clock(meta: dict, clock=None):
+    """The clock of a restored book or exchange, set to the snapshot's time."""
+    if clock is None:
+        clock = LogicalClock()
+    clock.now = meta["now"]
+    return clock
+
+
+@dataclasses.dataclass
+class OrderBook(BookBase):
+
+    bid_dic : dict = dataclasses.field(default_factory=dict)
+    ask_dic : dict = dataclasses.field(default_factory=dict)
+    counter : int = 0
+    # Tick mode: when set, every price the book sees (keys, limits, trade prices,
+    # best bid/ask, snapshots) is an integer number of ticks. Use to_ticks/to_price
+    # to convert at the boundary, as Exchange does.
+    tick_size : float = None
+    # Source of order and trade timestamps; Exchange shares its own clock with the book
+    clock : object = dataclasses.field(default_factory=LogicalClock)
+
+    def __post_init__(self):
+        # Keep best bid/ask O(1) instead of scanning every key with max/min
+        if self.tick_size is None:
+            self.bid_index = LevelIndex(self.bid_dic, descending=True)
+            self.ask_index = LevelIndex(self.ask_dic, descending=False)
+        else:
+            self.bid_index = TickLevelIndex(self.bid_dic, descending=True)
+            self.ask_index = TickLevelIndex(self.ask_dic, descending=False)
+        # The resting orders by id: {order_id: Order}. Each order knows its side and price.
+        self.orders = {}
+        # Side aggregates, maintained on every add/cancel/fill so stats never scan orders
+        self.total_size = {"bid": 0, "ask": 0}
+        self.order_count = {"bid": 0, "ask": 0}
+        # Scratch space the sweep engine writes its fills into
+        self.fills = FillBuffer()
+        # {side: set of prices} touched since the last pop_depth_changes(); None until first used
+        self.changed = None
+        # Fully filled/cancelled Order and PriceLevel objects, handed out again
+        # by new_order/_new_level instead of allocating fresh ones
+        self.order_pool = []
+        self.level_pool = []
+
+    def new_order(self, agent_id: str, size: int):
+        """
+        An Order ready for add_order, recycled from the pool when possible.
+        Once added, the book owns it: after it is filled or cancelled it goes
+        back to the pool, so callers must not hold on to it.
+        """
+        if self.order_pool:
+            order = self.order_pool.pop()
+            order.agent_id = agent_id
+            order.size = size
+            return order
+        return Order(agent_id=agent_id, size=size)
+
+    def _release_order(self, order: Order):
+        if len(self.order_pool) < POOL_LIMIT:
+            self.order_pool.append(order)
+
+    def _new_level(self, side: str, price: float):
+        if self.level_pool:
+            q = self.level_pool.pop()
+            q.reset(price)
+        else:
+            q = PriceLevel(price)
+        if side == "bid":
+            self.bid_dic[price] = q
+            self.bid_index.add(price)
+        else:
+            self.ask_dic[price] = q
+            self.ask_index.add(price)
+        return q
+
+    def _remove_level(self, side: str, price: float):
+        if side == "bid":
+            level = self.bid_dic.pop(price)
+            self.bid_index.discard(price)
+        else:
+            level = self.ask_dic.pop(price)
+            self.ask_index.discard(price)
+        if len(self.level_pool) < POOL_LIMIT:
+            self.level_pool.append(level)
+
+    def add_order(self, side: str, price: float, order : Order):
+         
+        self.counter += 1
+        order.order_id = self.counter
+        order.time_stamp = self.clock.now
+        order.side = side
+        order.price = price
+        self.orders[order.order_id] = order
+        self.total_size[side] += order.size
+        self.order_count[side] += 1
+        if self.changed is not None:
+            self.changed[side].add(price)
+
+        if side == "bid":
+            if price in self.bid_dic:
+                
+                self.bid_dic[price].append(order)
+            else:
+                self._new_level("bid", price).append(order)
+
+        elif side == "ask":
+            if price in self.ask_dic:
+                self.ask_dic[price].append(order)
+            else:
+                self._new_level("ask", price).append(order)
     
+
+    def cancel_order(self, order_id: int):
+        """
+        Removes a resting order from the book in O(1).
+        Returns (side, price, remaining_size) of the cancelled order,
+        or None if the order is not resting (already executed or unknown).
+        """
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return None # Order executed already
+
+        side, price = order.side, order.price
+        levels = self.bid_dic if side == "bid" else self.ask_dic
+        level = levels[price]
+        level.unlink(order)
+        self.total_size[side] -= order.size
+        self.order_count[side] -= 1
+        if self.changed is not None:
+            self.changed[side].add(price)
+        if not level:
+            self._remove_level(side, price)
+        self._release_order(order)
+        return side, price, order.size
+            
+    def sweep(self, side: str, size: int, limit_price: float = None):
+        """
+        Single-pass matching engine shared by market and marketable limit orders.
+        Takes up to `size` from the opposite side of `side` ("bid" buys from the asks,
+        "ask" sells into the bids), best price first and FIFO within a level,
+        stopping at limit_price if given (None = market order).
+        Fills are written to self.fills (rows 0..fills.n-1), which is reused on
+        every call. Returns the unfilled size: running out of liquidity is not an
+        error, the caller decides what to do with the remainder.
+        """
+        if side == "bid":
+            book_side, levels, index = "ask", self.ask_dic, self.ask_index
+        else:
+            book_side, levels, index = "bid", self.bid_dic, self.bid_index
+
+        fills = self.fills
+        maker_ids, order_ids, prices, qtys = fills.maker_id, fills.order_id, fills.price, fills.qty
+        n = 0
+        orders = self.orders
+        changed = self.changed[book_side] if self.changed is not None else None
+        remaining = size
+        filled_orders = 0
+
+        while remaining > 0:
+            price = index.best()
+            if price is None:
+                break # Book side exhausted
+            if limit_price is not None and (price > limit_price if side == "bid" else price < limit_price):
+                break # Best level no longer crosses the limit
+
+            level = levels[price]
+            while remaining > 0 and level.count:
+                order = level.head # FIFO
+                qty = order.size if order.size < remaining else remaining
+
+                if n == fills.capacity:
+                    fills.grow()
+                    maker_ids, order_ids, prices, qtys = fills.maker_id, fills.order_id, fills.price, fills.qty
+                maker_ids[n] = order.agent_id
+                order_ids[n] = order.order_id
+                prices[n] = price
+                qtys[n] = qty
+                n += 1
+
+                remaining -= qty
+                if qty == order.size:
+                    # Fully filled: unlink from the head and forget it
+                    level.unlink(order)
+                    order.size = 0
+                    del orders[order.order_id]
+                    self._release_order(order)
+                    filled_orders += 1
+                else:
+                    level.reduce(order, qty)
+
+            if changed is not None:
+                changed.add(price)
+            if not level.count:
+                self._remove_level(book_side, price)
+
+        fills.n = n
+        self.total_size[book_side] -= size - remaining
+        self.order_count[book_side] -= filled_orders
+        return remaining
+
+    def _level_size(self, side: str, price: float):
+        level = (self.bid_dic if side == "bid" else self.ask_dic).get(price)
+        return level.total_size if level is not None else 0
+
+    def snapshot_columns(self):
+        """(meta, columns) of BookBase.snapshot, built in memory."""
+        orders = list(self.orders.values())  # insertion order, i.e. by order id
+        agent_index = {}
+        agents = [agent_index.setdefault(o.agent_id, len(agent_index)) for o in orders]
+        columns = {
+            "side": np.array([o.side == "ask" for o in orders], dtype=np.int8),
+            "price": np.array([o.price for o in orders], dtype=self.price_dtype),
+            "order_id": np.array([o.order_id for o in orders], dtype=np.int64),
+            "agent": np.array(agents, dtype=np.int32),
+            "size": np.array([o.size for o in orders]) if orders else np.zeros(0, dtype=np.int64),
+            "time": np.array([o.time_stamp for o in orders], dtype=np.float64),
+        }
+        return self._snapshot_meta(list(agent_index)), columns
+
+    @classmethod
+    def from_columns(cls, meta: dict, columns: dict, clock=None):
+        """A book rebuilt from snapshot columns (see BookBase.restore)."""
+        book = cls(tick_size=meta["tick_size"], clock=restored_clock(meta, clock))
+        book.counter = meta["counter"]
+        agent_ids = meta["agents"]
+        orders = book.orders
+        rows = zip(columns["side"].tolist(), columns["price"].tolist(), columns["order_id"].tolist(),
+                   columns["agent"].tolist(), columns["size"].tolist(), columns["time"].tolist())
+        for ask, price, order_id, agent, size, time_stamp in rows:
+            side = "ask" if ask else "bid"
+            level = (book.ask_dic if ask else book.bid_dic).get(price)
+            if level is None:
+                level = book._new_level(side, price)
+            order = Order(agent_id=agent_ids[agent], order_id=order_id, size=size, time_stamp=time_stamp,
+                          side=side, price=price)
+            level.append(order)
+            orders[order_id] = order
+            book.total_size[side] += size
+            book.order_count[side] += 1
+        return book
+
     def get_snapshot(self):
         """
         Returns a snapshot of the book for visualization.
@@ -291,13 +667,11 @@ class OrderBook:
         """
         bids = []
         for price in sorted(self.bid_dic.keys(), reverse=True):
-            total_size = sum(order.size for order in self.bid_dic[price])
-            bids.append((price, total_size))
+            bids.append((price, self.bid_dic[price].total_size))
             
         asks = []
         for price in sorted(self.ask_dic.keys()):
-            total_size = sum(order.size for order in self.ask_dic[price])
-            asks.append((price, total_size))
+            asks.append((price, self.ask_dic[price].total_size))
             
         return bids, asks
 
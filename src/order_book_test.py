@@ -0,0 +1,263 @@
+import random
+import unittest
+from agent_logic import Agent, Order
+from order_book import OrderBook
+from exchange import Exchange
+from visualize_book import DepthHistory
+
+
+class TestLevelIndex(unittest.TestCase):
+    def setUp(self):
+        self.ob = OrderBook()
+
+    def random_price(self, rng):
+        return round(rng.uniform(90, 110), 1)
+
+    def random_walk(self, check):
+        # Random adds, cancels and sweeps, calling check() after every step
+        rng = random.Random(7)
+        resting = []
+        for _ in range(3000):
+            p = rng.random()
+            if p < 0.6:
+                side = rng.choice(["bid", "ask"])
+                price = self.random_price(rng)
+                order = Order(agent_id="A", size=rng.randint(1, 5))
+                self.ob.add_order(side, price, order)
+                resting.append((side, price, order.order_id))
+            elif p < 0.8 and resting:
+                side, price, order_id = resting.pop(rng.randrange(len(resting)))
+                self.ob.cancel_order(order_id)
+            elif p < 0.9:
+                side = rng.choice(["bid", "ask"])
+                size = min(rng.randint(1, 10), self.ob.total_size[side])
+                if size and side == "ask":
+                    self.ob.market_buy(size)
+                elif size:
+                    self.ob.market_sell(size)
+            else:
+                side = rng.choice(["bid", "ask"])
+                self.ob.match_limit_order(side, self.random_price(rng), rng.randint(1, 10))
+            check()
+
+    def test_best_prices_track_levels(self):
+        # best bid/ask must always equal max/min of the keys
+        def check():
+            expected_bid = max(self.ob.bid_dic) if self.ob.bid_dic else None
+            expected_ask = min(self.ob.ask_dic) if self.ob.ask_dic else None
+            self.assertEqual(self.ob.get_best_bid(), expected_bid)
+            self.assertEqual(self.ob.get_best_ask(), expected_ask)
+        self.random_walk(check)
+
+    def test_aggregates_match_orders(self):
+        # Incremental level/side totals must equal a full recount of the resting orders
+        def check():
+            for side, levels in (("bid", self.ob.bid_dic), ("ask", self.ob.ask_dic)):
+                for level in levels.values():
+                    self.assertEqual(level.total_size, sum(o.size for o in level))
+                self.assertEqual(self.ob.total_size[side], sum(l.total_size for l in levels.values()))
+                self.assertEqual(self.ob.order_count[side], sum(len(l) for l in levels.values()))
+        self.random_walk(check)
+
+    def test_level_reused_after_removal(self):
+        self.ob.add_order("ask", self.ob.to_ticks(101.0), Order(agent_id="A", size=1))
+        self.ob.add_order("ask", self.ob.to_ticks(102.0), Order(agent_id="A", size=1))
+        self.ob.market_buy(1)
+        self.assertEqual(self.ob.get_best_ask(), self.ob.to_ticks(102.0))
+
+        # Re-create the level that was just emptied
+        self.ob.add_order("ask", self.ob.to_ticks(101.0), Order(agent_id="A", size=1))
+        self.assertEqual(self.ob.get_best_ask(), self.ob.to_ticks(101.0))
+        self.ob.market_buy(2)
+        self.assertIsNone(self.ob.get_best_ask())
+
+
+class TestTickLevelIndex(TestLevelIndex):
+    def setUp(self):
+        self.ob = OrderBook(tick_size=0.1)
+
+    def random_price(self, rng):
+        # Wide enough to force the dense window to grow in both directions
+        return rng.randint(-3000, 3000)
+
+
+class TestDepthFeed(unittest.TestCase):
+    def setUp(self):
+        self.ob = OrderBook()
+
+    def test_deltas_rebuild_every_frame(self):
+        rng = random.Random(11)
+        history, snapshots = DepthHistory(keyframe_every=7), []
+        for step in range(1500):
+            side = rng.choice(["bid", "ask"])
+            p = rng.random()
+            if p < 0.55:
+                self.ob.add_order(side, self.ob.to_ticks(round(rng.gauss(100, 2), 1)), Order(agent_id="A", size=rng.randint(1, 5)))
+            elif p < 0.75 and self.ob.order_count[side]:
+                order_id = rng.choice([o.order_id for lv in self.ob.bid_dic.values() for o in lv] +
+                                      [o.order_id for lv in self.ob.ask_dic.values() for o in lv])
+                self.ob.cancel_order(order_id)
+            else:
+                self.ob.match_limit_order(side, self.ob.to_ticks(round(rng.gauss(100, 2), 1)), rng.randint(1, 12))
+            if step % 5 == 0:
+                history.record(self.ob.pop_depth_changes())
+                snapshots.append(self.ob.get_snapshot())
+
+        self.assertEqual(len(history), len(snapshots))
+        for i in range(len(snapshots)):
+            self.assertEqual(history[i], snapshots[i])
+        self.assertEqual(history[::10], snapshots[::10])
+
+    def test_removed_level_reported_as_zero(self):
+        ask, bid = self.ob.to_ticks(101.0), self.ob.to_ticks(99.0)
+        self.ob.add_order("ask", ask, Order(agent_id="A", size=2))
+        self.assertEqual(self.ob.pop_depth_changes(), [("ask", ask, 2)])
+        self.ob.add_order("ask", ask, Order(agent_id="A", size=1))
+        self.ob.add_order("bid", bid, Order(agent_id="B", size=4))
+        self.assertEqual(sorted(self.ob.pop_depth_changes()), [("ask", ask, 3), ("bid", bid, 4)])
+        self.ob.market_buy(3)
+        self.assertEqual(self.ob.pop_depth_changes(), [("ask", ask, 0)])
+        self.assertEqual(self.ob.pop_depth_changes(), [])
+
+    def test_top_levels(self):
+        rng = random.Random(5)
+        for _ in range(2000):
+            self.ob.add_order(rng.choice(["bid", "ask"]), rng.randint(1, 400), Order(agent_id="A", size=1))
+        self.ob.match_limit_order("bid", 150, 300) # leaves stale heap entries behind
+        bids, asks = self.ob.get_snapshot()
+        for n in (1, 5, 50, 10_000):
+            self.assertEqual(self.ob.get_top_levels(n), (bids[:n], asks[:n]))
+
+
+class TestTickDepthFeed(TestDepthFeed):
+    def setUp(self):
+        self.ob = OrderBook(tick_size=0.1)
+
+
+class TestCancelById(unittest.TestCase):
+    def setUp(self):
+        self.ob = OrderBook()
+        self.orders = [Order(agent_id=f"A{i}", size=i + 1) for i in range(3)]
+        for order in self.orders:
+            self.ob.add_order("bid", 99.0, order)
+
+    def test_cancel_middle_keeps_priority(self):
+        first, middle, last = self.orders
+        self.assertEqual(self.ob.cancel_order(middle.order_id), ("bid", 99.0, 2))
+
+        level = self.ob.bid_dic[99.0]
+        self.assertEqual([o.order_id for o in level], [first.order_id, last.order_id])
+        self.assertIs(level[0], first)
+        self.assertEqual(len(level), 2)
+
+    def test_cancel_after_partial_fill_returns_remaining(self):
+        first = self.orders[0]
+        self.ob.market_sell(2) # fills first (1) and 1 of the second
+        self.assertIsNone(self.ob.cancel_order(first.order_id))
+        self.assertEqual(self.ob.cancel_order(self.orders[1].order_id), ("bid", 99.0, 1))
+
+    def test_cancel_last_order_removes_level(self):
+        for order in self.orders:
+            self.ob.cancel_order(order.order_id)
+        self.assertNotIn(99.0, self.ob.bid_dic)
+        self.assertIsNone(self.ob.get_best_bid())
+        self.assertEqual(self.ob.orders, {})
+
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        self.ob = OrderBook()
+
+    def test_deep_sweep_is_not_recursive(self):
+        # One order per level, far more levels than the recursion limit
+        for i in range(5000):
+            self.ob.add_order("ask", 100.0 + i, Order(agent_id="A", size=1))
+        trades = self.ob.market_buy(5000)
+        self.assertEqual(len(trades), 5000)
+        self.assertEqual(trades[-1][1], 5099.0)
+        self.assertEqual(self.ob.ask_dic, {})
+        self.assertEqual(self.ob.total_size["ask"], 0)
+
+    def test_insufficient_liquidity_fills_what_is_there(self):
+        self.ob.add_order("bid", 99.0, Order(agent_id="A", size=2))
+        self.ob.add_order("bid", 98.0, Order(agent_id="B", size=3))
+        trades = self.ob.market_sell(10)
+        self.assertEqual([(t[0], t[1], t[2]) for t in trades], [("A", 99.0, 2), ("B", 98.0, 3)])
+        self.assertIsNone(self.ob.get_best_bid())
+        with self.assertRaises(ValueError):
+            self.ob.market_sell(1)
+
+    def test_limit_stops_at_price(self):
+        for price in (100.0, 101.0, 102.0):
+            self.ob.add_order("ask", price, Order(agent_id="A", size=2))
+        remaining = self.ob.sweep("bid", 5, limit_price=101.0)
+        self.assertEqual(remaining, 1)
+        self.assertEqual(self.ob.fills.n, 2)
+        self.assertEqual(self.ob.fills.price[:2], [100.0, 101.0])
+        self.assertEqual(self.ob.get_best_ask(), 102.0)
+
+    def test_fill_buffer_grows(self):
+        for _ in range(1000):
+            self.ob.add_order("ask", 100.0, Order(agent_id="A", size=1))
+        self.assertEqual(self.ob.sweep("bid", 1000), 0)
+        self.assertEqual(self.ob.fills.n, 1000)
+        self.assertGreaterEqual(self.ob.fills.capacity, 1000)
+
+
+class TestPooling(unittest.TestCase):
+    def test_filled_and_cancelled_objects_are_reused(self):
+        ob = OrderBook()
+        first = ob.new_order("A", 2)
+        ob.add_order("ask", 101.0, first)
+        ob.market_buy(2)
+        self.assertEqual(ob.order_pool, [first])
+        self.assertEqual(len(ob.level_pool), 1)
+
+        second = ob.new_order("B", 3)
+        self.assertIs(second, first)
+        ob.add_order("ask", 102.0, second)
+        self.assertEqual(ob.level_pool, [])
+        self.assertEqual((second.agent_id, second.size), ("B", 3))
+        self.assertEqual(second.order_id, 2)
+        self.assertEqual(ob.get_snapshot(), ([], [(102.0, 3)]))
+
+        self.assertEqual(ob.cancel_order(second.order_id), ("ask", 102.0, 3))
+        self.assertEqual(ob.order_pool, [second])
+
+    def test_orders_are_slotted(self):
+        self.assertFalse(hasattr(Order(), "__dict__"))
+
+
+class TestTickMode(unittest.TestCase):
+    def setUp(self):
+        self.ex = Exchange(tick_size=0.01)
+        self.alice = Agent(id="Alice", cash=10000, inventory=100)
+        self.bob = Agent(id="Bob", cash=10000, inventory=100)
+        self.ex.register_agent(self.alice)
+        self.ex.register_agent(self.bob)
+
+    def test_prices_stored_as_ticks(self):
+        self.ex.process_limit_order(self.alice, "ask", 100.0, 2)
+        self.ex.process_limit_order(self.alice, "ask", 100.004, 2) # snaps onto the same level
+        self.assertEqual(list(self.ex.order_book.ask_dic), [10000])
+        self.assertEqual(len(self.ex.order_book.ask_dic[10000]), 2)
+        self.assertEqual(self.ex.get_snapshot(), ([], [(100.0, 4)]))
+
+    def test_settlement_in_prices(self):
+        self.ex.process_limit_order(self.alice, "ask", 100.25, 2)
+        self.ex.process_limit_order(self.bob, "bid", 99.75, 1)
+        mid, spread, _ = self.ex.get_book_stats()
+        self.assertAlmostEqual(mid, 100.0)
+        self.assertAlmostEqual(spread, 0.5)
+
+        self.ex.process_limit_order(self.bob, "bid", 101.0, 2)
+        self.assertAlmostEqual(self.alice.cash, 10000 + 200.5)
+        self.assertAlmostEqual(self.bob.cash, 10000 - 99.75 - 200.5)
+        self.assertEqual(self.bob.inventory, 102)
+
+        self.ex.process_limit_order(self.alice, "ask", 99.0, 1) # hits Bob's 99.75 bid
+        self.assertAlmostEqual(self.alice.cash, 10000 + 200.5 + 99.75)
+
+
+if __name__ == '__main__':
+    unittest.main()
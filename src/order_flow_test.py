@@ -0,0 +1,77 @@
+import contextlib
+import io
+import random
+import unittest
+import numpy as np
+from exchange import Exchange
+from ZI_test import draw_order_flow, initialise_agents, random_orders, vectorized_random_orders
+
+
+class ReplayRng:
+    """Feeds pre-drawn order flow to random_orders through the random/np.random calls it makes."""
+
+    def __init__(self, flow: dict, agent_list: list):
+        self.flow = flow
+        self.agent_list = agent_list
+        self.k = 0  # advanced by uniform(), the last per-step draw before the action
+
+    def choice(self, seq):
+        if seq is self.agent_list:
+            return seq[self.flow["agent"][self.k]]
+        if seq == ["bid", "ask"]:
+            return "bid" if self.flow["is_bid"][self.k] else "ask"
+        if seq == ["buy", "sell"]:
+            return "buy" if self.flow["market_buy"][self.k - 1] else "sell"
+        return seq[int(self.flow["cancel_pick"][self.k - 1] * len(seq))]
+
+    def pareto(self, a):
+        return self.flow["offset"][self.k]
+
+    def randint(self, a, b):
+        return int(self.flow["size"][self.k])
+
+    def uniform(self, a, b):
+        self.k += 1
+        return self.flow["action"][self.k - 1]
+
+
+class TestOrderFlow(unittest.TestCase):
+    def run_orders(self, vectorized: bool, num_orders: int):
+        agents = initialise_agents("Random", 10, random.Random(1))
+        ex = Exchange()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for agent in agents:
+                ex.register_agent(agent)
+            if vectorized:
+                # Several blocks, the last one partial
+                return vectorized_random_orders(agents, ex, num_orders, rng=np.random.default_rng(3),
+                                                block_size=512, record_depth=False)
+            # The same draws, one block, replayed through the scalar calls of random_orders
+            flow = {}
+            rng = np.random.default_rng(3)
+            for start in range(0, num_orders, 512):
+                block = draw_order_flow(rng, len(agents), min(512, num_orders - start))
+                for name, column in block.items():
+                    flow[name] = np.concatenate((flow[name], column)) if name in flow else column
+            replay = ReplayRng(flow, agents)
+            return random_orders(agents, ex, num_orders, rng=replay, np_rng=replay, record_depth=False)
+
+    def test_same_steps_as_random_orders(self):
+        expected = self.run_orders(False, 2000)
+        got = self.run_orders(True, 2000)
+        np.testing.assert_array_equal(got[0], expected[0])
+        np.testing.assert_array_equal(got[1], expected[1])
+        np.testing.assert_array_equal(got[2], expected[2])
+
+    def test_marginals(self):
+        flow = draw_order_flow(np.random.default_rng(0), 10, 100_000)
+        self.assertEqual(flow["agent"].min(), 0)
+        self.assertEqual(flow["agent"].max(), 9)
+        self.assertEqual(set(np.unique(flow["size"]).tolist()), {1, 2, 3, 4, 5})
+        self.assertAlmostEqual(flow["is_bid"].mean(), 0.5, delta=0.01)
+        self.assertAlmostEqual(flow["action"].mean(), 0.5, delta=0.01)
+        self.assertTrue((flow["offset"] >= 0).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
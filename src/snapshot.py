@@ -0,0 +1,70 @@
+"""
+Columnar binary snapshots of order books and exchanges, so a warmed-up state
+can be saved once and restored many times (e.g. to fork simulations).
+
+File layout:
+    magic b"IFS1" | version u2 | pad 2 | header length u4 | JSON header | columns
+The JSON header holds the metadata and, per column, its name, NumPy dtype,
+byte offset and length. Every column starts on a 64-byte boundary, so
+read_snapshot() hands them out as views of one read-only memory map instead
+of copying the file; restoring copies only what the new book keeps.
+
+See BookBase.snapshot/restore and Exchange.snapshot/restore.
+"""
+import json
+import struct
+import numpy as np
+
+MAGIC = b"IFS1"
+ALIGN = 64
+
+_PREAMBLE = struct.Struct("<4sHxxI")  # magic, version, length of the JSON header
+
+
+def _aligned(n: int):
+    return -(-n // ALIGN) * ALIGN
+
+
+def write_snapshot(path: str, meta: dict, columns: dict):
+    """Writes {name: 1-d array} and a JSON-serialisable meta dict to path."""
+    columns = {name: np.ascontiguousarray(values) for name, values in columns.items()}
+    relative = []
+    offset = 0
+    for values in columns.values():
+        relative.append(offset)
+        offset = _aligned(offset + values.nbytes)
+
+    # Column offsets depend on the header length, which depends on the offsets:
+    # grow the room left for the header until the encoded header fits in it.
+    start = 0
+    while True:
+        layout = [[name, values.dtype.str, start + rel, len(values)]
+                  for (name, values), rel in zip(columns.items(), relative)]
+        encoded = json.dumps({"meta": meta, "columns": layout}).encode()
+        if _PREAMBLE.size + len(encoded) <= start:
+            break
+        start = _aligned(_PREAMBLE.size + len(encoded))
+
+    with open(path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, 1, len(encoded)))
+        f.write(encoded)
+        for (name, _, offset, _), values in zip(layout, columns.values()):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(values.tobytes())
+
+
+def read_snapshot(path: str):
+    """
+    Returns (meta, {name: array}). The arrays are read-only views of a memory
+    map of the file, which stays open as long as any of them is referenced.
+    """
+    buf = np.memmap(path, dtype=np.uint8, mode="r")
+    magic, version, length = _PREAMBLE.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a snapshot file")
+    header = json.loads(bytes(buf[_PREAMBLE.size:_PREAMBLE.size + length]))
+    columns = {}
+    for name, dtype, offset, n in header["columns"]:
+        dtype = np.dtype(dtype)
+        columns[name] = buf[offset:offset + n * dtype.itemsize].view(dtype)
+    return header["meta"], columns
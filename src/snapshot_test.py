@@ -0,0 +1,112 @@
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+from agent_logic import LPLT_agent
+from array_order_book import ArrayOrderBook
+from exchange import Exchange
+from exchange_test import make_agents, random_commands
+from order_book import OrderBook
+from snapshot import read_snapshot, write_snapshot
+
+AGENT_IDS = [f"agent_{i}" for i in range(8)]
+
+
+def levels(book):
+    # Every level's orders in queue order, as (order_id, agent_id, size, time_stamp)
+    return {(side, price): [(o.order_id, o.agent_id, o.size, o.time_stamp) for o in level]
+            for side, dic in (("bid", book.bid_dic), ("ask", book.ask_dic)) for price, level in dic.items()}
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "state.snap")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def warm_exchange(self, n: int = 3000, seed: int = 1, **exchange_args):
+        ex = Exchange(**exchange_args)
+        for agent in make_agents(8):
+            ex.register_agent(agent)
+        ex.submit_batch(random_commands(random.Random(seed), AGENT_IDS, n))
+        return ex
+
+    def assert_same_state(self, a, b):
+        self.assertEqual(a.get_snapshot(), b.get_snapshot())
+        self.assertEqual(levels(a.order_book), levels(b.order_book))
+        self.assertEqual(a.order_book.counter, b.order_book.counter)
+        n = len(a.ledger)
+        self.assertEqual(a.ledger.ids, b.ledger.ids)
+        for column in ("cash", "inventory", "locked_cash", "locked_inventory"):
+            np.testing.assert_array_equal(getattr(a.ledger, column)[:n], getattr(b.ledger, column)[:n])
+        for agent_id, agent in a.agents.items():
+            self.assertEqual(agent.active_orders, b.agents[agent_id].active_orders)
+        for name, column in a.tape.columns().items():
+            np.testing.assert_array_equal(column, b.tape.column(name))
+        self.assertEqual(a.clock.now, b.clock.now)
+
+    def test_file_format(self):
+        columns = {"a": np.arange(5, dtype=np.int8), "b": np.linspace(0, 1, 3), "empty": np.zeros(0)}
+        write_snapshot(self.path, {"x": 1}, columns)
+        meta, loaded = read_snapshot(self.path)
+        self.assertEqual(meta, {"x": 1})
+        for name, values in columns.items():
+            np.testing.assert_array_equal(loaded[name], values)
+            self.assertEqual(loaded[name].dtype, values.dtype)
+        self.assertFalse(loaded["b"].flags.writeable)
+
+    def test_book_round_trip_across_engines(self):
+        for tick_size in (None, 0.01):
+            for source in ("dict", "array"):
+                book = self.warm_exchange(tick_size=tick_size, book_type=source).order_book
+                book.snapshot(self.path)
+                for cls in (OrderBook, ArrayOrderBook):
+                    with self.subTest(tick_size=tick_size, source=source, target=cls.__name__):
+                        restored = cls.restore(self.path)
+                        self.assertEqual(levels(restored), levels(book))
+                        self.assertEqual(restored.get_snapshot(), book.get_snapshot())
+                        self.assertEqual((restored.get_best_bid(), restored.get_best_ask()),
+                                         (book.get_best_bid(), book.get_best_ask()))
+                        self.assertEqual(restored.total_size, book.total_size)
+                        self.assertEqual(restored.order_count, book.order_count)
+                        self.assertEqual(restored.clock.now, book.clock.now)
+
+    def test_exchange_carries_on_identically(self):
+        for book_type in ("dict", "array"):
+            with self.subTest(book_type=book_type):
+                live = self.warm_exchange(tick_size=0.01, book_type=book_type, minor_units=100)
+                live.snapshot(self.path)
+                restored = Exchange.restore(self.path)
+                self.assertEqual(restored.ledger.cash.dtype, np.int64)
+                self.assert_same_state(live, restored)
+
+                more = random_commands(random.Random(2), AGENT_IDS, 2000)
+                live.submit_batch(more)
+                restored.submit_batch(more)
+                self.assert_same_state(live, restored)
+
+    def test_forks_are_independent(self):
+        self.warm_exchange(book_type="array").snapshot(self.path)
+        a, b = Exchange.restore(self.path), Exchange.restore(self.path)
+        before = b.get_snapshot(), b.agents["agent_0"].cash
+        a.submit_batch(random_commands(random.Random(3), AGENT_IDS, 500))
+        self.assertNotEqual(a.get_snapshot(), before[0])
+        self.assertEqual((b.get_snapshot(), b.agents["agent_0"].cash), before)
+
+    def test_restore_binds_given_agents(self):
+        self.warm_exchange().snapshot(self.path)
+        mine = LPLT_agent(id="agent_3")
+        ex = Exchange.restore(self.path, agents=[mine])
+        self.assertIs(ex.agents["agent_3"], mine)
+        self.assertIsInstance(mine, LPLT_agent)
+        self.assertEqual(mine.cash, ex.ledger.cash[3])
+        self.assertTrue(mine.active_orders)
+        # Others are plain Agents
+        self.assertEqual(ex.agents["agent_0"].id, "agent_0")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,25 +1,178 @@
+"""
+Market-data recorder: subscribes to a websocket stream (Binance BTCUSDT
+trades by default) and appends every frame, as received, one per line.
+
+    python stream.py [--url URL] [--out stream_data.txt] [--compress] [--max-bytes N] [--duration SECONDS]
+
+Runs until interrupted (Ctrl-C or SIGTERM) or for --duration seconds. Frames
+are written raw, without parsing, through one buffered file handle that is
+flushed every --flush-interval seconds and on exit. --compress writes gzip
+(out.gz); --max-bytes rotates to numbered segments (stream_data.00001.txt,
+...) of about that many bytes, continuing after the last existing segment.
+Dropped connections are retried with exponential backoff.
+"""
+import argparse
 import asyncio
-import websockets
-import json
+import gzip
+import os
+import random
+import signal
 import time
+import websockets
+
+DEFAULT_URL = "wss://stream.binance.com:9443/ws/btcusdt@trade"
+
+
+class Recorder:
+    """
+    Appends frames to one open, buffered file. With max_bytes set, each file
+    is a numbered segment and a new one is started once the current one has
+    max_bytes written (uncompressed) to it.
+    """
+
+    def __init__(self, path: str, compress: bool = False, max_bytes: int = None, buffer_size: int = 1 << 20):
+        self.path = path
+        self.compress = compress
+        self.max_bytes = max_bytes
+        self.buffer_size = buffer_size
+        self.frames = 0
+        self.segment = self._last_segment() if max_bytes is not None else None
+        self.file = None
+        self.raw = None
+        self.file_path = None
+        self.written = 0
+        self._open()
+
+    def segment_path(self, n: int):
+        stem, suffix = os.path.splitext(self.path)
+        return f"{stem}.{n:05d}{suffix}" + (".gz" if self.compress else "")
+
+    def _last_segment(self):
+        # Continue numbering after the segments of earlier runs rather than overwriting them
+        n = 0
+        while os.path.exists(self.segment_path(n + 1)):
+            n += 1
+        return n
+
+    def _open(self):
+        if self.segment is None:
+            self.file_path = self.path + (".gz" if self.compress else "")
+        else:
+            self.segment += 1
+            self.file_path = self.segment_path(self.segment)
+        self.raw = open(self.file_path, "ab", buffering=self.buffer_size)
+        # A gzip file opened in append mode gets a new member; gzip readers read all members in turn
+        self.file = gzip.GzipFile(fileobj=self.raw, mode="ab") if self.compress else self.raw
+        self.written = 0
+
+    def write(self, frame):
+        """Appends one frame (str or bytes) and a newline."""
+        if isinstance(frame, str):
+            frame = frame.encode()
+        self.file.write(frame + b"\n")
+        self.frames += 1
+        self.written += len(frame) + 1
+        if self.max_bytes is not None and self.written >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        self.close()
+        self._open()
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self.file is None:
+            return
+        self.file.close()
+        self.raw.close()  # GzipFile does not close a file object it was given
+        self.file = None
+
+
+def backoff_delays(initial: float = 0.5, maximum: float = 30.0, rng=random):
+    """Exponentially growing retry delays, capped at maximum, with +-25% jitter."""
+    delay = initial
+    while True:
+        yield delay * rng.uniform(0.75, 1.25)
+        delay = min(delay * 2, maximum)
+
+
+async def record(url: str, recorder: Recorder, stop: asyncio.Event = None, flush_interval: float = 1.0,
+                 initial_backoff: float = 0.5, max_backoff: float = 30.0, log=print):
+    """
+    Records url into recorder until stop is set, reconnecting whenever the
+    connection fails or closes. The backoff restarts after any connection
+    that delivered a frame. Returns the number of connections made.
+    """
+    stop = stop if stop is not None else asyncio.Event()
+    connections = 0
+
+    async def flush_periodically():
+        while True:
+            await asyncio.sleep(flush_interval)
+            recorder.flush()
 
+    async def receive(ws):
+        async for frame in ws:
+            recorder.write(frame)
 
-async def main():
-    url = "wss://stream.binance.com:9443/ws/btcusdt@trade"
-    async with websockets.connect(url) as ws:
+    flusher = asyncio.create_task(flush_periodically())
+    stopped = asyncio.create_task(stop.wait())
+    delays = backoff_delays(initial_backoff, max_backoff)
+    try:
+        while not stop.is_set():
+            received = recorder.frames
+            try:
+                async with websockets.connect(url) as ws:
+                    connections += 1
+                    log(f"Connected to {url}")
+                    receiver = asyncio.create_task(receive(ws))
+                    await asyncio.wait((receiver, stopped), return_when=asyncio.FIRST_COMPLETED)
+                    if not receiver.done():
+                        receiver.cancel()
+                        return connections
+                    receiver.result()
+                log("Connection closed by the server")
+            except (OSError, asyncio.TimeoutError, websockets.ConnectionClosed, websockets.InvalidHandshake) as e:
+                log(f"Connection lost ({type(e).__name__}: {e})")
+            if recorder.frames > received:
+                delays = backoff_delays(initial_backoff, max_backoff)
+            delay = next(delays)
+            log(f"Reconnecting in {delay:.1f} s")
+            try:
+                await asyncio.wait_for(stop.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+        return connections
+    finally:
+        flusher.cancel()
+        stopped.cancel()
+        recorder.flush()
 
-        start = time.time()
-        print("Connected to Binance trade stream.")
 
-        async for message in ws:
-            with open('stream_data.txt','a') as f:
-                data = json.loads(message)
-            #print(data)
-                line = json.dumps(data)
-                f.write(line+'\n')
-                f.flush()
+async def main(args):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    if args.duration is not None:
+        loop.call_later(args.duration, stop.set)
+    recorder = Recorder(args.out, compress=args.compress, max_bytes=args.max_bytes)
+    start = time.time()
+    try:
+        await record(args.url, recorder, stop, flush_interval=args.flush_interval)
+    finally:
+        recorder.close()
+    print(f"Recorded {recorder.frames} frames in {time.time() - start:.1f} s to {recorder.file_path}")
 
-                if time.time() - start > 3:
-                    break
 
-asyncio.run(main())
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record a websocket market-data stream to disk")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--out", default="stream_data.txt")
+    parser.add_argument("--compress", action="store_true", help="write gzip")
+    parser.add_argument("--max-bytes", type=int, help="rotate to a new numbered segment after this many bytes")
+    parser.add_argument("--flush-interval", type=float, default=1.0, help="seconds between flushes")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds (default: run until interrupted)")
+    asyncio.run(main(parser.parse_args()))
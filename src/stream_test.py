@@ -0,0 +1,117 @@
+import asyncio
+import gzip
+import os
+import tempfile
+import unittest
+import websockets
+from stream import Recorder, record, backoff_delays
+
+
+def read_lines(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return f.read().decode().splitlines()
+
+
+class TestRecorder(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "trades.txt")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_appends_raw_frames(self):
+        frames = ['{"p": "100.50", "q": "1.0"}', b'{"p":"101"}']
+        recorder = Recorder(self.path)
+        for frame in frames:
+            recorder.write(frame)
+        recorder.close()
+        Recorder(self.path).close()  # reopening appends, nothing is truncated
+        self.assertEqual(read_lines(self.path), ['{"p": "100.50", "q": "1.0"}', '{"p":"101"}'])
+
+    def test_compressed_rotating_segments(self):
+        frames = [f'{{"t": {i}, "p": "100.{i:02d}"}}' for i in range(50)]
+        for run in range(2):
+            recorder = Recorder(self.path, compress=True, max_bytes=200)
+            for frame in frames:
+                recorder.write(frame)
+            recorder.close()
+        segments = sorted(os.listdir(self.tmp.name))
+        self.assertTrue(all(name.startswith("trades.") and name.endswith(".txt.gz") for name in segments))
+        self.assertGreater(len(segments), 2)
+        # The second run continued the numbering instead of overwriting the first run's segments
+        lines = [line for name in segments for line in read_lines(os.path.join(self.tmp.name, name))]
+        self.assertEqual(lines, frames + frames)
+
+    def test_backoff_grows_to_the_cap(self):
+        delays = backoff_delays(0.5, 4.0)
+        values = [next(delays) for _ in range(8)]
+        self.assertTrue(0.375 <= values[0] <= 0.625)
+        self.assertTrue(all(3.0 <= d <= 5.0 for d in values[3:]))
+
+
+class TestRecord(unittest.IsolatedAsyncioTestCase):
+    async def test_reconnects_and_records_everything(self):
+        connections = []
+
+        async def handler(ws):
+            # Each connection sends its frames then drops; the recorder must come back for more
+            n = len(connections)
+            connections.append(ws)
+            for i in range(100):
+                await ws.send(f'{{"connection": {n}, "i": {i}}}')
+            if n < 2:
+                await ws.close()
+            else:
+                await ws.wait_closed()  # stay open until the recorder stops
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trades.txt")
+            recorder = Recorder(path)
+            stop = asyncio.Event()
+            async with websockets.serve(handler, "127.0.0.1", 0) as server:
+                port = server.sockets[0].getsockname()[1]
+                task = asyncio.create_task(record(f"ws://127.0.0.1:{port}", recorder, stop, flush_interval=0.01,
+                                                  initial_backoff=0.01, log=lambda message: None))
+                while recorder.frames < 300:
+                    await asyncio.sleep(0.01)
+                # Flushed without closing the file
+                await asyncio.sleep(0.05)
+                self.assertEqual(len(read_lines(path)), 300)
+                stop.set()
+                self.assertEqual(await task, 3)
+            recorder.close()
+            expected = [f'{{"connection": {n}, "i": {i}}}' for n in range(3) for i in range(100)]
+            self.assertEqual(read_lines(path), expected)
+
+    async def test_retries_until_the_server_is_up(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            recorder = Recorder(os.path.join(tmp, "trades.txt"))
+            stop = asyncio.Event()
+            # Nothing listens on this port yet
+            probe = await asyncio.start_server(lambda r, w: None, "127.0.0.1", 0)
+            port = probe.sockets[0].getsockname()[1]
+            probe.close()
+            await probe.wait_closed()
+            messages = []
+            task = asyncio.create_task(record(f"ws://127.0.0.1:{port}", recorder, stop, initial_backoff=0.01,
+                                              max_backoff=0.05, log=messages.append))
+            await asyncio.sleep(0.2)
+            self.assertFalse(task.done())
+
+            async def handler(ws):
+                await ws.send("hello")
+                await ws.wait_closed()
+
+            async with websockets.serve(handler, "127.0.0.1", port):
+                while recorder.frames < 1:
+                    await asyncio.sleep(0.01)
+                stop.set()
+                self.assertEqual(await task, 1)
+            recorder.close()
+            self.assertGreater(sum(m.startswith("Reconnecting") for m in messages), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
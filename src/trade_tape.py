@@ -0,0 +1,154 @@
+import numpy as np
+
+# Aggressor side stored on the tape: +1 the taker bought, -1 the taker sold
+BUY, SELL = 1, -1
+
+
+class TradeTape:
+    """
+    Exchange-wide record of every fill, stored column-wise in preallocated NumPy arrays:
+    maker and taker (agent indices), price, qty, timestamp and aggressor side.
+
+    ring=False: grows by whole chunks of chunk_size rows and never overwrites.
+    ring=True:  a single chunk used as a ring buffer; the oldest trades are overwritten.
+
+    Fills are copied in one slice assignment per column per sweep, so recording
+    does not allocate per fill. Analytics work on the whole columns at once.
+    """
+
+    COLUMNS = (
+        ("maker", np.int32),
+        ("taker", np.int32),
+        ("price", np.float64),
+        ("qty", np.float64),
+        ("timestamp", np.float64),
+        ("side", np.int8),
+    )
+
+    def __init__(self, chunk_size: int = 1 << 16, ring: bool = False):
+        self.chunk_size = chunk_size
+        self.ring = ring
+        self.chunks = [self._new_chunk()]
+        self.pos = 0    # next free row in the last chunk
+        self.total = 0  # trades ever recorded (more than len() once a ring wraps)
+
+    def _new_chunk(self):
+        return {name: np.zeros(self.chunk_size, dtype=dtype) for name, dtype in self.COLUMNS}
+
+    def __len__(self):
+        if self.ring:
+            return min(self.total, self.chunk_size)
+        return (len(self.chunks) - 1) * self.chunk_size + self.pos
+
+    def record(self, maker, taker: int, price, qty, timestamp: float, side: int, n: int):
+        """
+        Appends n trades of one taker order. maker, price and qty are sequences
+        with at least n items (e.g. the book's fill buffer columns); taker,
+        timestamp and side are the same for every row.
+        """
+        if n == 1:
+            # Most sweeps fill a single order: scalar stores beat six slice assignments
+            chunk, pos = self.chunks[-1], self.pos
+            chunk["maker"][pos] = maker[0]
+            chunk["taker"][pos] = taker
+            chunk["price"][pos] = price[0]
+            chunk["qty"][pos] = qty[0]
+            chunk["timestamp"][pos] = timestamp
+            chunk["side"][pos] = side
+            self.pos = pos + 1
+            self.total += 1
+            if self.pos == self.chunk_size:
+                self.pos = 0
+                if not self.ring:
+                    self.chunks.append(self._new_chunk())
+            return
+        done = 0
+        while done < n:
+            chunk = self.chunks[-1]
+            k = min(n - done, self.chunk_size - self.pos)
+            rows = slice(self.pos, self.pos + k)
+            chunk["maker"][rows] = maker[done:done + k]
+            chunk["taker"][rows] = taker
+            chunk["price"][rows] = price[done:done + k]
+            chunk["qty"][rows] = qty[done:done + k]
+            chunk["timestamp"][rows] = timestamp
+            chunk["side"][rows] = side
+
+            done += k
+            self.pos += k
+            if self.pos == self.chunk_size:
+                self.pos = 0
+                if not self.ring:
+                    self.chunks.append(self._new_chunk())
+        self.total += n
+
+    def extend(self, columns: dict):
+        """Appends whole columns ({name: array} as returned by columns()), e.g. from a snapshot."""
+        n = len(columns["price"])
+        done = 0
+        while done < n:
+            chunk = self.chunks[-1]
+            k = min(n - done, self.chunk_size - self.pos)
+            for name, _ in self.COLUMNS:
+                chunk[name][self.pos:self.pos + k] = columns[name][done:done + k]
+            done += k
+            self.pos += k
+            if self.pos == self.chunk_size:
+                self.pos = 0
+                if not self.ring:
+                    self.chunks.append(self._new_chunk())
+        self.total += n
+
+    def column(self, name: str):
+        """One column in chronological order (oldest trade first)."""
+        if self.ring:
+            arr = self.chunks[0][name]
+            if self.total <= self.chunk_size:
+                return arr[:self.pos].copy()
+            return np.concatenate((arr[self.pos:], arr[:self.pos]))
+        parts = [chunk[name] for chunk in self.chunks[:-1]]
+        parts.append(self.chunks[-1][name][:self.pos])
+        return np.concatenate(parts)
+
+    def columns(self):
+        return {name: self.column(name) for name, _ in self.COLUMNS}
+
+    # --- Analytics ---
+
+    def volume(self):
+        return float(self.column("qty").sum())
+
+    def signed_volume(self):
+        """Buyer-initiated minus seller-initiated volume."""
+        return float((self.column("side") * self.column("qty")).sum())
+
+    def vwap(self):
+        qty = self.column("qty")
+        total = qty.sum()
+        if total == 0:
+            return None # No trades
+        return float((self.column("price") * qty).sum() / total)
+
+    def ohlc(self, interval: float):
+        """
+        Open/high/low/close/volume bars over buckets of `interval` in timestamp units.
+        Returns a dict of arrays; empty buckets are skipped.
+        """
+        price = self.column("price")
+        if len(price) == 0:
+            return {key: np.array([]) for key in ("time", "open", "high", "low", "close", "volume")}
+        qty = self.column("qty")
+        bucket = np.floor(self.column("timestamp") / interval)
+
+        # Timestamps are non-decreasing, so each bucket is one contiguous run of rows
+        breaks = np.flatnonzero(np.diff(bucket)) + 1
+        starts = np.concatenate(([0], breaks))
+        ends = np.concatenate((breaks, [len(price)])) - 1
+        return {
+            "time": bucket[starts] * interval,
+            "open": price[starts],
+            "high": np.maximum.reduceat(price, starts),
+            "low": np.minimum.reduceat(price, starts),
+            "close": price[ends],
+            "volume": np.add.reduceat(qty, starts),
+        }
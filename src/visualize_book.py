@@ -1,6 +1,60 @@
 import matplotlib.pyplot as plt
 import numpy as np
 
+class DepthHistory:
+    """
+    Order book frames stored as L2 depth deltas and rebuilt on demand.
+    record() takes the (side, price, new_size) changes since the previous frame,
+    as returned by OrderBook.pop_depth_changes(). A full copy of the levels is
+    kept every `keyframe_every` frames, so any frame is rebuilt from the nearest
+    keyframe plus at most that many delta batches.
+    Behaves like a list of (bids, asks) snapshots: len(), history[i], history[::n].
+    """
+
+    def __init__(self, keyframe_every: int = 50):
+        self.keyframe_every = keyframe_every
+        self.deltas = []
+        self.keyframes = []
+        self.levels = {"bid": {}, "ask": {}}  # state after the last recorded frame
+
+    @staticmethod
+    def _apply(levels, changes):
+        for side, price, size in changes:
+            if size:
+                levels[side][price] = size
+            else:
+                levels[side].pop(price, None)
+
+    def record(self, changes):
+        self._apply(self.levels, changes)
+        if len(self.deltas) % self.keyframe_every == 0:
+            self.keyframes.append({side: dict(lv) for side, lv in self.levels.items()})
+        self.deltas.append(changes)
+
+    def __len__(self):
+        return len(self.deltas)
+
+    def __getitem__(self, step):
+        if isinstance(step, slice):
+            return [self[i] for i in range(*step.indices(len(self)))]
+        if step < 0:
+            step += len(self)
+        if not 0 <= step < len(self):
+            raise IndexError("history index out of range")
+
+        k = step // self.keyframe_every
+        levels = {side: dict(lv) for side, lv in self.keyframes[k].items()}
+        for changes in self.deltas[k * self.keyframe_every + 1:step + 1]:
+            self._apply(levels, changes)
+        bids = sorted(levels["bid"].items(), reverse=True)
+        asks = sorted(levels["ask"].items())
+        return bids, asks
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
 def plot_order_book(order_book):
     """
     Plots the Limit Order Book as a Depth Chart.
@@ -55,7 +109,7 @@ def plot_order_book(order_book):
 def plot_interactive_order_book(history):
     """
     Plots the Order Book evolution with a slider.
-    history: list of (bids, asks) tuples
+    history: list of (bids, asks) tuples, or a DepthHistory
     """
     from matplotlib.widgets import Slider
 